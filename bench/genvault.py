@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Synthetic vault generator for benchmarks.
+
+    python3 bench/genvault.py DEST [--notes N] [--links-per-note K]
+        [--broken-links RATIO] [--studies S] [--modules M]
+        [--audios A] [--videos V] [--media-seconds SECONDS] [--seed SEED]
+
+Builds a vault with `nk vault init`, then fills it with N notes spread over
+notes/, daily/, inbound/, thinking/ and studies/ the way a real vault is
+(mostly notes and daily pages, fewer drafts). Notes carry K wikilinks on
+average, a small share of them broken. Media fixtures are generated with
+ffmpeg (sine tones of different pitch, so every file decodes to distinct
+PCM and nothing hits the transcript cache) and kept in DEST/.bench/media/;
+bench/run.py copies them into the inboxes before each media scenario.
+"""
+import datetime
+import os
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Share of notes per area; studies get the remainder as modules
+AREA_SHARE = [
+    ("notes", 0.45),
+    ("daily", 0.25),
+    ("inbound/inbox", 0.08),
+    ("inbound/processing", 0.04),
+    ("thinking/inbox", 0.04),
+    ("thinking/drafts", 0.04),
+    ("thinking/publications", 0.02),
+]
+
+VOCABULARY = (
+    "attention budget cache compiler context daemon decision entropy feedback "
+    "garden habit index insight kernel latency memory model network outline "
+    "pipeline practice question reading research review schedule signal study "
+    "system theory throughput transcript vault window writing"
+).split()
+
+
+DEFAULTS = {
+    "notes": 1000,
+    "links-per-note": 3.0,
+    "broken-links": 0.02,
+    "studies": 10,
+    "modules": 8,
+    "audios": 3,
+    "videos": 1,
+    "media-seconds": 20.0,
+    "seed": 1,
+}
+
+
+def split_args(argv: list[str], defaults: dict) -> tuple[list[str], dict]:
+    args, opts = [], dict(defaults)
+    i = 0
+    while i < len(argv):
+        a = argv[i]
+        if a.startswith("--") and a[2:] in opts:
+            opts[a[2:]] = type(defaults[a[2:]])(argv[i + 1])
+            i += 2
+            continue
+        args.append(a)
+        i += 1
+    return args, opts
+
+
+def sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(n))
+
+
+def note_body(rng: random.Random, title: str, targets: list[str], links: int, broken: float) -> str:
+    lines = [f"# {title}", ""]
+    for _ in range(rng.randint(3, 8)):
+        lines.append(sentence(rng, rng.randint(12, 30)).capitalize() + ".")
+    link_lines = []
+    for _ in range(links):
+        if targets and rng.random() >= broken:
+            link_lines.append(f"- [[{rng.choice(targets)}]]")
+        else:
+            link_lines.append(f"- [[missing {sentence(rng, 2)}]]")
+    if link_lines:
+        lines += ["", "## Links", *link_lines]
+    lines += ["", "## Tags:", f"#{rng.choice(VOCABULARY)}", ""]
+    return "\n".join(lines)
+
+
+def generate_notes(vault: Path, opts: dict, rng: random.Random) -> int:
+    total = opts["notes"]
+    # Studies (index + modules) take at most a fifth of the vault
+    study_notes = min(total // 5, opts["studies"] * (opts["modules"] + 1))
+    area_total = total - study_notes
+
+    # Plan every file first so links can point at notes written later
+    planned: list[tuple[Path, str]] = []
+    day0 = datetime.date(2020, 1, 1)
+    for area, share in AREA_SHARE:
+        count = int(area_total * share)
+        for i in range(count):
+            if area == "daily":
+                stem = (day0 + datetime.timedelta(days=i)).isoformat()
+                title = stem
+            else:
+                date = (day0 + datetime.timedelta(days=rng.randrange(2000))).isoformat()
+                title = f"{sentence(rng, 3).title()} {i}"
+                stem = f"{date}-{title.lower().replace(' ', '-')}"
+            planned.append((vault / area / f"{stem}.md", title))
+    # Round-off goes to notes/
+    while len(planned) < area_total:
+        i = len(planned)
+        title = f"{sentence(rng, 3).title()} {i}"
+        planned.append((vault / "notes" / f"2024-01-01-{title.lower().replace(' ', '-')}.md", title))
+    s = 0
+    while len(planned) < total:
+        slug = f"study-{s:03d}-{rng.choice(VOCABULARY)}"
+        planned.append((vault / "studies" / slug / f"{slug}-index.md", slug.replace("-", " ").title()))
+        for m in range(1, opts["modules"] + 1):
+            if len(planned) >= total:
+                break
+            planned.append((vault / "studies" / slug / f"{slug}-module-{m:02d}.md", f"{slug} — Module {m:02d}"))
+        s += 1
+
+    targets = [p.stem for p, _ in planned]
+    links_per_note = opts["links-per-note"]
+    for path, title in planned:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Poisson-ish spread around the requested density
+        links = max(0, int(rng.gauss(links_per_note, links_per_note / 2))) if links_per_note else 0
+        path.write_text(note_body(rng, title, targets, links, opts["broken-links"]))
+    return len(planned)
+
+
+def ffmpeg(args: list[str]) -> None:
+    subprocess.run(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-y", *args],
+        check=True,
+    )
+
+
+def generate_media(vault: Path, opts: dict) -> tuple[int, int]:
+    """
+    Small audio/video fixtures: mono sine tones for audios, a low-res test
+    pattern with a tone for videos. Each file gets its own pitch.
+    """
+    media_dir = vault / ".bench" / "media"
+    (media_dir / "audios").mkdir(parents=True, exist_ok=True)
+    (media_dir / "videos").mkdir(parents=True, exist_ok=True)
+    seconds = opts["media-seconds"]
+    for i in range(opts["audios"]):
+        ffmpeg([
+            "-f", "lavfi", "-i", f"sine=frequency={220 + 10 * i}:duration={seconds}",
+            "-ac", "1", "-ar", "16000", "-b:a", "64k",
+            str(media_dir / "audios" / f"bench-audio-{i:03d}.mp3"),
+        ])
+    for i in range(opts["videos"]):
+        ffmpeg([
+            "-f", "lavfi", "-i", f"testsrc=size=160x120:rate=5:duration={seconds}",
+            "-f", "lavfi", "-i", f"sine=frequency={660 + 10 * i}:duration={seconds}",
+            "-c:v", "mpeg4", "-c:a", "aac", "-shortest",
+            str(media_dir / "videos" / f"bench-video-{i:03d}.mp4"),
+        ])
+    return opts["audios"], opts["videos"]
+
+
+def generate_vault(dest: Path, **overrides) -> dict:
+    """
+    Build a synthetic vault at `dest` (must not exist). Returns a summary
+    dict; used by bench/run.py and the command line below.
+    """
+    opts = {**DEFAULTS, **overrides}
+    rng = random.Random(opts["seed"])
+
+    dest.mkdir(parents=True)
+    subprocess.run(
+        [sys.executable, str(REPO_ROOT / "nk.py"), "vault", "init", str(dest)],
+        check=True, stdout=subprocess.DEVNULL,
+        env={**os.environ, "NK_NO_SERVER": "1"},
+    )
+    notes = generate_notes(dest, opts, rng)
+    audios, videos = generate_media(dest, opts) if (opts["audios"] or opts["videos"]) else (0, 0)
+    return {"path": str(dest), "notes": notes, "audios": audios, "videos": videos, "options": opts}
+
+
+def main(argv: list[str]) -> int:
+    args, opts = split_args(argv, DEFAULTS)
+    if len(args) != 1:
+        print(__doc__.strip())
+        return 1
+    dest = Path(args[0]).expanduser().resolve()
+    if dest.exists():
+        print(f"🚫 {dest} already exists; pick a new path.")
+        return 1
+    summary = generate_vault(dest, **opts)
+    print(
+        f"✅ Generated {summary['notes']} notes, {summary['audios']} audio and "
+        f"{summary['videos']} video fixtures in {dest}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmarks for nk.
+
+    python3 bench/run.py run [--sizes 1000,10000] [--repeat N] [--out FILE]
+                             [--transcriber stub|whisper] [-m MODEL]
+                             [--only SCENARIO,...] [--keep]
+    python3 bench/run.py compare BASELINE.json CURRENT.json [--threshold 0.2]
+
+`run` generates one synthetic vault per size (bench/genvault.py), times
+every scenario as a real `nk` subprocess (so interpreter startup counts),
+times the media stages in-process, and writes a JSON file under
+bench/results/ (or --out). Media uses the offline stub transcriber in
+bench/stub unless --transcriber whisper is given (then pick a small model
+with -m tiny whose weights are already downloaded).
+
+`compare` matches scenarios by name and vault size and exits 1 when a
+median got slower than the threshold (default 20%, and at least 5 ms).
+"""
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent
+NK = REPO_ROOT / "nk.py"
+
+sys.path.insert(0, str(BENCH_DIR))
+from genvault import generate_vault  # noqa: E402
+
+# Medians closer than this are noise, whatever the ratio
+MIN_REGRESSION_S = 0.005
+
+# name -> (nk argv, setup). "{i}" in argv is the repetition number,
+# "{fresh}" a new directory and "{import_file}" a JSONL file from setup.
+SCENARIOS = [
+    ("startup", ["help"], None),
+    ("vault-init", ["vault", "init", "{fresh}"], "fresh"),
+    ("notes-new", ["notes", "new", "Bench note {i}"], None),
+    ("notes-insight", ["notes", "insight", "Bench insight {i}"], None),
+    ("inbound-inbox", ["inbound", "inbox", "Bench inbound {i}"], None),
+    ("thinking-draft", ["thinking", "draft", "Bench draft {i}"], None),
+    ("daily", ["daily"], None),
+    ("study-module", ["study", "module", "Bench Study"], None),
+    ("study-list", ["study", "list"], None),
+    ("study-stats", ["study", "stats"], None),
+    ("notes-import-1000", ["notes", "import", "{import_file}", "--kind", "inbound-inbox"], "import"),
+    ("search-cold", ["search", "kernel latency", "--limit", "10"], "drop-index"),
+    ("search-warm", ["search", "kernel latency", "--limit", "10"], None),
+    ("links-orphans-cold", ["links", "orphans"], "drop-index"),
+    ("links-orphans-warm", ["links", "orphans"], None),
+    ("auto-queue", ["auto", "queue", "."], None),
+    ("auto-tick-idle", ["auto", "tick", "."], "empty-inboxes"),
+    ("audios-process", ["audios", "process", "."], "audios"),
+    ("media-process", ["media", "process", "."], "media"),
+]
+
+
+def git_describe() -> dict:
+    def git(*args: str) -> str:
+        r = subprocess.run(["git", *args], cwd=REPO_ROOT, capture_output=True, text=True)
+        return r.stdout.strip() if r.returncode == 0 else ""
+
+    return {
+        "commit": git("rev-parse", "--short", "HEAD") or "unknown",
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+    }
+
+
+def bench_env(work: Path, transcriber: str, model: str) -> dict:
+    env = dict(os.environ)
+    for key in [k for k in env if k.startswith("NK_")]:
+        del env[key]
+    env.update({
+        "NK_NO_SERVER": "1",
+        "NK_EDITOR": "true",
+        "NK_LOCAL_ARCHIVE_ROOT": str(work / "archive"),
+        "NK_CACHE": "0",
+        "NK_WHISPER_MODEL": model,
+    })
+    if transcriber == "stub":
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(BENCH_DIR / "stub"), env.get("PYTHONPATH")]))
+    return env
+
+
+def reset_inboxes(vault: Path, kinds: tuple[str, ...]) -> None:
+    """Put the media fixtures back into the inboxes, drop earlier outputs."""
+    for kind in ("audios", "videos"):
+        inbox = vault / kind / "inbox"
+        for p in inbox.iterdir():
+            if not p.name.startswith("."):
+                p.unlink()
+        if kind in kinds:
+            for fixture in sorted((vault / ".bench" / "media" / kind).iterdir()):
+                shutil.copy2(fixture, inbox / fixture.name)
+    transcripts = vault / "audios" / "transcripts"
+    for p in transcripts.glob("bench-*.md"):
+        p.unlink()
+
+
+def setup_scenario(setup: str | None, vault: Path, work: Path, i: int) -> dict:
+    values = {"i": str(i)}
+    if setup == "fresh":
+        values["fresh"] = str(work / f"fresh-vault-{i}")
+        Path(values["fresh"]).mkdir()
+    elif setup == "import":
+        path = work / f"import-{i}.jsonl"
+        with path.open("w") as f:
+            for n in range(1000):
+                f.write(json.dumps({"title": f"Imported {i} {n}", "body": "Synthetic import."}) + "\n")
+        values["import_file"] = str(path)
+    elif setup == "drop-index":
+        for suffix in ("", "-wal", "-shm"):
+            (vault / ".nk" / f"index.sqlite{suffix}").unlink(missing_ok=True)
+    elif setup == "empty-inboxes":
+        reset_inboxes(vault, ())
+    elif setup == "audios":
+        reset_inboxes(vault, ("audios",))
+    elif setup == "media":
+        reset_inboxes(vault, ("audios", "videos"))
+    return values
+
+
+def time_command(argv: list[str], vault: Path, env: dict) -> tuple[float, int]:
+    t0 = time.perf_counter()
+    r = subprocess.run(
+        [sys.executable, str(NK), *argv],
+        cwd=vault, env=env, stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    elapsed = time.perf_counter() - t0
+    if r.returncode != 0 and r.stderr:
+        print(f"   ⚠️  nk {' '.join(argv)} exited {r.returncode}: {r.stderr.strip().splitlines()[-1]}")
+    return elapsed, r.returncode
+
+
+def summarize(name: str, notes: int, runs: list[float], extra: dict | None = None) -> dict:
+    result = {
+        "scenario": name,
+        "vault_notes": notes,
+        "runs_s": [round(r, 6) for r in runs],
+        "median_s": round(statistics.median(runs), 6),
+        "min_s": round(min(runs), 6),
+        "max_s": round(max(runs), 6),
+    }
+    if extra:
+        result.update(extra)
+    return result
+
+
+def bench_media_stages(vault: Path, work: Path, env: dict, model_name: str, repeat: int) -> list[dict]:
+    """
+    Time decode, transcription, transcript write and archive move per audio
+    fixture, in-process, with the same functions `nk audios process` uses.
+    """
+    old_env = dict(os.environ)
+    os.environ.clear()
+    os.environ.update(env)
+    if env.get("PYTHONPATH"):
+        sys.path[:0] = env["PYTHONPATH"].split(os.pathsep)
+    sys.path.insert(0, str(REPO_ROOT))
+    try:
+        import nk
+
+        fixtures = sorted((vault / ".bench" / "media" / "audios").iterdir())
+        if not fixtures:
+            return []
+        model = nk.WhisperModel(model_name)
+        t0 = time.perf_counter()
+        model.get()
+        load_s = time.perf_counter() - t0
+
+        stages: dict[str, list[float]] = {"decode": [], "transcribe": [], "write": [], "move": []}
+        audio_s = rtf = 0.0
+        out_dir = work / "stage-out"
+        out_dir.mkdir(exist_ok=True)
+        for _ in range(repeat):
+            for fixture in fixtures:
+                src = out_dir / fixture.name
+                shutil.copy2(fixture, src)
+                t = time.perf_counter()
+                pcm = nk.decode_audio_pcm(src)
+                stages["decode"].append(time.perf_counter() - t)
+                audio_s = len(pcm) / nk.WHISPER_SAMPLE_RATE
+                t = time.perf_counter()
+                result, _ = nk.transcribe_pcm(model, pcm, "transcribe")
+                stages["transcribe"].append(time.perf_counter() - t)
+                rtf = stages["transcribe"][-1] / audio_s if audio_s else 0.0
+                t = time.perf_counter()
+                nk.write_transcript(result, out_dir / f"{fixture.stem}.md")
+                stages["write"].append(time.perf_counter() - t)
+                t = time.perf_counter()
+                shutil.move(str(src), str(out_dir / f"archived-{fixture.name}"))
+                stages["move"].append(time.perf_counter() - t)
+        results = [summarize("stage:model-load", 0, [load_s])]
+        for stage, runs in stages.items():
+            extra = {"audio_s": round(audio_s, 3)}
+            if stage == "transcribe":
+                extra["rtf"] = round(rtf, 4)
+            results.append(summarize(f"stage:{stage}", 0, runs, extra))
+        return results
+    finally:
+        os.environ.clear()
+        os.environ.update(old_env)
+
+
+def run(rest: list[str]) -> int:
+    opts = {"--sizes": "1000,10000", "--repeat": "5", "--out": "", "--transcriber": "stub",
+            "-m": "tiny", "--only": ""}
+    keep = False
+    i = 0
+    while i < len(rest):
+        if rest[i] == "--keep":
+            keep = True
+            i += 1
+        elif rest[i] in opts and i + 1 < len(rest):
+            opts[rest[i]] = rest[i + 1]
+            i += 2
+        else:
+            print(f"Unknown option: {rest[i]}")
+            return 1
+    sizes = [int(s) for s in opts["--sizes"].split(",") if s]
+    repeat = int(opts["--repeat"])
+    transcriber = opts["--transcriber"]
+    only = set(filter(None, opts["--only"].split(",")))
+    if transcriber not in {"stub", "whisper"}:
+        print("--transcriber must be 'stub' or 'whisper'")
+        return 1
+    if shutil.which("ffmpeg") is None:
+        print("🚫 ffmpeg is required (fixtures and media scenarios).")
+        return 1
+
+    meta = {
+        **git_describe(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "transcriber": transcriber,
+        "model": opts["-m"],
+        "repeat": repeat,
+    }
+    results = []
+    work_root = Path(tempfile.mkdtemp(prefix="nk-bench-"))
+    try:
+        for size in sizes:
+            work = work_root / f"v{size}"
+            work.mkdir()
+            vault = work / "vault"
+            t0 = time.perf_counter()
+            summary = generate_vault(vault, notes=size)
+            print(f"📦 Vault with {summary['notes']} notes generated in {time.perf_counter() - t0:.1f}s")
+            env = bench_env(work, transcriber, opts["-m"])
+
+            for name, argv, setup in SCENARIOS:
+                if only and name not in only:
+                    continue
+                runs = []
+                for rep in range(repeat):
+                    values = setup_scenario(setup, vault, work, rep)
+                    elapsed, rc = time_command([a.format(**values) for a in argv], vault, env)
+                    runs.append(elapsed)
+                results.append(summarize(name, size, runs, {"exit": rc}))
+                print(f"   {name:<20} median {statistics.median(runs) * 1000:8.1f} ms")
+
+            if not only or "stages" in only:
+                for r in bench_media_stages(vault, work, env, opts["-m"], repeat):
+                    r["vault_notes"] = size
+                    results.append(r)
+                    rtf = f"  (RTF {r['rtf']})" if "rtf" in r else ""
+                    print(f"   {r['scenario']:<20} median {r['median_s'] * 1000:8.1f} ms{rtf}")
+    finally:
+        if keep:
+            print(f"Vaults kept in {work_root}")
+        else:
+            shutil.rmtree(work_root, ignore_errors=True)
+
+    out = Path(opts["--out"]) if opts["--out"] else (
+        BENCH_DIR / "results" / f"{meta['date'].replace(':', '')}-{meta['commit']}.json"
+    )
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({"meta": meta, "results": results}, indent=2) + "\n")
+    print(f"✅ Results written to {out}")
+    return 0
+
+
+def compare(rest: list[str]) -> int:
+    threshold = 0.2
+    if "--threshold" in rest:
+        k = rest.index("--threshold")
+        threshold = float(rest[k + 1])
+        rest = rest[:k] + rest[k + 2:]
+    if len(rest) != 2:
+        print("Usage: bench/run.py compare BASELINE.json CURRENT.json [--threshold 0.2]")
+        return 1
+    base, cur = (json.loads(Path(p).read_text()) for p in rest)
+    base_by_key = {(r["scenario"], r["vault_notes"]): r for r in base["results"]}
+    print(f"Baseline {base['meta']['commit']}  →  current {cur['meta']['commit']}")
+    regressions = 0
+    for r in cur["results"]:
+        b = base_by_key.get((r["scenario"], r["vault_notes"]))
+        if b is None:
+            continue
+        delta = r["median_s"] - b["median_s"]
+        ratio = r["median_s"] / b["median_s"] if b["median_s"] else 1.0
+        flag = ""
+        if ratio > 1 + threshold and delta > MIN_REGRESSION_S:
+            flag = "  🔴 regression"
+            regressions += 1
+        elif ratio < 1 - threshold and -delta > MIN_REGRESSION_S:
+            flag = "  ✅ faster"
+        print(
+            f"   {r['scenario']:<20} {r['vault_notes']:>7} notes  "
+            f"{b['median_s'] * 1000:8.1f} → {r['median_s'] * 1000:8.1f} ms  ({ratio:5.2f}×){flag}"
+        )
+    if regressions:
+        print(f"🔴 {regressions} scenario(s) slower than {threshold:.0%}")
+        return 1
+    print("✅ No regressions")
+    return 0
+
+
+def main(argv: list[str]) -> int:
+    if argv and argv[0] == "run":
+        return run(argv[1:])
+    if argv and argv[0] == "compare":
+        return compare(argv[1:])
+    print(__doc__.strip())
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
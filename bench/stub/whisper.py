@@ -0,0 +1,61 @@
+"""
+Stub `whisper` module for offline benchmarks.
+
+Put bench/stub on PYTHONPATH and nk imports this instead of openai-whisper.
+It accepts the same load_model()/transcribe() calls nk makes and returns
+one deterministic segment per 5 s of audio. Model "load" and inference
+costs are simulated with sleeps so scenarios still have realistic shapes:
+
+    NK_BENCH_STUB_LOAD_S   seconds spent in load_model()   (default 0.0)
+    NK_BENCH_STUB_RTF      seconds of compute per second of audio (default 0.0)
+"""
+import os
+import time
+
+SAMPLE_RATE = 16000
+SEGMENT_SECONDS = 5.0
+
+WORDS = "the kernel keeps notes local and every command does exactly one thing".split()
+
+
+class _Device:
+    type = "cpu"
+
+
+class StubModel:
+    def __init__(self, name: str):
+        self.name = name
+        self.device = _Device()
+
+    def transcribe(self, audio, task="transcribe", **options) -> dict:
+        if isinstance(audio, str):
+            # Path input (legacy per-file path): estimate from the file size
+            # of a 64 kbit/s mp3.
+            duration = os.path.getsize(audio) / 8000
+        else:
+            duration = len(audio) / SAMPLE_RATE
+        rtf = float(os.environ.get("NK_BENCH_STUB_RTF", "0") or 0)
+        if rtf > 0:
+            time.sleep(duration * rtf)
+
+        segments = []
+        start = 0.0
+        i = 0
+        while start < duration:
+            end = min(start + SEGMENT_SECONDS, duration)
+            words = [WORDS[(i + k) % len(WORDS)] for k in range(8)]
+            segments.append({"id": i, "start": start, "end": end, "text": " " + " ".join(words) + "."})
+            start = end
+            i += 1
+        return {
+            "text": "".join(s["text"] for s in segments),
+            "segments": segments,
+            "language": "en",
+        }
+
+
+def load_model(name: str, **kwargs) -> StubModel:
+    load_s = float(os.environ.get("NK_BENCH_STUB_LOAD_S", "0") or 0)
+    if load_s > 0:
+        time.sleep(load_s)
+    return StubModel(name)
@@ -85,10 +85,9 @@ cmd_status() {
   $NK_SYSTEMCTL is-enabled "$tmr" 2>/dev/null || echo "Timer not enabled (may be fine)."
   echo
 
-  echo "=== Queue ==="
-  queue_info
+  # The media queue itself is printed by nk from .nk/state.sqlite
+  # (see `nk auto queue`); use `queue` below for raw inbox counts.
 
-  echo
   echo "=== Last run / logs (systemctl status) ==="
   $NK_SYSTEMCTL status "$svc" --no-pager || true
 }
@@ -136,8 +135,8 @@ usage() {
 Usage: $(basename "$0") <command> [vault-path]
 
 Commands:
-  status     Show service/timer status + queue
-  queue      Show counts of pending MP4/MP3 in inbox
+  status     Show service/timer status
+  queue      Show counts of pending MP4/MP3 in inbox (raw directory scan)
   run        Trigger a manual run of the vault service now
   logs       Show recent logs for the vault service
   enable     Enable the vault timer (auto-processing ON)
@@ -0,0 +1,12 @@
+[Unit]
+Description=notes-kernel scheduler for all registered vaults
+
+[Service]
+Type=simple
+Environment=PATH={python_dir}:/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin
+ExecStart={python_bin} {nk_py} scheduler run
+Restart=on-failure
+RestartSec=10
+
+[Install]
+WantedBy=default.target
@@ -0,0 +1,13 @@
+[Unit]
+Description=Watch notes-kernel inboxes on vault {vault_id}
+
+[Service]
+Type=simple
+WorkingDirectory={vault_path}
+Environment=PATH={python_dir}:/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin
+ExecStart={python_bin} {nk_py} watch {vault_path}
+Restart=on-failure
+RestartSec=10
+
+[Install]
+WantedBy=default.target
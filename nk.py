@@ -2,8 +2,12 @@
 import sys
 import subprocess
 import datetime
+import hashlib
+import json
 import os
 import re
+import shutil
+import time
 
 from pathlib import Path
 
@@ -25,21 +29,38 @@ def short_usage():
         "NOTES\n"
         "  nk notes new\n"
         "  nk notes insight\n"
+        "  nk notes import <file>\n"
         "\n"
         "STUDY\n"
         "  nk study index \"Name\"\n"
         "  nk study module \"Name\"\n"
         "  nk study open \"Name\"\n"
+        "  nk study list | stats\n"
+        "\n"
+        "SEARCH\n"
+        "  nk search \"query\"\n"
+        "  nk transcripts find \"phrase\"\n"
+        "  nk links backlinks|out|orphans|broken\n"
         "\n"
         "MEDIA\n"
         "  nk videos process\n"
         "  nk audios process\n"
         "  nk audios record\n"
+        "  nk media process\n"
+        "  nk cache stats|clear\n"
+        "  nk archive stats|gc\n"
+        "  nk models [calibrate|bench]\n"
+        "\n"
+        "SERVER\n"
+        "  nk server [stop|status]\n"
         "\n"
         "AUTO\n"
         "  nk autosetup systemd\n"
-        "  nk autosetup systemd-activate\n"
-        "  nk auto status|queue|run|logs|enable|disable\n"
+        "  nk autosetup systemd-activate [--watch]\n"
+        "  nk autosetup systemd-scheduler\n"
+        "  nk scheduler add|remove|list|run\n"
+        "  nk watch\n"
+        "  nk auto status|queue|stats|upgrade|run|logs|enable|disable|tick\n"
     )
 
 def usage():
@@ -82,6 +103,10 @@ def usage():
         "  nk notes new \"title\"\n"
         "      Create a plain markdown note with a simple default template\n"
         "\n"
+        "  nk notes import <file.jsonl|file.csv|-> [--kind KIND] [--dry-run]\n"
+        "      Create many notes in one run (no editor); records carry title and\n"
+        "      optional kind, date, body, study\n"
+        "\n"
         "──────────────────────────────────────────────\n"
         "Study Projects\n"
         "──────────────────────────────────────────────\n"
@@ -94,32 +119,128 @@ def usage():
         "  nk study open \"Study Title\"\n"
         "      Open the study's index note\n"
         "\n"
+        "  nk study list\n"
+        "      All studies with module count and last activity (from .nk/ catalog)\n"
+        "\n"
+        "  nk study stats\n"
+        "      Totals, modules per study, studies missing an index, recent activity\n"
+        "\n"
+        "──────────────────────────────────────────────\n"
+        "Search\n"
+        "──────────────────────────────────────────────\n"
+        "  nk search \"query\" [--area AREA] [--limit N] [--vault PATH] [--no-update] [--rescan]\n"
+        "      Ranked full-text search with snippets (incremental index in .nk/)\n"
+        "      Areas: notes, daily, inbound, thinking, studies, transcripts\n"
+        "\n"
+        "  nk transcripts find \"phrase\" [--vault PATH] [--limit N] [--no-update]\n"
+        "      Which recording said it, and at what offset (segment index in .nk/;\n"
+        "      NK_TRANSCRIPT_TIMESTAMPS=1 also puts [hh:mm:ss] anchors in transcripts)\n"
+        "\n"
+        "  nk links backlinks <note> | out <note> | orphans | broken\n"
+        "      Wikilink graph: what links here, outgoing links, notes nothing\n"
+        "      links to, and [[links]] to notes that don't exist\n"
+        "\n"
         "──────────────────────────────────────────────\n"
         "Audio / Video Automation\n"
         "──────────────────────────────────────────────\n"
-        "  nk videos process [vault-path]\n"
+        "  nk videos process [vault-path] [--direct [--keep-audio] [-m MODEL] [-T]]\n"
         "      Convert .mp4 videos in inbox to .mp3 audios\n"
+        "      (--direct streams the audio track straight into Whisper and writes\n"
+        "       the transcript, no intermediate MP3 unless --keep-audio)\n"
         "\n"
-        "  nk audios process [vault-path]\n"
-        "      Transcribe .mp3 audios to .txt using Whisper\n"
+        "  nk audios process [vault-path] [-m MODEL] [-T] [--workers N] [--legacy]\n"
+        "      Transcribe .mp3 audios to transcripts using Whisper\n"
+        "      (model loaded once per run; -T translates to English;\n"
+        "       --workers N / NK_WORKERS shards the inbox across N processes;\n"
+        "       --legacy runs the old per-file whisper CLI path)\n"
         "\n"
         "  nk audios record [vault-path] [filename]\n"
         "      Record a .mp3 audio note directly into the vault\n"
         "\n"
+        "  nk audios record [vault-path] [filename] --live [-m MODEL] [--chunk S] [--overlap S]\n"
+        "      Record 16 kHz mono and transcribe while recording: the transcript\n"
+        "      grows in audios/transcripts/ and is done seconds after Ctrl+C\n"
+        "\n"
+        "  nk media process [vault-path] [--keep-audio] [-m MODEL] [-T]\n"
+        "      Single pass: videos and audios in the inboxes go straight to\n"
+        "      transcripts in this run, with per-file end-to-end latency\n"
+        "\n"
+        "  nk cache stats|clear\n"
+        "      Transcript cache (keyed by audio content, model and task):\n"
+        "      entries, size, hit/miss counters; media commands skip it with --no-cache\n"
+        "\n"
+        "  nk archive stats\n"
+        "      Local media archive: files archived per vault, blobs stored, what\n"
+        "      deduplication and Opus saved\n"
+        "\n"
+        "  nk archive gc [--dry-run] [--opus]\n"
+        "      Adopt loose archive files into the store, transcode stored audio to\n"
+        "      16 kHz Opus (--opus or NK_ARCHIVE_AUDIO=opus), delete unreferenced blobs\n"
+        "\n"
+        "  nk models [vault-path]\n"
+        "      Real-time factor of each candidate model on this machine (measured\n"
+        "      from real runs, else estimated) and what -m auto would pick now\n"
+        "\n"
+        "  nk models calibrate [vault-path] [--models a,b] [--seconds 60] [--file PATH]\n"
+        "      Time every candidate model on the same sample audio\n"
+        "\n"
+        "  nk models bench [vault-path] [--models a,b] [--backends x,y] [--fixtures DIR] [--limit N]\n"
+        "      Side-by-side speed and word error rate of each model on each backend\n"
+        "      (whisper, faster-whisper) over local fixtures\n"
+        "\n"
+        "      Backends: -m faster-whisper:small, NK_BACKEND or \"backend\" in\n"
+        "      .nk/config.json; faster-whisper runs int8 (NK_COMPUTE_TYPE)\n"
+        "\n"
+        "      -m auto (or \"model\": \"auto\" in .nk/config.json) picks, per run, the\n"
+        "      largest model that transcribes the backlog within the latency target\n"
+        "\n"
+        "──────────────────────────────────────────────\n"
+        "Profiling\n"
+        "──────────────────────────────────────────────\n"
+        "  nk <command> ... --profile   (or NK_PROFILE=1)\n"
+        "      Write a Chrome trace (main, templates, every subprocess, model\n"
+        "      load, transcription) plus cProfile stats to ~/.nk-archive/.profiles/\n"
+        "\n"
+        "──────────────────────────────────────────────\n"
+        "Server (optional)\n"
+        "──────────────────────────────────────────────\n"
+        "  nk server [--preload MODEL]\n"
+        "      Stay resident on a Unix socket with templates and Whisper models\n"
+        "      loaded; nk hands note/study/search/media commands to it\n"
+        "\n"
+        "  nk server stop|status\n"
+        "      Stop the server / show uptime, commands served, loaded models\n"
+        "\n"
         "──────────────────────────────────────────────\n"
         "Automation (systemd)\n"
         "──────────────────────────────────────────────\n"
         "  nk autosetup systemd [vault-path] [interval]\n"
         "      Generate systemd service+timer for automatic processing\n"
         "\n"
-        "  nk autosetup systemd-activate [vault-path]\n"
+        "  nk autosetup systemd-activate [vault-path] [--watch]\n"
         "      Activate the generated systemd timer\n"
+        "      (--watch activates the event-driven watcher service instead)\n"
+        "\n"
+        "  nk watch [vault-path] [-m MODEL] [-T]\n"
+        "      Watch the inboxes (inotify) and process new media within seconds\n"
+        "\n"
+        "  nk scheduler add [vault-path] [--weight W] | remove [vault-path] | list\n"
+        "      Register vaults with the host scheduler (~/.config/nk/scheduler.json)\n"
+        "\n"
+        "  nk scheduler run [-m MODEL] [--workers N] [-T]\n"
+        "      One process for all registered vaults: one model (or one pool of N\n"
+        "      workers), weighted fair share between vaults, per-vault git sync\n"
+        "\n"
+        "  nk autosetup systemd-scheduler\n"
+        "      Install and start nk-scheduler.service in place of per-vault timers\n"
         "\n"
         "  nk auto status [vault-path]\n"
         "      Show systemd timer/service status and queues\n"
         "\n"
         "  nk auto queue [vault-path]\n"
-        "      Show counts of pending videos/audios in inbox\n"
+        "      Show pending, in-flight and failed media jobs, backlog age and\n"
+        "      throughput (from .nk/state.sqlite); pending files in planned order\n"
+        "      with estimated completion\n"
         "\n"
         "  nk auto run [vault-path]\n"
         "      Trigger an immediate processing run via systemd\n"
@@ -132,6 +253,19 @@ def usage():
         "\n"
         "  nk auto disable [vault-path]\n"
         "      Disable auto-processing timer\n"
+        "\n"
+        "  nk auto stats [vault-path] [--since 24h]\n"
+        "      Percentiles of per-stage times, inbox wait, real-time factor and\n"
+        "      git push over the metrics log (.nk/metrics.jsonl)\n"
+        "\n"
+        "  nk auto upgrade [vault-path] [-m MODEL] [--budget 10m] [--limit N]\n"
+        "      Re-transcribe archived media whose transcript came from another\n"
+        "      model (default: upgrade_model); hand-edited transcripts are kept\n"
+        "\n"
+        "  nk auto tick [vault-path]\n"
+        "      One automation run (what the timer calls): exits immediately when\n"
+        "      there is no media and nothing to push; otherwise pull, process, push\n"
+        "      (idle ticks run transcript upgrades when upgrade_model is set)\n"
     )
 
 def slugify(s: str) -> str:
@@ -199,6 +333,11 @@ def create_note_from_template(
     open_in_editor(note_path)
     return 0
 
+# Set by nk server while it runs a client's command: paths to open are
+# collected here and handed back to the client instead of spawning an editor.
+_EDITOR_HANDOFF: list[str] | None = None
+
+
 def open_in_editor(path: Path) -> None:
     """
     Open the given file in the user's preferred editor, if configured.
@@ -210,6 +349,10 @@ def open_in_editor(path: Path) -> None:
     If no editor is set, or the editor executable is not found,
     this is a no-op (with a warning in the latter case).
     """
+    if _EDITOR_HANDOFF is not None:
+        # Running inside nk server: the client opens the editor in its terminal
+        _EDITOR_HANDOFF.append(str(path))
+        return
     editor = os.environ.get("NK_EDITOR") or os.environ.get("EDITOR")
     if not editor:
         print(f"⚠️  Missing env var `NK_EDITOR`. Please add it.")
@@ -227,18 +370,35 @@ def load_note_template(name: str, vault_dir: Path) -> str | None:
     2) Kernel default
     Returns the template text or None if not found.
     """
-    # 1) Vault-specific
-    vault_tpl = vault_dir / "templates" / name
-    if vault_tpl.is_file():
-        return vault_tpl.read_text()
+    with trace_span(f"template {name}", "template"):
+        # 1) Vault-specific
+        vault_tpl = read_template_cached(vault_dir / "templates" / name)
+        if vault_tpl is not None:
+            return vault_tpl
 
-    # 2) Kernel default
-    kernel_dir = Path(__file__).resolve().parent
-    kernel_tpl = kernel_dir / "internals" / "templates" / "notes" / name
-    if kernel_tpl.is_file():
-        return kernel_tpl.read_text()
+        # 2) Kernel default
+        kernel_dir = Path(__file__).resolve().parent
+        return read_template_cached(kernel_dir / "internals" / "templates" / "notes" / name)
 
-    return None
+
+# path -> (mtime_ns, text); lets a long-lived process (nk server, bulk
+# imports) reuse templates without re-reading them, while still picking up edits.
+_TEMPLATE_CACHE: dict[Path, tuple[int, str]] = {}
+
+
+def read_template_cached(path: Path) -> str | None:
+    try:
+        mtime_ns = path.stat().st_mtime_ns
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    cached = _TEMPLATE_CACHE.get(path)
+    if cached and cached[0] == mtime_ns:
+        return cached[1]
+    if not path.is_file():
+        return None
+    text = path.read_text()
+    _TEMPLATE_CACHE[path] = (mtime_ns, text)
+    return text
 
 def load_systemd_template(name: str) -> str:
     """
@@ -297,9 +457,11 @@ def autosetup_systemd_generate(rest: list[str]) -> int:
 
     service_path = user_systemd / f"nk-{vault_id}.service"
     timer_path = user_systemd / f"nk-{vault_id}.timer"
+    watch_path = user_systemd / f"nk-{vault_id}-watch.service"
 
     service_tpl = load_systemd_template("nk-vault.service.tpl")
     timer_tpl = load_systemd_template("nk-vault.timer.tpl")
+    watch_tpl = load_systemd_template("nk-vault-watch.service.tpl")
 
     service_content = service_tpl.format(
         vault_path=str(vault),
@@ -318,30 +480,48 @@ def autosetup_systemd_generate(rest: list[str]) -> int:
         interval=interval,
     )
 
+    watch_content = watch_tpl.format(
+        vault_path=str(vault),
+        vault_id=vault_id,
+        nk_py=str(nk_py),
+        python_bin=python_bin,
+        python_dir=str(Path(python_bin).parent),
+    )
+
     service_path.write_text(service_content)
     timer_path.write_text(timer_content)
+    watch_path.write_text(watch_content)
 
     print("✅ Generated automation files:")
     print(f"  Runner script: {runner_script_path}")
     print(f"  Service unit:  {service_path}")
     print(f"  Timer unit:    {timer_path}")
+    print(f"  Watch unit:    {watch_path}")
     print()
     print("To activate this timer, run:")
     print(f"  nk autosetup systemd-activate {vault}")
+    print("Or, to process new media within seconds (event-driven), run:")
+    print(f"  nk autosetup systemd-activate {vault} --watch")
     return 0
 
 
 
 def autosetup_systemd_activate(rest: list[str]) -> int:
     """
-    nk autosetup systemd-activate [vault-path]
+    nk autosetup systemd-activate [vault-path] [--watch]
 
     Activates the systemd timer for the given vault by name:
       nk-<vault-id>.timer
 
+    With --watch, activates the event-driven watcher instead
+    (nk-<vault-id>-watch.service) and stops the timer it replaces.
+
     Assumes autosetup_systemd_generate was already run so that
     the .service and .timer files exist under ~/.config/systemd/user.
     """
+    rest, opts = split_args(rest)
+    if opts.get("--watch"):
+        return autosetup_systemd_activate_watch(rest)
     vault_raw = rest[0] if len(rest) >= 1 else "."
     vault = Path(normalize_path(vault_raw)).resolve()
     if not vault.exists():
@@ -386,62 +566,5020 @@ def autosetup_systemd_activate(rest: list[str]) -> int:
 
 
 
-def normalize_path(raw: str | None) -> str:
+def autosetup_systemd_activate_watch(rest: list[str]) -> int:
+    vault_raw = rest[0] if len(rest) >= 1 else "."
+    vault = Path(normalize_path(vault_raw)).resolve()
+    if not vault.exists():
+        print(f"Error: vault path does not exist: {vault}")
+        return 1
+
+    vault_id = vault.name
+    config_root = Path(os.environ.get("XDG_CONFIG_HOME", Path.home() / ".config"))
+    watch_path = config_root / "systemd" / "user" / f"nk-{vault_id}-watch.service"
+    if not watch_path.is_file():
+        print("Error: missing systemd unit file:")
+        print(f"  {watch_path}")
+        print("Run `nk autosetup systemd [vault-path] [interval]` first.")
+        return 1
+
+    try:
+        subprocess.run(["systemctl", "--user", "daemon-reload"], check=True)
+        subprocess.run(
+            ["systemctl", "--user", "enable", "--now", f"nk-{vault_id}-watch.service"],
+            check=True,
+        )
+        # The watcher replaces timer polling; stop the timer if it was on
+        subprocess.run(
+            ["systemctl", "--user", "disable", "--now", f"nk-{vault_id}.timer"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        print(f"✅ Activated watcher: nk-{vault_id}-watch.service for vault {vault}")
+    except Exception as e:
+        print(f"⚠️ Failed to activate watcher: {e}")
+        print("You can also try manually:")
+        print("  systemctl --user daemon-reload")
+        print(f"  systemctl --user enable --now nk-{vault_id}-watch.service")
+        return 1
+
+    return 0
+
+
+def autosetup_systemd_scheduler(rest: list[str]) -> int:
+    """
+    nk autosetup systemd-scheduler
+
+    Generate and start nk-scheduler.service: one host-level `nk scheduler
+    run` for every vault registered with `nk scheduler add`, replacing the
+    per-vault timers and watchers.
+    """
+    kernel_dir = Path(__file__).resolve().parent
+    python_bin = sys.executable
+    config_root = Path(os.environ.get("XDG_CONFIG_HOME", Path.home() / ".config"))
+    user_systemd = config_root / "systemd" / "user"
+    user_systemd.mkdir(parents=True, exist_ok=True)
+
+    unit_path = user_systemd / "nk-scheduler.service"
+    unit_path.write_text(load_systemd_template("nk-scheduler.service.tpl").format(
+        nk_py=str(kernel_dir / "nk.py"),
+        python_bin=python_bin,
+        python_dir=str(Path(python_bin).parent),
+    ))
+    print(f"✅ Generated scheduler unit: {unit_path}")
+
+    config = load_scheduler_config()
+    if not config["vaults"]:
+        print("⚠️  No vaults registered yet; add them with `nk scheduler add [vault-path]`.")
+    try:
+        subprocess.run(["systemctl", "--user", "daemon-reload"], check=True)
+        subprocess.run(["systemctl", "--user", "enable", "--now", "nk-scheduler.service"], check=True)
+        for raw in config["vaults"]:
+            vault_id = Path(raw).name
+            for unit in (f"nk-{vault_id}.timer", f"nk-{vault_id}-watch.service"):
+                subprocess.run(
+                    ["systemctl", "--user", "disable", "--now", unit],
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                )
+        print(f"✅ Activated nk-scheduler.service for {len(config['vaults'])} vault(s)")
+    except Exception as e:
+        print(f"⚠️ Failed to activate scheduler: {e}")
+        print("You can also try manually:")
+        print("  systemctl --user daemon-reload")
+        print("  systemctl --user enable --now nk-scheduler.service")
+        return 1
+    return 0
+
+
+def normalize_path(raw: str | None) -> str:
+    """
+    - None / "" / "." -> "."
+    - "~" / "~/..."  -> expanded to $HOME
+    - other paths -> absolute path via resolve()
+    """
+    if not raw or raw == ".":
+        return "."
+    p = Path(raw).expanduser()
+    # resolve() with strict=False: ok if path doesn't exist yet
+    try:
+        p = p.resolve(strict=False)
+    except TypeError:
+        # older Python: resolve() without strict kw arg
+        p = p.resolve()
+    return str(p)
+
+
+def run_script(script_name: str, *args: str) -> int:
+    print("nk.py - run_script start...")
+    kernel_dir = Path(__file__).resolve().parent
+    script = kernel_dir / "internals" / script_name
+    if not script.exists():
+        print(f"Error: {script_name} not found in {kernel_dir}")
+        return 1
+    
+    cmd = [str(script), *[str(a) for a in args]]
+    print(f"nk.py - cmd ready: {cmd}")
+
+    try:
+        # keep strict behavior: non-zero exit → CalledProcessError
+        print("nk.py - calling cmd...")
+        result = subprocess.run(cmd, check=True)
+        print(f"nk.py - cmd result: {result}")
+        return result.returncode
+    except KeyboardInterrupt:
+        # User hit Ctrl+C (e.g. stop ffmpeg).
+        # At this point the child has already handled SIGINT and flushed output.
+        # We treat this as a normal, intentional stop.
+        return 0
+    except subprocess.CalledProcessError as e:
+        print("❌ nk.py - cmd failed!")
+        print(f"   Command: {e.cmd}")
+        print(f"   Exit code: {e.returncode}")
+
+        # stderr
+        if e.stderr:
+            print("   --- STDERR ---")
+            print(e.stderr.decode().strip())
+
+        # stdout
+        if e.output:
+            print("   --- STDOUT ---")
+            print(e.output.decode().strip())
+
+        return e.returncode
+
+
+def split_args(
+    rest: list[str], value_opts: set[str] | None = None
+) -> tuple[list[str], dict[str, str | bool]]:
+    """
+    Split a command's args into positionals and options.
+
+    - "-x" / "--flag"        -> opts["-x"] = True
+    - "-m small" (value_opts) -> opts["-m"] = "small"
+    - "--opt=value"          -> opts["--opt"] = "value"
+
+    A value option with no value after it is a usage error (exit 1).
+    """
+    value_opts = value_opts or set()
+    positionals: list[str] = []
+    opts: dict[str, str | bool] = {}
+    i = 0
+    while i < len(rest):
+        arg = rest[i]
+        if arg.startswith("-") and arg != "-" and len(arg) > 1:
+            if "=" in arg and arg.startswith("--"):
+                key, value = arg.split("=", 1)
+                opts[key] = value
+            elif arg in value_opts:
+                value = rest[i + 1] if i + 1 < len(rest) else None
+                if value is None or re.fullmatch(r"--?[A-Za-z].*", value):
+                    print(f"Usage error: {arg} needs a value")
+                    raise SystemExit(1)
+                opts[arg] = value
+                i += 1
+            else:
+                opts[arg] = True
+        else:
+            positionals.append(arg)
+        i += 1
+    return positionals, opts
+
+
+def number_arg(value, name: str, kind=int):
+    """
+    Parse a numeric option (or its env/config fallback). A bad value is a
+    usage error (exit 1), not a ValueError traceback.
+    """
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        expected = "a whole number" if kind is int else "a number"
+        print(f"Usage error: {name} expects {expected}, got '{value}'")
+        raise SystemExit(1)
+
+
+# Settings already reported as bad, so a hot path warns once per process
+_BAD_SETTINGS: set[str] = set()
+
+
+def setting_number(raw, name: str, default, kind=float):
+    """
+    Parse a numeric setting from the environment or .nk/config.json. These
+    are read on unattended paths (timer, watcher, scheduler, pool workers),
+    so a bad value is reported once and the default is used instead of
+    stopping the run. `kind` may be any parser, e.g. parse_window.
+    """
+    if raw is None or raw == "":
+        return default
+    try:
+        return kind(raw)
+    except (TypeError, ValueError):
+        if name not in _BAD_SETTINGS:
+            _BAD_SETTINGS.add(name)
+            expected = {int: "a whole number", float: "a number"}.get(kind, "a duration like 90m, 24h or 7d")
+            print(f"⚠️  Ignoring {name}={raw!r}: expected {expected}; using {default}")
+        return default
+
+
+def env_number(name: str, default, kind=float):
+    """setting_number for an NK_* environment variable."""
+    return setting_number(os.environ.get(name), name, default, kind)
+
+
+# === Profiling (NK_PROFILE=1 / --profile) ===
+
+# Chrome trace events collected while profiling; None when off, so every
+# hook below costs one global lookup in normal runs.
+_TRACE: list[dict] | None = None
+_TRACE_STATE: dict = {}
+
+
+def _trace_now_us() -> int:
+    # Wall clock, so events from pool workers line up with the parent's
+    return time.time_ns() // 1000
+
+
+class _TraceSpan:
+    def __init__(self, name: str, cat: str, args: dict):
+        self.name, self.cat, self.args = name, cat, args
+
+    def __enter__(self):
+        self.start = _trace_now_us()
+        return self
+
+    def __exit__(self, *exc):
+        import threading
+
+        if _TRACE is not None:
+            _TRACE.append({
+                "name": self.name, "cat": self.cat, "ph": "X",
+                "ts": self.start, "dur": _trace_now_us() - self.start,
+                "pid": os.getpid(), "tid": threading.get_native_id(), "args": self.args,
+            })
+        return False
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def trace_span(name: str, cat: str = "nk", **args):
+    """Context manager recording a complete event while profiling is on."""
+    if _TRACE is None:
+        return _NO_SPAN
+    return _TraceSpan(name, cat, args)
+
+
+def _traced_popen_class(base):
+    """
+    Popen subclass that records each child process (subprocess.run goes
+    through Popen too) from spawn to reap, with the command line and the
+    child's CPU time.
+    """
+    import resource
+
+    class TracedPopen(base):
+        def __init__(self, args, *a, **kw):
+            self._nk_start = _trace_now_us()
+            self._nk_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+            self._nk_traced = False
+            super().__init__(args, *a, **kw)
+
+        def _nk_record(self):
+            import threading
+
+            if self._nk_traced or self.returncode is None or _TRACE is None:
+                return
+            self._nk_traced = True
+            usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+            argv = [self.args] if isinstance(self.args, (str, bytes)) else list(self.args)
+            _TRACE.append({
+                "name": f"{Path(str(argv[0])).name} {' '.join(str(a) for a in argv[1:3])}".strip(),
+                "cat": "subprocess", "ph": "X",
+                "ts": self._nk_start, "dur": _trace_now_us() - self._nk_start,
+                "pid": os.getpid(), "tid": threading.get_native_id(),
+                "args": {
+                    "argv": [str(a) for a in argv],
+                    "child_pid": self.pid,
+                    "returncode": self.returncode,
+                    # Approximate when several children run at once
+                    "child_user_s": round(usage.ru_utime - self._nk_usage.ru_utime, 4),
+                    "child_sys_s": round(usage.ru_stime - self._nk_usage.ru_stime, 4),
+                },
+            })
+
+        def wait(self, timeout=None):
+            rc = super().wait(timeout)
+            self._nk_record()
+            return rc
+
+        def poll(self):
+            rc = super().poll()
+            self._nk_record()
+            return rc
+
+    return TracedPopen
+
+
+def profile_output_path() -> Path:
+    raw = os.environ.get("NK_PROFILE_DIR")
+    root = Path(raw).expanduser() if raw else (
+        Path(os.environ.get("NK_LOCAL_ARCHIVE_ROOT") or Path.home() / ".nk-archive") / ".profiles"
+    )
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    return root / f"nk-{stamp}-{os.getpid()}.trace.json"
+
+
+def profile_start(with_cprofile: bool = True) -> None:
+    """
+    Start collecting trace events; also used by pool workers
+    (with_cprofile=False), which hand their events back with each job.
+    """
+    global _TRACE
+    if _TRACE is not None:
+        return
+    _TRACE = []
+    _TRACE_STATE["popen"] = subprocess.Popen
+    subprocess.Popen = _traced_popen_class(subprocess.Popen)
+    if with_cprofile:
+        import cProfile
+
+        _TRACE_STATE["cprofile"] = cProfile.Profile()
+        _TRACE_STATE["cprofile"].enable()
+
+
+def profile_take_events() -> list[dict]:
+    """Hand over the events collected so far (pool workers, per job)."""
+    if _TRACE is None:
+        return []
+    events = _TRACE[:]
+    _TRACE.clear()
+    return events
+
+
+def profile_finish(argv: list[str]) -> Path | None:
+    """
+    Stop profiling and write the Chrome trace (chrome://tracing, Perfetto)
+    plus a .prof file with the full cProfile stats for pstats/snakeviz.
+    """
+    global _TRACE
+
+    if _TRACE is None:
+        return None
+    profiler = _TRACE_STATE.pop("cprofile", None)
+    if profiler is not None:
+        profiler.disable()
+    events, _TRACE = _TRACE, None
+    subprocess.Popen = _TRACE_STATE.pop("popen")
+
+    import io
+    import pstats
+
+    out = profile_output_path()
+    out.parent.mkdir(parents=True, exist_ok=True)
+    top: list[dict] = []
+    if profiler is not None:
+        profiler.dump_stats(str(out.with_suffix("").with_suffix(".prof")))
+        stats = pstats.Stats(profiler, stream=io.StringIO()).sort_stats("cumulative")
+        for (filename, line, func), (cc, nc, tt, ct, _) in list(stats.stats.items()):
+            top.append({
+                "function": f"{func} ({Path(filename).name}:{line})",
+                "calls": nc, "self_s": round(tt, 6), "cumulative_s": round(ct, 6),
+            })
+        top.sort(key=lambda r: -r["cumulative_s"])
+        top = top[:40]
+
+    meta = [
+        {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": "nk" if pid == os.getpid() else f"nk worker {pid}"}}
+        for pid in sorted({e["pid"] for e in events})
+    ]
+    out.write_text(json.dumps({
+        "traceEvents": meta + events,
+        "displayTimeUnit": "ms",
+        "otherData": {"argv": argv, "cprofile_top": top},
+    }))
+    return out
+
+
+# === Whisper engine (in-process) ===
+
+DEFAULT_WHISPER_MODEL = "base"
+
+
+def local_archive_dir(vault: Path, kind: str) -> Path:
+    """
+    Local archive outside Git for processed media:
+      $NK_LOCAL_ARCHIVE_ROOT/<vault-name>/<kind>
+
+    NK_LOCAL_ARCHIVE_ROOT defaults to ~/.nk-archive (same as the shell scripts).
+    """
+    safe_vault_name = vault.resolve().name.replace(" ", "_")
+    return archive_root() / safe_vault_name / kind
+
+
+def load_whisper_model(model_name: str):
+    """
+    Import whisper (and torch) and load the given model.
+
+    Returns (model, import_seconds, load_seconds), or None if openai-whisper
+    is not installed. Callers load the model once and reuse it for a batch.
+    """
+    t0 = time.perf_counter()
+    try:
+        import whisper
+    except ImportError:
+        print("Error: 'whisper' module not found. Install openai-whisper (pip install openai-whisper).")
+        return None
+    t1 = time.perf_counter()
+    model = whisper.load_model(model_name)
+    t2 = time.perf_counter()
+    return model, t1 - t0, t2 - t1
+
+
+TRANSCRIPTION_BACKENDS = ("whisper", "faster-whisper")
+DEFAULT_CT2_COMPUTE_TYPE = "int8"
+
+
+def split_model_spec(spec: str) -> tuple[str, str]:
+    """
+    "faster-whisper:small" -> ("faster-whisper", "small"). A bare model name
+    runs on openai-whisper, so existing cache keys and speeds stay valid.
+    """
+    backend, sep, name = spec.partition(":")
+    if sep and backend in TRANSCRIPTION_BACKENDS:
+        return backend, name
+    return "whisper", spec
+
+
+def model_spec(backend: str, name: str) -> str:
+    return name if backend == "whisper" else f"{backend}:{name}"
+
+
+class FasterWhisperModel:
+    """
+    faster-whisper behind openai-whisper's interface: transcribe(PCM or
+    path) returns {text, segments: [{start, end, text}], language}.
+    """
+
+    device = None
+
+    def __init__(self, model):
+        self.model = model
+
+    def transcribe(self, audio, task: str = "transcribe", fp16: bool = False, verbose=None, **options) -> dict:
+        segments, info = self.model.transcribe(audio, task=task, **options)
+        # Segments are decoded lazily, while iterating
+        segs = [{"start": seg.start, "end": seg.end, "text": seg.text} for seg in segments]
+        return {"text": "".join(seg["text"] for seg in segs), "segments": segs, "language": info.language}
+
+
+def load_faster_whisper_model(model_name: str):
+    """
+    Load a model on the CTranslate2 engine (faster-whisper): the same
+    Whisper weights, quantized to NK_COMPUTE_TYPE (int8 by default), which
+    on CPU is several times faster than full-precision torch. Threads follow
+    OMP_NUM_THREADS (set per worker by set_torch_threads).
+
+    Returns (model, import_seconds, load_seconds), or None if faster-whisper
+    is not installed or the model cannot be loaded (unknown name, failed
+    download, compute type the device does not support).
+    """
+    t0 = time.perf_counter()
+    try:
+        import faster_whisper
+    except ImportError:
+        print("Error: 'faster_whisper' module not found. Install faster-whisper (pip install faster-whisper).")
+        return None
+    t1 = time.perf_counter()
+    try:
+        model = faster_whisper.WhisperModel(
+            model_name,
+            device=os.environ.get("NK_DEVICE") or "auto",
+            compute_type=os.environ.get("NK_COMPUTE_TYPE") or DEFAULT_CT2_COMPUTE_TYPE,
+        )
+    except Exception as e:
+        print(f"Error: could not load faster-whisper model '{model_name}': {e}")
+        return None
+    t2 = time.perf_counter()
+    return FasterWhisperModel(model), t1 - t0, t2 - t1
+
+
+BACKEND_LOADERS = {"whisper": load_whisper_model, "faster-whisper": load_faster_whisper_model}
+
+
+def load_transcription_model(spec: str):
+    backend, name = split_model_spec(spec)
+    return BACKEND_LOADERS[backend](name)
+
+
+def transcribe_audio(model, audio, task: str = "transcribe", **options) -> dict:
+    """
+    Run one transcription through an already loaded model.
+
+    `audio` is anything whisper's transcribe() accepts (path or PCM array);
+    extra options (e.g. initial_prompt) are passed through. Works the same
+    for every backend (see load_transcription_model).
+    Returns whisper's result dict (text, segments, language).
+    """
+    device = getattr(model, "device", None)
+    fp16 = device is not None and device.type != "cpu"
+    if isinstance(audio, Path):
+        audio = str(audio)
+    with trace_span("whisper transcribe", "whisper", task=task):
+        return model.transcribe(audio, task=task, fp16=fp16, verbose=None, **options)
+
+
+class WhisperModel:
+    """
+    A Whisper model loaded on first use and kept for the rest of the run,
+    so batches where every file is a cache hit never pay for the load.
+    `name` is a model spec ([backend:]model); it keys the transcript cache,
+    measured speeds and transcript provenance.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.model = None
+        self.failed = False
+        self.import_s = 0.0
+        self.load_s = 0.0
+
+    def get(self):
+        if self.model is None:
+            if self.failed:
+                raise RuntimeError(f"whisper model '{self.name}' is unavailable")
+            print(f"Loading whisper model '{self.name}'...")
+            with trace_span(f"load model {self.name}", "whisper"):
+                loaded = load_transcription_model(self.name)
+            if loaded is None:
+                self.failed = True
+                raise RuntimeError(f"whisper model '{self.name}' is unavailable")
+            self.model, self.import_s, self.load_s = loaded
+            print(f"✅ Model ready ({self.import_s + self.load_s:.1f}s)")
+        return self.model
+
+
+# Models kept loaded for the lifetime of the process (reused across
+# batches by nk watch and across requests by nk server)
+_RESIDENT_MODELS: dict[str, WhisperModel] = {}
+
+
+def resident_model(name: str) -> WhisperModel:
+    if name not in _RESIDENT_MODELS or _RESIDENT_MODELS[name].failed:
+        _RESIDENT_MODELS[name] = WhisperModel(name)
+    return _RESIDENT_MODELS[name]
+
+
+# === Transcript cache (content-addressed) ===
+
+DEFAULT_CACHE_MAX_MB = 512
+
+
+def transcript_cache_enabled() -> bool:
+    return os.environ.get("NK_CACHE", "1") != "0"
+
+
+def transcript_cache_dir() -> Path:
+    """
+    Shared across vaults, next to the local media archive:
+      $NK_CACHE_DIR, else $NK_LOCAL_ARCHIVE_ROOT/.cache (~/.nk-archive/.cache)
+    """
+    raw = os.environ.get("NK_CACHE_DIR")
+    if raw:
+        return Path(raw).expanduser()
+    root = Path(os.environ.get("NK_LOCAL_ARCHIVE_ROOT") or Path.home() / ".nk-archive")
+    return root / ".cache"
+
+
+def open_transcript_cache():
+    import sqlite3
+
+    cache_dir = transcript_cache_dir()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(cache_dir / "transcripts.sqlite", timeout=30)
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS entries (
+            audio_hash TEXT NOT NULL,
+            model      TEXT NOT NULL,
+            task       TEXT NOT NULL,
+            size       INTEGER NOT NULL,
+            created    REAL NOT NULL,
+            last_used  REAL NOT NULL,
+            result     TEXT NOT NULL,
+            PRIMARY KEY (audio_hash, model, task)
+        );
+        CREATE INDEX IF NOT EXISTS entries_lru ON entries(last_used);
+        CREATE TABLE IF NOT EXISTS counters (
+            name  TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        """
+    )
+    return conn
+
+
+def pcm_hash(pcm) -> str:
+    """Content hash of decoded audio (independent of container/encoding)."""
+    return hashlib.sha256(pcm.tobytes()).hexdigest()
+
+
+def _bump_counter(conn, name: str, by: int = 1) -> None:
+    conn.execute(
+        "INSERT INTO counters(name, value) VALUES (?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+        (name, by),
+    )
+
+
+def transcript_cache_get(audio_hash: str, model_name: str, task: str) -> dict | None:
+    conn = open_transcript_cache()
+    with conn:
+        row = conn.execute(
+            "SELECT result FROM entries WHERE audio_hash = ? AND model = ? AND task = ?",
+            (audio_hash, model_name, task),
+        ).fetchone()
+        if row is None:
+            _bump_counter(conn, "misses")
+        else:
+            _bump_counter(conn, "hits")
+            conn.execute(
+                "UPDATE entries SET last_used = ? WHERE audio_hash = ? AND model = ? AND task = ?",
+                (time.time(), audio_hash, model_name, task),
+            )
+    conn.close()
+    return json.loads(row[0]) if row else None
+
+
+def transcript_cache_put(audio_hash: str, model_name: str, task: str, result: dict) -> None:
+    """
+    Store a result and evict least-recently-used entries until the cache fits
+    in NK_CACHE_MAX_MB.
+    """
+    payload = json.dumps(result, ensure_ascii=False)
+    max_bytes = int(env_number("NK_CACHE_MAX_MB", float(DEFAULT_CACHE_MAX_MB)) * 1024 * 1024)
+    now = time.time()
+    conn = open_transcript_cache()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (audio_hash, model_name, task, len(payload.encode()), now, now, payload),
+        )
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total > max_bytes:
+            evicted = 0
+            for h, m, t, size in conn.execute(
+                "SELECT audio_hash, model, task, size FROM entries ORDER BY last_used"
+            ).fetchall():
+                if total <= max_bytes:
+                    break
+                conn.execute(
+                    "DELETE FROM entries WHERE audio_hash = ? AND model = ? AND task = ?", (h, m, t)
+                )
+                total -= size
+                evicted += 1
+            _bump_counter(conn, "evictions", evicted)
+    conn.close()
+
+
+def compact_result(result: dict) -> dict:
+    """Keep only what transcripts need (drops tokens, logprobs, ...)."""
+    return {
+        "text": result.get("text", ""),
+        "language": result.get("language"),
+        "segments": [
+            {"start": seg["start"], "end": seg["end"], "text": seg["text"]}
+            for seg in result.get("segments", [])
+        ],
+    }
+
+
+def transcribe_pcm(
+    model: WhisperModel, pcm, task: str = "transcribe", checkpoint: Path | None = None
+) -> tuple[dict, bool]:
+    """
+    Transcribe decoded 16 kHz PCM, answering from the transcript cache when
+    the same audio was already transcribed with this model and task.
+
+    Recordings longer than one window are transcribed window by window with
+    progress saved to `checkpoint` (see transcribe_windows), so an
+    interrupted run resumes where it stopped.
+    Returns (result, cache_hit).
+    """
+    use_cache = transcript_cache_enabled()
+    audio_hash = pcm_hash(pcm)
+    if use_cache:
+        with trace_span("transcript cache lookup", "cache"):
+            cached = transcript_cache_get(audio_hash, model.name, task)
+        if cached is not None:
+            return cached, True
+
+    if checkpoint is not None and len(pcm) > checkpoint_window_seconds() * WHISPER_SAMPLE_RATE:
+        result = transcribe_windows(model, pcm, task, checkpoint, audio_hash)
+    else:
+        result = compact_result(transcribe_audio(model.get(), pcm, task))
+    if use_cache:
+        transcript_cache_put(audio_hash, model.name, task, result)
+    return result, False
+
+
+# === File moves (link, reflink, copy_file_range) ===
+
+FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+COPY_CHUNK_BYTES = 64 * 1024 * 1024
+COPY_PROGRESS_SECONDS = 5.0
+
+
+def fsync_dir(path: Path) -> None:
+    """Make a rename or unlink in `path` survive a power loss."""
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_durable(dst: Path, text: str) -> None:
+    """Replace a small text file atomically: temp file, fsync, rename, fsync the directory."""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f".{dst.name}.tmp")
+    with open(tmp, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    tmp.replace(dst)
+    fsync_dir(dst.parent)
+
+
+def copy_file_data(src_fd: int, dst_fd: int, size: int, label: str) -> str:
+    """
+    Copy a whole file between descriptors without going through Python
+    buffers: reflink (shared extents on btrfs/XFS, no data copied), else
+    copy_file_range (in-kernel, server-side on NFS), else sendfile. Prints
+    progress every few seconds for big files. Returns the method used.
+    """
+    import errno
+    import fcntl
+
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return "reflink"
+    except OSError:
+        pass
+    method = "copy_file_range" if hasattr(os, "copy_file_range") else "sendfile"
+    copied = 0
+    t0 = last = time.perf_counter()
+    while copied < size:
+        chunk = min(size - copied, COPY_CHUNK_BYTES)
+        if method == "copy_file_range":
+            try:
+                n = os.copy_file_range(src_fd, dst_fd, chunk)
+            except OSError as e:
+                # Older kernels refuse cross-filesystem copy_file_range
+                if copied == 0 and e.errno in (errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL):
+                    method = "sendfile"
+                    continue
+                raise
+        else:
+            n = os.sendfile(dst_fd, src_fd, None, chunk)
+        if n == 0:
+            raise OSError(f"{label} shrank while it was being copied")
+        copied += n
+        now = time.perf_counter()
+        if now - last >= COPY_PROGRESS_SECONDS and copied < size:
+            last = now
+            print(f"   … {label}: {copied / 1e9:.1f} of {size / 1e9:.1f} GB "
+                  f"({copied / 1e6 / (now - t0):.0f} MB/s)")
+    return method
+
+
+def place_file(src: Path, dst: Path) -> tuple[str, int, float]:
+    """
+    Make `dst` a durable copy of `src`, leaving `src` where it is.
+
+    On one filesystem `dst` is a hard link (no data copied); across
+    filesystems the data goes through copy_file_data into <dst>.part, which
+    is fsynced and renamed. Either way `dst` appears complete or not at
+    all, and its directory is fsynced, so a run killed halfway leaves at
+    most a .part file next to an untouched original.
+    Returns (method, bytes, seconds).
+    """
+    t0 = time.perf_counter()
+    st = src.stat()
+    part = dst.with_name(f"{dst.name}.part")
+    part.unlink(missing_ok=True)  # left by a run that died mid-copy
+    with trace_span(f"place {src.name}", "io"):
+        try:
+            os.link(src, part)
+            method = "link"
+            fd = os.open(part, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError:
+            try:
+                with open(src, "rb") as fsrc, open(part, "wb") as fdst:
+                    method = copy_file_data(fsrc.fileno(), fdst.fileno(), st.st_size, src.name)
+                    os.fsync(fdst.fileno())
+                os.utime(part, ns=(st.st_atime_ns, st.st_mtime_ns))
+            except BaseException:
+                part.unlink(missing_ok=True)
+                raise
+        part.replace(dst)
+        fsync_dir(dst.parent)
+    return method, st.st_size, time.perf_counter() - t0
+
+
+def format_move(method: str, size: int, seconds: float) -> str:
+    if method == "link":
+        return "hard link, no copy"
+    rate = size / 1e6 / seconds if seconds > 0 else float("inf")
+    return f"{method}, {size / 1e6:.1f} MB in {seconds:.2f}s ({rate:.0f} MB/s)"
+
+
+# === Media archive (content-addressed store) ===
+
+ARCHIVE_KINDS = ("videos", "audios")
+ARCHIVE_AUDIO_FORMATS = ("original", "opus")
+DEFAULT_ARCHIVE_OPUS_BITRATE = "24k"
+ARCHIVE_SETTLE_SECONDS = 60
+ARCHIVE_STALE_TMP_SECONDS = 3600
+
+
+def archive_root() -> Path:
+    return Path(os.environ.get("NK_LOCAL_ARCHIVE_ROOT") or Path.home() / ".nk-archive")
+
+
+def archive_store_dir() -> Path:
+    """Blobs shared by every vault: $NK_LOCAL_ARCHIVE_ROOT/.store"""
+    return archive_root() / ".store"
+
+
+def open_archive_store():
+    """
+    blobs:    one row per distinct recording, keyed by the SHA-256 of the
+              file as it was archived; `path` is the stored file under
+              .store/blobs (the original, or its Opus transcode)
+    manifest: each vault's archived names, pointing at blobs
+    """
+    import sqlite3
+
+    store = archive_store_dir()
+    store.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(store / "archive.sqlite", timeout=60)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=FULL")
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS blobs (
+            hash          TEXT PRIMARY KEY,
+            path          TEXT NOT NULL,
+            size          INTEGER NOT NULL,
+            original_size INTEGER NOT NULL,
+            codec         TEXT NOT NULL,
+            created_at    REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS manifest (
+            vault       TEXT NOT NULL,
+            kind        TEXT NOT NULL,
+            name        TEXT NOT NULL,
+            hash        TEXT NOT NULL,
+            archived_at REAL NOT NULL,
+            PRIMARY KEY (vault, kind, name)
+        );
+        CREATE INDEX IF NOT EXISTS manifest_hash ON manifest(hash);
+        """
+    )
+    return conn
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def archive_audio_format() -> str:
+    """NK_ARCHIVE_AUDIO: keep archived audio as-is ("original") or as 16 kHz mono Opus."""
+    fmt = os.environ.get("NK_ARCHIVE_AUDIO") or "original"
+    if fmt not in ARCHIVE_AUDIO_FORMATS:
+        print(f"⚠️  Unknown NK_ARCHIVE_AUDIO '{fmt}' (expected {', '.join(ARCHIVE_AUDIO_FORMATS)}); keeping originals.")
+        return "original"
+    return fmt
+
+
+def transcode_opus(src: Path, dst: Path) -> None:
+    """16 kHz mono Opus: what Whisper decodes to anyway, at a fraction of the size."""
+    bitrate = os.environ.get("NK_ARCHIVE_OPUS_BITRATE") or DEFAULT_ARCHIVE_OPUS_BITRATE
+    with trace_span(f"opus {src.name}", "subprocess"):
+        proc = subprocess.run(
+            ["ffmpeg", "-nostdin", "-loglevel", "error", "-y", "-i", str(src),
+             "-map", "a:0", "-vn", "-ac", "1", "-ar", str(WHISPER_SAMPLE_RATE),
+             "-c:a", "libopus", "-b:a", bitrate, "-application", "voip", "-f", "ogg", str(dst)],
+            capture_output=True,
+        )
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {proc.stderr.decode(errors='replace').strip()}")
+
+
+def stage_blob(src: Path, blobs_dir: Path, digest: str, kind: str, name: str) -> tuple[Path, str, Path]:
+    """
+    Put a durable copy of `src` next to its final blob path, outside any
+    lock; `src` itself stays until the manifest is committed. Returns
+    (staged temp file, codec, final blob path). Audio is transcoded when
+    NK_ARCHIVE_AUDIO=opus and that makes it smaller; otherwise the original
+    is linked (or copied across filesystems) with place_file.
+    """
+    tmp = blobs_dir / f".{digest}.{os.getpid()}.tmp"
+    codec = "original"
+    if kind == "audios" and archive_audio_format() == "opus":
+        try:
+            transcode_opus(src, tmp)
+            if tmp.stat().st_size < src.stat().st_size:
+                with open(tmp, "rb") as f:
+                    os.fsync(f.fileno())
+                return tmp, "opus", blobs_dir / f"{digest}.opus"
+            codec = "kept"  # already compact: gc will not try again
+        except (OSError, RuntimeError) as e:
+            print(f"⚠️  Keeping the original of {name}: Opus transcode failed: {e}")
+        tmp.unlink(missing_ok=True)
+    method, size, seconds = place_file(src, tmp)
+    if method != "link":
+        print(f"   ↳ {name}: {format_move(method, size, seconds)}")
+    return tmp, codec, blobs_dir / f"{digest}{Path(name).suffix.lower()}"
+
+
+def archive_store_put(vault_key: str, kind: str, name: str, src: Path) -> None:
+    """
+    Store `src` as <vault_key>/<kind>/<name>. Content already in the store,
+    from any vault, is not stored again: only a manifest row is added and
+    `src` is removed. Blob placement and manifest rows change under one
+    BEGIN IMMEDIATE, the same lock `nk archive gc` holds while it deletes,
+    so a blob is never collected between being found and being referenced.
+    `src` is removed only after the commit: a run that dies before it leaves
+    the original in place (and at worst a temp blob for gc), never neither.
+    """
+    store = archive_store_dir()
+    digest = file_sha256(src)
+    original_size = src.stat().st_size
+    blobs_dir = store / "blobs" / digest[:2]
+    blobs_dir.mkdir(parents=True, exist_ok=True)
+    conn = open_archive_store()
+    staged = None
+    try:
+        known = conn.execute("SELECT path FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        if known is None or not (store / known[0]).exists():
+            staged, codec, final = stage_blob(src, blobs_dir, digest, kind, name)
+        conn.execute("BEGIN IMMEDIATE")
+        known = conn.execute("SELECT path FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        if known is not None and (store / known[0]).exists():
+            if staged is not None:
+                staged.unlink(missing_ok=True)
+                staged = None
+        else:
+            if staged is None:  # collected by a concurrent gc since the first look
+                staged, codec, final = stage_blob(src, blobs_dir, digest, kind, name)
+            staged.replace(final)
+            fsync_dir(blobs_dir)
+            staged = final
+            conn.execute(
+                "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)",
+                (digest, str(final.relative_to(store)), final.stat().st_size, original_size, codec, time.time()),
+            )
+        conn.execute(
+            "INSERT OR REPLACE INTO manifest VALUES (?, ?, ?, ?, ?)",
+            (vault_key, kind, name, digest, time.time()),
+        )
+        # A loose file of the same name from before the store is superseded, as a move would have
+        loose = archive_root() / vault_key / kind / name
+        if loose != src:
+            loose.unlink(missing_ok=True)
+        conn.commit()
+        staged = None
+    except BaseException:
+        conn.rollback()
+        if staged is not None:
+            staged.unlink(missing_ok=True)
+        raise
+    finally:
+        conn.close()
+    src.unlink(missing_ok=True)
+    fsync_dir(src.parent)
+
+
+def archive_media(vault: Path, src: Path, kind: str, name: str | None = None) -> Path:
+    """
+    Archive a processed file in the content-addressed store under the vault's
+    manifest. Returns its archive path, $NK_LOCAL_ARCHIVE_ROOT/<vault>/<kind>/<name>,
+    which is what transcript provenance records; archive_resolve maps it to
+    the stored file.
+    """
+    archived = local_archive_dir(vault, kind) / (name or src.name)
+    archive_store_put(archived.parent.parent.name, kind, archived.name, src)
+    return archived
+
+
+def archive_resolve(archived: Path) -> Path | None:
+    """The file behind an archive path: a loose file from before the store, else its blob."""
+    import sqlite3
+
+    if archived.exists():
+        return archived
+    try:
+        conn = open_archive_store()
+        row = conn.execute(
+            "SELECT b.path FROM manifest m JOIN blobs b ON b.hash = m.hash "
+            "WHERE m.vault = ? AND m.kind = ? AND m.name = ?",
+            (archived.parent.parent.name, archived.parent.name, archived.name),
+        ).fetchone()
+        conn.close()
+    except sqlite3.Error:
+        return None
+    if row is None:
+        return None
+    blob = archive_store_dir() / row[0]
+    return blob if blob.exists() else None
+
+
+def archived_media(vault: Path, kind: str) -> list[tuple[Path, Path]]:
+    """(archive path, stored file) for everything the vault archived as `kind`, newest first."""
+    import sqlite3
+
+    archive = local_archive_dir(vault, kind)
+    found: list[tuple[float, Path, Path]] = []
+    try:
+        conn = open_archive_store()
+        rows = conn.execute(
+            "SELECT m.name, b.path, m.archived_at FROM manifest m JOIN blobs b ON b.hash = m.hash "
+            "WHERE m.vault = ? AND m.kind = ?",
+            (archive.parent.name, kind),
+        ).fetchall()
+        conn.close()
+    except sqlite3.Error:
+        rows = []
+    store = archive_store_dir()
+    found += [(at, archive / name, store / path) for name, path, at in rows if (store / path).exists()]
+    found += [(p.stat().st_mtime, p, p) for p in loose_archive_files(archive.parent.name) if p.parent.name == kind]
+    return [(archived, stored) for _, archived, stored in sorted(found, key=lambda f: -f[0])]
+
+
+def loose_archive_files(vault_key: str | None = None, settle_s: float = 0) -> list[Path]:
+    """
+    Files sitting directly in $NK_LOCAL_ARCHIVE_ROOT/<vault>/{videos,audios}:
+    archived before the store existed, or moved there by the shell scripts.
+    Temp, partial and claim files, and files younger than `settle_s`, are left
+    alone.
+    """
+    root = archive_root()
+    if vault_key is not None:
+        keys = [vault_key]
+    elif root.is_dir():
+        keys = sorted(d.name for d in root.iterdir() if d.is_dir() and not d.name.startswith("."))
+    else:
+        keys = []
+    now = time.time()
+    files = []
+    for key in keys:
+        for kind in ARCHIVE_KINDS:
+            kind_dir = root / key / kind
+            if not kind_dir.is_dir():
+                continue
+            for p in sorted(kind_dir.iterdir()):
+                if p.name.startswith(".") or p.name.endswith(".claim") or not p.is_file():
+                    continue
+                if now - p.stat().st_mtime < settle_s:
+                    continue
+                files.append(p)
+    return files
+
+
+def archive_adopt(vault_key: str | None = None, settle_s: float = ARCHIVE_SETTLE_SECONDS, dry_run: bool = False) -> tuple[int, int]:
+    """Move loose archive files into the store. Returns (files, bytes)."""
+    files = loose_archive_files(vault_key, settle_s)
+    total = 0
+    for p in files:
+        size = p.stat().st_size
+        if not dry_run:
+            try:
+                archive_store_put(p.parent.parent.name, p.parent.name, p.name, p)
+            except OSError as e:
+                print(f"⚠️  Could not adopt {p}: {e}")
+                continue
+        total += size
+    return len(files), total
+
+
+def archive_transcode(dry_run: bool = False) -> tuple[int, int]:
+    """
+    Re-encode stored audio blobs (referenced only as audio) to Opus, one at a
+    time: each transcode runs outside the store lock and is swapped in only if
+    the blob is still the same. Returns (blobs, bytes saved).
+    """
+    store = archive_store_dir()
+    conn = open_archive_store()
+    rows = conn.execute(
+        "SELECT hash, path, size FROM blobs WHERE codec = 'original' AND hash IN "
+        "(SELECT hash FROM manifest WHERE kind = 'audios') AND hash NOT IN "
+        "(SELECT hash FROM manifest WHERE kind != 'audios')"
+    ).fetchall()
+    if dry_run:
+        conn.close()
+        return len(rows), 0
+    done = saved = 0
+    for digest, rel, size in rows:
+        blob = store / rel
+        tmp = blob.with_name(f".{digest}.{os.getpid()}.tmp")
+        try:
+            transcode_opus(blob, tmp)
+        except (OSError, RuntimeError) as e:
+            tmp.unlink(missing_ok=True)
+            print(f"⚠️  Could not transcode {blob.name}: {e}")
+            continue
+        final = blob.with_name(f"{digest}.opus")
+        new_size = tmp.stat().st_size
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current = conn.execute("SELECT path FROM blobs WHERE hash = ?", (digest,)).fetchone()
+            if current != (rel,):
+                tmp.unlink(missing_ok=True)
+            elif new_size >= size:
+                tmp.unlink(missing_ok=True)
+                conn.execute("UPDATE blobs SET codec = 'kept' WHERE hash = ?", (digest,))
+            else:
+                tmp.replace(final)
+                conn.execute(
+                    "UPDATE blobs SET path = ?, size = ?, codec = 'opus' WHERE hash = ?",
+                    (str(final.relative_to(store)), new_size, digest),
+                )
+                blob.unlink(missing_ok=True)
+                done += 1
+                saved += size - new_size
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            tmp.unlink(missing_ok=True)
+            raise
+    conn.close()
+    return done, saved
+
+
+def archive_collect(dry_run: bool = False) -> tuple[int, int]:
+    """
+    Delete blobs no manifest points at, and temp files left in the store by
+    crashed runs. Runs under BEGIN IMMEDIATE so no archive can reference a
+    blob while it is being deleted. Returns (files, bytes).
+    """
+    store = archive_store_dir()
+    blobs_root = store / "blobs"
+    conn = open_archive_store()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        tracked = {rel for (rel,) in conn.execute("SELECT path FROM blobs")}
+        unused = conn.execute(
+            "SELECT hash, path, size FROM blobs WHERE hash NOT IN (SELECT hash FROM manifest)"
+        ).fetchall()
+        count = total = 0
+        for digest, rel, size in unused:
+            count += 1
+            total += size
+            if not dry_run:
+                (store / rel).unlink(missing_ok=True)
+                conn.execute("DELETE FROM blobs WHERE hash = ?", (digest,))
+        now = time.time()
+        if blobs_root.is_dir():
+            for p in blobs_root.glob("*/*"):
+                rel = str(p.relative_to(store))
+                if rel in tracked or p.name.endswith((".claim", ".ckpt.jsonl")):
+                    continue
+                st = p.stat()
+                if now - st.st_mtime < ARCHIVE_STALE_TMP_SECONDS:
+                    continue  # possibly being staged right now
+                count += 1
+                total += st.st_size
+                if not dry_run:
+                    p.unlink(missing_ok=True)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return count, total
+
+
+def archive_gc(dry_run: bool = False, opus: bool = False) -> int:
+    """
+    nk archive gc [--dry-run] [--opus]
+
+    1) adopt loose files into the store (duplicates are dropped)
+    2) with --opus or NK_ARCHIVE_AUDIO=opus, transcode stored audio to Opus
+    3) delete unreferenced blobs and stale temp files
+    """
+    verb = "Would" if dry_run else "Did"
+    print(f"🧹 Media archive: {archive_root()}{' (dry run)' if dry_run else ''}")
+    files, size = archive_adopt(dry_run=dry_run)
+    print(f"   {verb} adopt {files} loose file(s), {size / 1e6:.1f} MB")
+    if opus or archive_audio_format() == "opus":
+        files, saved = archive_transcode(dry_run=dry_run)
+        if dry_run:
+            print(f"   Would transcode {files} audio blob(s) to Opus")
+        else:
+            print(f"   Transcoded {files} audio blob(s) to Opus, saved {saved / 1e6:.1f} MB")
+    files, size = archive_collect(dry_run=dry_run)
+    print(f"   {verb} delete {files} unreferenced blob(s) / temp file(s), {size / 1e6:.1f} MB")
+    if not dry_run:
+        print("✅ Archive collected")
+    return 0
+
+
+def archive_stats() -> int:
+    """nk archive stats: store size, what dedup and Opus saved, per-vault usage."""
+    conn = open_archive_store()
+    blobs, stored, originals, opus = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(original_size), 0), "
+        "COALESCE(SUM(codec = 'opus'), 0) FROM blobs"
+    ).fetchone()
+    entries, ingested = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(b.original_size), 0) FROM manifest m JOIN blobs b ON b.hash = m.hash"
+    ).fetchone()
+    unused, unused_size = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs WHERE hash NOT IN (SELECT hash FROM manifest)"
+    ).fetchone()
+    per_vault = conn.execute(
+        "SELECT m.vault, COUNT(*), COALESCE(SUM(b.original_size), 0), "
+        "SUM(EXISTS (SELECT 1 FROM manifest o WHERE o.hash = m.hash AND o.vault != m.vault)) "
+        "FROM manifest m JOIN blobs b ON b.hash = m.hash GROUP BY m.vault ORDER BY m.vault"
+    ).fetchall()
+    conn.close()
+    loose = loose_archive_files()
+    loose_size = sum(p.stat().st_size for p in loose)
+
+    print(f"📦 Media archive: {archive_root()}")
+    print(f"   Archived:     {entries} file(s), {ingested / 1e6:.1f} MB as ingested")
+    print(f"   Stored:       {blobs} blob(s), {stored / 1e6:.1f} MB ({opus} as Opus)")
+    print(f"   Dedup saved:  {(ingested - originals) / 1e6:.1f} MB")
+    print(f"   Opus saved:   {(originals - stored) / 1e6:.1f} MB")
+    if ingested:
+        print(f"   On disk:      {100 * stored / ingested:.0f}% of what was archived")
+    if loose:
+        print(f"   Loose:        {len(loose)} file(s), {loose_size / 1e6:.1f} MB outside the store (`nk archive gc` adopts them)")
+    if unused:
+        print(f"   Unreferenced: {unused} blob(s), {unused_size / 1e6:.1f} MB (`nk archive gc` deletes them)")
+    if per_vault:
+        print(f"\n{'vault':<30} {'files':>6} {'MB':>9} {'shared':>7}")
+        for vault_key, count, size, shared in per_vault:
+            print(f"{vault_key:<30} {count:>6} {size / 1e6:>9.1f} {shared or 0:>7}")
+    return 0
+
+
+def archive_command(rest: list[str]) -> int:
+    """
+    nk archive stats
+    nk archive gc [--dry-run] [--opus]
+    """
+    sub = rest[0] if rest else None
+    if sub in (None, "stats"):
+        return archive_stats()
+    if sub == "gc":
+        _, opts = split_args(rest[1:])
+        return archive_gc(dry_run=bool(opts.get("--dry-run")), opus=bool(opts.get("--opus")))
+    print("Unknown archive command:", sub)
+    print("Usage: nk archive stats | nk archive gc [--dry-run] [--opus]")
+    return 1
+
+
+# === Checkpointed transcription (long recordings) ===
+
+DEFAULT_WINDOW_SECONDS = 600
+
+
+def checkpoint_window_seconds() -> int:
+    return max(1, int(env_number("NK_WINDOW_SECONDS", float(DEFAULT_WINDOW_SECONDS))))
+
+
+def checkpoint_path(media: Path) -> Path:
+    """Checkpoint file next to the job: <inbox>/<file>.ckpt.jsonl"""
+    return media.with_name(f"{media.name}.ckpt.jsonl")
+
+
+def load_checkpoint(checkpoint: Path, header: dict) -> dict[int, list[dict]]:
+    """
+    Return {window_index: segments} for windows already finished.
+    A checkpoint written for different audio, model, task or window size
+    is discarded.
+    """
+    done: dict[int, list[dict]] = {}
+    if not checkpoint.is_file():
+        return done
+    raw = checkpoint.read_text(errors="replace")
+    lines = raw.split("\n")
+    try:
+        current = json.loads(lines[0]) == header
+    except json.JSONDecodeError:
+        current = False
+    if not current:
+        checkpoint.unlink()
+        return done
+    # Each line stands alone: a torn or garbled one (killed mid-write) only
+    # means that window reruns, and must not hide the windows after it
+    good = [lines[0]]
+    for line in lines[1:]:
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+            done[entry["window"]] = entry["segments"]
+        except (json.JSONDecodeError, KeyError, TypeError):
+            continue
+        good.append(line)
+    clean = "".join(f"{line}\n" for line in good)
+    if clean != raw:
+        # Cut the bad lines so the next append starts on a fresh line
+        write_durable(checkpoint, clean)
+    return done
+
+
+def transcribe_windows(
+    model: WhisperModel, pcm, task: str, checkpoint: Path, audio_hash: str
+) -> dict:
+    """
+    Transcribe long audio in fixed windows of NK_WINDOW_SECONDS (default 600).
+
+    Each finished window's segments (with absolute timestamps) are appended
+    to `checkpoint` and fsynced. On resume, completed windows are skipped
+    and the final result is put together from all saved segments. The
+    checkpoint is removed once the whole recording is done.
+    """
+    window_s = checkpoint_window_seconds()
+    window_len = window_s * WHISPER_SAMPLE_RATE
+    n_windows = -(-len(pcm) // window_len)
+    header = {"audio_hash": audio_hash, "model": model.name, "task": task, "window_seconds": window_s}
+
+    done = load_checkpoint(checkpoint, header)
+    if done:
+        saved_s = sum(min(window_len, len(pcm) - i * window_len) for i in done) / WHISPER_SAMPLE_RATE
+        print(f"↩️  Resuming from checkpoint: {len(done)}/{n_windows} windows done, "
+              f"{saved_s / 60:.1f} min of audio ({100 * len(done) / n_windows:.0f}%) not re-transcribed")
+    else:
+        with checkpoint.open("w") as f:
+            f.write(json.dumps(header) + "\n")
+
+    language = None
+    for i in range(n_windows):
+        if i in done:
+            continue
+        start = i * window_len
+        window = pcm[start:start + window_len]
+        # Carry the previous window's tail as context across the cut
+        prev_text = " ".join(seg["text"].strip() for seg in done.get(i - 1, [])[-3:])
+        t0 = time.perf_counter()
+        result = transcribe_audio(model.get(), window, task, initial_prompt=prev_text or None)
+        language = language or result.get("language")
+        offset = start / WHISPER_SAMPLE_RATE
+        segments = [
+            {"start": seg["start"] + offset, "end": seg["end"] + offset, "text": seg["text"]}
+            for seg in result.get("segments", [])
+        ]
+        done[i] = segments
+        with checkpoint.open("a") as f:
+            f.write(json.dumps({"window": i, "segments": segments}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        print(f"   window {i + 1}/{n_windows} done ({time.perf_counter() - t0:.1f}s)")
+
+    segments = [seg for i in range(n_windows) for seg in done[i]]
+    checkpoint.unlink(missing_ok=True)
+    return {
+        "text": "".join(seg["text"] for seg in segments),
+        "language": language,
+        "segments": segments,
+    }
+
+
+def transcript_cache_command(sub: str | None) -> int:
+    """
+    nk cache stats|clear
+    """
+    conn = open_transcript_cache()
+    if sub == "clear":
+        with conn:
+            conn.execute("DELETE FROM entries")
+            conn.execute("DELETE FROM counters")
+        conn.execute("VACUUM")
+        print(f"✅ Cleared transcript cache: {transcript_cache_dir()}")
+        return 0
+    if sub not in (None, "stats"):
+        print("Unknown cache command:", sub)
+        print("Usage: nk cache stats|clear")
+        return 1
+
+    entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+    counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+    conn.close()
+    hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+    lookups = hits + misses
+    max_mb = env_number("NK_CACHE_MAX_MB", float(DEFAULT_CACHE_MAX_MB))
+    print(f"📦 Transcript cache: {transcript_cache_dir()}")
+    print(f"   Entries:   {entries}")
+    print(f"   Size:      {size / 1024 / 1024:.1f} MB of {max_mb:.0f} MB")
+    print(f"   Hits:      {hits}")
+    print(f"   Misses:    {misses}")
+    if lookups:
+        print(f"   Hit rate:  {100 * hits / lookups:.0f}%")
+    print(f"   Evictions: {counters.get('evictions', 0)}")
+    return 0
+
+
+def format_offset(seconds: float) -> str:
+    s = int(seconds)
+    return f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}"
+
+
+def transcript_lines(segments: list[dict], timestamps: bool = False) -> str:
+    """One stripped segment per line, optionally anchored with its [hh:mm:ss] start."""
+    if timestamps:
+        return "".join(f"[{format_offset(seg['start'])}] {seg['text'].strip()}\n" for seg in segments)
+    return "".join(f"{seg['text'].strip()}\n" for seg in segments)
+
+
+def write_transcript(result: dict, dst: Path, timestamps: bool = False) -> None:
+    """
+    Write a transcript exactly like `whisper --output_format txt` does
+    (one stripped segment per line), atomically via a temp file, plus its
+    <base>.segments.json sidecar with every segment's start and end.
+    """
+    segments = result.get("segments", [])
+    with trace_span(f"write {dst.name}", "io"):
+        write_durable(dst, transcript_lines(segments, timestamps))
+        write_durable(segments_sidecar(dst), encode_segments(segments))
+
+
+def print_timing_report(
+    model_name: str,
+    import_s: float,
+    load_s: float,
+    file_times: list[tuple[str, float]],
+    total_s: float,
+    workers: int = 1,
+) -> None:
+    """
+    Summarize a batch run and compare it with the old per-file path,
+    where every `whisper` CLI call re-imports torch and reloads the model.
+    """
+    n = len(file_times)
+    transcribe_s = sum(t for _, t in file_times)
+    per_file_estimate = n * (import_s + load_s) + transcribe_s
+
+    print()
+    print("⏱  Timing report")
+    for name, t in file_times:
+        print(f"   {name}: {t:.1f}s")
+    paid = "once" if workers == 1 else f"once per worker, {workers} in parallel"
+    print(f"   Import whisper/torch:   {import_s:.1f}s ({paid})")
+    print(f"   Model load ('{model_name}'): {load_s:.1f}s ({paid})")
+    print(f"   Transcription ({n} files): {transcribe_s:.1f}s")
+    print(f"   Total this run:         {total_s:.1f}s")
+    if n:
+        saved = per_file_estimate - total_s
+        print(f"   Per-file CLI path:      ~{per_file_estimate:.1f}s estimated "
+              f"(import + model load paid {n}×; ~{saved:.1f}s saved)")
+
+
+WHISPER_SAMPLE_RATE = 16000
+
+
+def decode_audio_pcm(media: Path, keep_audio: Path | None = None):
+    """
+    Decode the first audio track of `media` straight to 16 kHz mono PCM over
+    a pipe (what whisper resamples to anyway), as a float32 numpy array.
+
+    If keep_audio is given, the same ffmpeg pass also writes an MP3 copy
+    (libmp3lame -q:a 2, like mp4-to-mp3-file.sh) to that path.
+    """
+    import numpy as np
+
+    cmd = [
+        "ffmpeg", "-nostdin", "-loglevel", "error", "-y",
+        "-i", str(media),
+        "-map", "a:0", "-vn", "-f", "s16le", "-ac", "1", "-ar", str(WHISPER_SAMPLE_RATE), "pipe:1",
+    ]
+    if keep_audio is not None:
+        cmd += ["-map", "a:0", "-vn", "-c:a", "libmp3lame", "-q:a", "2", str(keep_audio)]
+
+    proc = subprocess.run(cmd, capture_output=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {proc.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(proc.stdout, np.int16).flatten().astype(np.float32) / 32768.0
+
+
+# Claim file descriptors held by this process, by claim path
+_CLAIMS: dict[Path, int] = {}
+
+
+def claim_media(path: Path) -> bool:
+    """
+    Claim an inbox file for processing with an exclusive flock on <file>.claim.
+
+    Only one process (worker, concurrent nk run) can hold the lock, so two
+    workers never take the same file. The kernel drops the lock when its
+    holder dies, so a claim left by a crashed run is free again without any
+    pid check. The lock is held until release_media.
+    """
+    import fcntl
+
+    claim = path.with_name(f"{path.name}.claim")
+    for _ in range(3):
+        try:
+            fd = os.open(claim, os.O_CREAT | os.O_RDWR, 0o644)
+        except FileNotFoundError:
+            return False  # the inbox folder itself is gone
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False  # held by a live process
+        # The holder may have released (unlinked) it between our open and lock
+        try:
+            current = os.stat(claim)
+        except FileNotFoundError:
+            current = None
+        held = os.fstat(fd)
+        if current is None or (current.st_dev, current.st_ino) != (held.st_dev, held.st_ino):
+            os.close(fd)
+            continue
+        # The file may have been processed and moved while we were claiming
+        if not path.exists():
+            claim.unlink(missing_ok=True)
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        _CLAIMS[claim] = fd
+        return True
+    return False
+
+
+def release_media(path: Path) -> None:
+    claim = path.with_name(f"{path.name}.claim")
+    fd = _CLAIMS.pop(claim, None)
+    # Unlink while still locked, so nobody can lock this inode and think it is current
+    claim.unlink(missing_ok=True)
+    if fd is not None:
+        os.close(fd)
+
+
+# === Job state (.nk/state.sqlite) ===
+
+JOB_IN_FLIGHT = ("decoding", "transcribing")
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_BACKOFF = 60.0  # seconds before a failed file is retried, doubling per attempt
+
+
+def open_job_state(vault: Path):
+    """
+    Crash-safe per-vault media job store: one row per inbox file with its
+    stage (pending, decoding, transcribing, done, failed), attempts,
+    timings, model and last error. Also which model wrote each transcript.
+    """
+    import sqlite3
+
+    conn = sqlite3.connect(vault_state_dir(vault) / "state.sqlite", timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=FULL")
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            path        TEXT PRIMARY KEY,
+            kind        TEXT NOT NULL,
+            stage       TEXT NOT NULL,
+            attempts    INTEGER NOT NULL DEFAULT 0,
+            dropped_at  REAL,
+            started_at  REAL,
+            finished_at REAL,
+            duration_s  REAL,
+            audio_s     REAL,
+            model       TEXT,
+            pid         INTEGER,
+            error       TEXT,
+            updated_at  REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS jobs_stage ON jobs(stage);
+        CREATE TABLE IF NOT EXISTS metric_totals (
+            name  TEXT PRIMARY KEY,
+            value REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS transcripts (
+            path          TEXT PRIMARY KEY,
+            source        TEXT NOT NULL,
+            kind          TEXT NOT NULL,
+            model         TEXT NOT NULL,
+            task          TEXT NOT NULL,
+            audio_s       REAL,
+            written_at    REAL NOT NULL,
+            mtime_ns      INTEGER NOT NULL,
+            upgraded_from TEXT,
+            pinned        INTEGER NOT NULL DEFAULT 0
+        );
+        """
+    )
+    return conn
+
+
+def job_key(vault: Path, media: Path) -> str:
+    return os.path.relpath(os.path.abspath(media), os.path.abspath(vault))
+
+
+def _job_write(vault: Path, sql: str, rows: list[tuple]) -> None:
+    """
+    Job state is bookkeeping: a locked or broken state.sqlite must never
+    stop media from being processed, so errors only warn.
+    """
+    import sqlite3
+
+    try:
+        conn = open_job_state(vault)
+        with conn:
+            conn.executemany(sql, rows)
+        conn.close()
+    except sqlite3.Error as e:
+        print(f"⚠️  Could not update job state: {e}")
+
+
+def job_register(vault: Path, media: list[Path]) -> None:
+    """
+    Record inbox files as pending. A file that was done or failed before and
+    has been dropped again (new mtime) starts over as a new job.
+    """
+    now = time.time()
+    rows = []
+    for p in media:
+        try:
+            dropped = p.stat().st_mtime
+        except FileNotFoundError:
+            continue
+        rows.append((job_key(vault, p), media_kind(p) or p.suffix.lstrip("."), dropped, now))
+    _job_write(
+        vault,
+        "INSERT INTO jobs(path, kind, stage, dropped_at, updated_at) VALUES (?, ?, 'pending', ?, ?) "
+        "ON CONFLICT(path) DO UPDATE SET stage = 'pending', attempts = 0, error = NULL, "
+        "dropped_at = excluded.dropped_at, started_at = NULL, finished_at = NULL, "
+        "duration_s = NULL, audio_s = NULL, updated_at = excluded.updated_at "
+        "WHERE jobs.stage IN ('done', 'failed') AND jobs.dropped_at IS NOT excluded.dropped_at",
+        rows,
+    )
+
+
+def job_start(vault: Path, media: Path, model_name: str) -> None:
+    now = time.time()
+    try:
+        dropped = media.stat().st_mtime
+    except FileNotFoundError:
+        dropped = None
+    _job_write(
+        vault,
+        "INSERT INTO jobs(path, kind, stage, attempts, dropped_at, started_at, model, pid, updated_at) "
+        "VALUES (?, ?, 'decoding', 1, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(path) DO UPDATE SET stage = 'decoding', attempts = attempts + 1, "
+        "started_at = excluded.started_at, finished_at = NULL, model = excluded.model, "
+        "pid = excluded.pid, error = NULL, updated_at = excluded.updated_at, "
+        "dropped_at = COALESCE(jobs.dropped_at, excluded.dropped_at)",
+        [(job_key(vault, media), media_kind(media) or "", dropped, now, model_name, os.getpid(), now)],
+    )
+
+
+def job_stage(vault: Path, media: Path, stage: str) -> None:
+    _job_write(
+        vault,
+        "UPDATE jobs SET stage = ?, updated_at = ? WHERE path = ?",
+        [(stage, time.time(), job_key(vault, media))],
+    )
+
+
+def job_done(vault: Path, media: Path, audio_s: float | None) -> None:
+    now = time.time()
+    _job_write(
+        vault,
+        "UPDATE jobs SET stage = 'done', finished_at = ?, duration_s = ? - started_at, "
+        "audio_s = ?, pid = NULL, updated_at = ? WHERE path = ?",
+        [(now, now, audio_s, now, job_key(vault, media))],
+    )
+
+
+def job_failed(vault: Path, media: Path, error: str) -> None:
+    now = time.time()
+    _job_write(
+        vault,
+        "UPDATE jobs SET stage = 'failed', finished_at = ?, duration_s = ? - started_at, "
+        "error = ?, pid = NULL, updated_at = ? WHERE path = ?",
+        [(now, now, error[:500], now, job_key(vault, media))],
+    )
+
+
+def job_backing_off(vault: Path, media: list[Path]) -> set[Path]:
+    """
+    Files among `media` that failed recently and should not be retried yet:
+    a failed file waits JOB_RETRY_BACKOFF seconds, doubling with each
+    attempt, and is left alone after JOB_MAX_ATTEMPTS until it is dropped
+    again (job_register then starts it over).
+    """
+    import sqlite3
+
+    keys = {job_key(vault, p): p for p in media}
+    now = time.time()
+    waiting = set()
+    try:
+        conn = open_job_state(vault)
+        rows = conn.execute(
+            "SELECT path, attempts, finished_at FROM jobs WHERE stage = 'failed'"
+        ).fetchall()
+        conn.close()
+    except sqlite3.Error:
+        return waiting
+    for key, attempts, finished in rows:
+        if key not in keys:
+            continue
+        retry_at = (finished or 0) + JOB_RETRY_BACKOFF * 2 ** max(0, attempts - 1)
+        if attempts >= JOB_MAX_ATTEMPTS or now < retry_at:
+            waiting.add(keys[key])
+    return waiting
+
+
+def format_age(seconds: float) -> str:
+    seconds = int(max(0, seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    if seconds < 86400:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    return f"{seconds // 86400}d {seconds % 86400 // 3600:02d}h"
+
+
+def pid_alive(pid: int | None) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def auto_queue(vault: Path) -> int:
+    """
+    nk auto queue [vault-path]
+
+    Show the media queue from .nk/state.sqlite: pending, in-flight and
+    failed work, backlog age and throughput, without walking the inboxes.
+    Pending files are listed in the order the next run will take them
+    (schedule_media), with estimated completion from the model's measured
+    speed.
+    """
+    vault = vault.resolve()
+    print("=== notes-kernel media queue ===")
+    print(f"📂 Vault: {vault}")
+    print(f"🆔 Vault ID: {vault.name}")
+    print()
+
+    conn = open_job_state(vault)
+    now = time.time()
+    pending = conn.execute(
+        "SELECT path, dropped_at FROM jobs WHERE stage = 'pending' ORDER BY dropped_at"
+    ).fetchall()
+    in_flight = conn.execute(
+        "SELECT path, stage, started_at, attempts, pid, audio_s FROM jobs "
+        f"WHERE stage IN ({', '.join('?' * len(JOB_IN_FLIGHT))}) ORDER BY started_at",
+        JOB_IN_FLIGHT,
+    ).fetchall()
+    failed = conn.execute(
+        "SELECT path, attempts, error, finished_at FROM jobs WHERE stage = 'failed' "
+        "ORDER BY finished_at DESC"
+    ).fetchall()
+    done_n, done_audio, done_avg = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(audio_s), 0), AVG(duration_s) FROM jobs "
+        "WHERE stage = 'done' AND finished_at >= ?",
+        (now - 86400,),
+    ).fetchone()
+    conn.close()
+
+    oldest = f"  (oldest waiting {format_age(now - pending[0][1])})" if pending and pending[0][1] else ""
+    print(f"⏳ Pending:    {len(pending)}{oldest}")
+    plan = schedule_media(vault, [vault / path for path, _ in pending])
+    if plan:
+        model = vault_model_name(vault)
+        if model == "auto":
+            model = choose_model(vault, [p for p, *_ in plan], quiet=True)
+        rtf = estimated_rtf(model, model_speeds())[0]
+        # The next run starts once the files in flight are done
+        start = now + sum(
+            max(0.0, (audio_s or 0) * (rtf or 0) - (now - (started or now)))
+            for _, _, started, _, pid, audio_s in in_flight if pid_alive(pid)
+        )
+        done = finish_times(plan, rtf or 0, start)
+        policy, _ = schedule_policy(vault)
+        eta_note = f"ETA with '{model}'" if rtf else "no speed data for ETA; run `nk models calibrate`"
+        print(f"   Planned order ({policy}; {eta_note}):")
+        for i, ((p, dropped, audio_s, priority), t) in enumerate(zip(plan[:10], done), 1):
+            tag = f"  p{priority}" if priority else ""
+            eta = f"  done in ~{format_age(t - now)}" if rtf else ""
+            print(f"     {i:>2}. {job_key(vault, p)}  {format_age(audio_s)} audio{tag}, "
+                  f"waiting {format_age(now - dropped)}{eta}")
+        if len(plan) > 10:
+            print(f"     … and {len(plan) - 10} more" + (f", all done in ~{format_age(done[-1] - now)}" if rtf else ""))
+
+    print(f"⚙️  In flight:  {len(in_flight)}")
+    for path, stage, started, attempts, pid, _ in in_flight:
+        note = "" if pid_alive(pid) else "  ⚠️ stale (process gone; will retry)"
+        print(f"     {path}  {stage} for {format_age(now - (started or now))}, "
+              f"attempt {attempts}, pid {pid}{note}")
+
+    print(f"❌ Failed:     {len(failed)}")
+    for path, attempts, error, _ in failed[:10]:
+        last_line = (error or "").strip().splitlines()[-1:] or ["?"]
+        print(f"     {path}  ({attempts} attempts): {last_line[0]}")
+
+    print(f"✅ Done (24h): {done_n} files, {done_audio / 60:.1f} min of audio")
+    if done_n:
+        print(f"   Throughput: {done_n / 24:.1f} files/h, "
+              f"{done_audio / 60 / 24:.1f} audio min/h, avg {done_avg or 0:.1f}s per file")
+    return 0
+
+
+# === Processing metrics (.nk/metrics.jsonl, Prometheus textfile) ===
+
+DEFAULT_METRICS_MAX_MB = 20
+MEDIA_STAGES = ("decode", "transcribe", "write", "move")
+
+
+def metrics_enabled() -> bool:
+    return os.environ.get("NK_METRICS", "1") != "0"
+
+
+def metrics_log_path(vault: Path) -> Path:
+    raw = os.environ.get("NK_METRICS_FILE")
+    if raw:
+        return Path(raw).expanduser()
+    return vault_state_dir(vault) / "metrics.jsonl"
+
+
+def record_metrics(vault: Path, record: dict) -> None:
+    """
+    Append one JSON line to the vault's metrics log (rotated to .1 past
+    NK_METRICS_MAX_MB). Like job state, metrics never stop processing.
+    """
+    if not metrics_enabled():
+        return
+    record = {"ts": round(time.time(), 3), "vault": vault.resolve().name, **record}
+    try:
+        path = metrics_log_path(vault)
+        max_bytes = env_number("NK_METRICS_MAX_MB", float(DEFAULT_METRICS_MAX_MB)) * 1024 * 1024
+        try:
+            if path.stat().st_size > max_bytes:
+                path.replace(path.with_name(path.name + ".1"))
+        except FileNotFoundError:
+            pass
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, line.encode())  # one write per line: safe across workers
+        finally:
+            os.close(fd)
+    except OSError as e:
+        print(f"⚠️  Could not write metrics: {e}")
+        return
+    update_prometheus_textfile(vault, record)
+
+
+def record_file_metrics(
+    vault: Path,
+    media: Path,
+    kind: str,
+    model: "WhisperModel",
+    stages: dict[str, float],
+    dropped_at: float,
+    started_at: float,
+    audio_s: float | None = None,
+    cache_hit: bool = False,
+    bytes_moved: int = 0,
+    error: str | None = None,
+) -> None:
+    transcribe_s = stages.get("transcribe")
+    record_metrics(vault, {
+        "type": "file",
+        "path": job_key(vault, media),
+        "kind": kind,
+        "model": model.name,
+        "ok": error is None,
+        "error": (error or "").strip().splitlines()[-1][:200] if error else None,
+        "wait_s": round(max(0.0, started_at - dropped_at), 3),
+        "stages": {k: round(v, 4) for k, v in stages.items()},
+        "total_s": round(sum(v for k, v in stages.items() if k in MEDIA_STAGES), 4),
+        "audio_s": round(audio_s, 3) if audio_s is not None else None,
+        "rtf": round(transcribe_s / audio_s, 4) if transcribe_s and audio_s and not cache_hit else None,
+        "cache_hit": cache_hit,
+        "bytes_moved": bytes_moved,
+    })
+
+
+def record_run_metrics(vault: Path, command: str, run_s: float, **fields) -> None:
+    record_metrics(vault, {"type": "run", "command": command, "run_s": round(run_s, 4), **fields})
+
+
+def timed_transcribe(model: "WhisperModel", pcm, task: str, checkpoint: Path, stages: dict[str, float]):
+    """
+    transcribe_pcm with its time split into model load (first use only)
+    and inference, recorded in `stages`. Real inference over the whole
+    recording also updates the model's measured speed on this machine; a
+    run resumed from a checkpoint only transcribed part of it, so it does not.
+    """
+    was_loaded = model.model is not None
+    resumed = checkpoint.exists()
+    t0 = time.perf_counter()
+    result, cache_hit = transcribe_pcm(model, pcm, task, checkpoint=checkpoint)
+    elapsed = time.perf_counter() - t0
+    if not was_loaded and model.model is not None:
+        load_s = model.import_s + model.load_s
+        stages["model_load"] = load_s
+        elapsed -= load_s
+    stages["transcribe"] = elapsed
+    if not cache_hit and not resumed:
+        record_model_speed(model.name, len(pcm) / WHISPER_SAMPLE_RATE, elapsed)
+    return result, cache_hit
+
+
+def prometheus_textfile_path(vault: Path) -> Path | None:
+    """
+    NK_PROMETHEUS_TEXTFILE may name a file, or a directory (e.g. the
+    node_exporter textfile directory) that gets one nk-<vault>.prom per vault.
+    """
+    raw = os.environ.get("NK_PROMETHEUS_TEXTFILE")
+    if not raw:
+        return None
+    path = Path(raw).expanduser()
+    if path.is_dir():
+        return path / f"nk-{vault.resolve().name.replace(' ', '_')}.prom"
+    return path
+
+
+def update_prometheus_textfile(vault: Path, record: dict) -> None:
+    """
+    Fold one metrics record into cumulative totals (kept in state.sqlite so
+    counters survive restarts) and rewrite the textfile atomically.
+    """
+    import sqlite3
+
+    path = prometheus_textfile_path(vault)
+    if path is None:
+        return
+    bump: dict[str, float] = {}
+    gauges: dict[str, float] = {"last_update_timestamp_seconds": record["ts"]}
+    if record["type"] == "file":
+        status = "ok" if record["ok"] else "failed"
+        bump[f'files_total{{status="{status}"}}'] = 1
+        bump["audio_seconds_total"] = record["audio_s"] or 0
+        bump["bytes_moved_total"] = record["bytes_moved"]
+        bump["inbox_wait_seconds_total"] = record["wait_s"]
+        for stage, seconds in record["stages"].items():
+            bump[f'stage_seconds_total{{stage="{stage}"}}'] = seconds
+        if record["cache_hit"]:
+            bump["cache_hits_total"] = 1
+        if record["rtf"] is not None:
+            gauges["last_rtf"] = record["rtf"]
+    else:
+        bump["runs_total"] = 1
+        gauges["last_run_duration_seconds"] = record["run_s"]
+        gauges["last_run_timestamp_seconds"] = record["ts"]
+
+    try:
+        conn = open_job_state(vault)
+        with conn:
+            conn.executemany(
+                "INSERT INTO metric_totals (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                list(bump.items()),
+            )
+            conn.executemany(
+                "INSERT INTO metric_totals (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+                [(f"gauge:{k}", v) for k, v in gauges.items()],
+            )
+            totals = conn.execute("SELECT name, value FROM metric_totals ORDER BY name").fetchall()
+            pending = conn.execute("SELECT COUNT(*) FROM jobs WHERE stage = 'pending'").fetchone()[0]
+        conn.close()
+    except sqlite3.Error as e:
+        print(f"⚠️  Could not update Prometheus totals: {e}")
+        return
+
+    vault_label = f'vault="{vault.resolve().name}"'
+    lines = ["# TYPE nk_queue_pending gauge", f"nk_queue_pending{{{vault_label}}} {pending}"]
+    typed: set[str] = set()
+    for name, value in totals:
+        metric = name.removeprefix("gauge:")
+        base, _, labels = metric.partition("{")
+        if base not in typed:
+            typed.add(base)
+            lines.append(f"# TYPE nk_{base} {'counter' if base.endswith('_total') else 'gauge'}")
+        labels = f"{{{vault_label},{labels}" if labels else f"{{{vault_label}}}"
+        lines.append(f"nk_{base}{labels} {value:.15g}")
+    tmp = path.with_name(f".{path.name}.tmp")
+    try:
+        tmp.write_text("\n".join(lines) + "\n")
+        tmp.replace(path)
+    except OSError as e:
+        print(f"⚠️  Could not write Prometheus textfile {path}: {e}")
+
+
+def parse_window(raw: str) -> float:
+    """'90m', '24h', '7d' or a bare number of hours -> seconds."""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+    raw = raw.strip().lower()
+    if raw and raw[-1] in units:
+        return float(raw[:-1]) * units[raw[-1]]
+    return float(raw) * 3600
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    import math
+
+    k = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[k]
+
+
+def auto_stats(rest: list[str]) -> int:
+    """
+    nk auto stats [vault-path] [--since 24h]
+
+    Percentiles over the metrics log: per-stage durations, inbox wait,
+    real-time factor, run and git times, plus throughput and bytes moved.
+    """
+    args, opts = split_args(rest, {"--since"})
+    vault = Path(normalize_path(args[0] if args else ".")).resolve()
+    window = str(opts.get("--since") or "24h")
+    try:
+        since = time.time() - parse_window(window)
+    except ValueError:
+        print(f"🚫 Bad --since value: {window} (use e.g. 90m, 24h, 7d)")
+        return 1
+
+    log = metrics_log_path(vault)
+    files: list[dict] = []
+    runs: list[dict] = []
+    for path in (log.with_name(log.name + ".1"), log):
+        try:
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if record.get("ts", 0) < since:
+                        continue
+                    (files if record.get("type") == "file" else runs).append(record)
+        except FileNotFoundError:
+            continue
+
+    print(f"=== notes-kernel processing stats (last {window}) ===")
+    print(f"📂 Vault: {vault}")
+    if not files and not runs:
+        print(f"No metrics recorded in this window ({log}).")
+        return 0
+
+    ok = [r for r in files if r.get("ok")]
+    audio_total = sum(r.get("audio_s") or 0 for r in ok)
+    hours = parse_window(window) / 3600
+    print(f"🎧 Files: {len(ok)} done, {len(files) - len(ok)} failed, "
+          f"{sum(1 for r in ok if r.get('cache_hit'))} cache hits")
+    moved = sum(r.get("bytes_moved") or 0 for r in ok)
+    move_s = sum(r.get("stages", {}).get("move") or 0 for r in ok)
+    print(f"   Audio: {audio_total / 60:.1f} min ({audio_total / 60 / hours:.1f} audio min/h), "
+          f"moved {moved / 1e6:.1f} MB" + (f" at {moved / 1e6 / move_s:.0f} MB/s" if move_s else ""))
+    print()
+
+    def row(label: str, values: list[float], unit: str = "s") -> None:
+        values = sorted(v for v in values if v is not None)
+        if not values:
+            return
+        p = lambda q: f"{percentile(values, q):.2f}{unit}"  # noqa: E731
+        print(f"   {label:<16} p50 {p(50):>9}  p90 {p(90):>9}  p99 {p(99):>9}  "
+              f"max {values[-1]:.2f}{unit}  (n={len(values)})")
+
+    print("⏱  Per file")
+    row("inbox wait", [r.get("wait_s") for r in ok])
+    for stage in ("model_load",) + MEDIA_STAGES:
+        row(stage, [r.get("stages", {}).get(stage) for r in ok])
+    row("total", [r.get("total_s") for r in ok])
+    row("real-time factor", [r.get("rtf") for r in ok], unit="×")
+    if runs:
+        print()
+        print("🔁 Per run")
+        for command in sorted({r["command"] for r in runs}):
+            row(command, [r["run_s"] for r in runs if r["command"] == command])
+        row("git pull", [r.get("git_pull_s") for r in runs])
+        row("git push", [r.get("git_push_s") for r in runs])
+    return 0
+
+
+# === Adaptive model selection (latency target) ===
+
+DEFAULT_LATENCY_TARGET = "30m"
+DEFAULT_AUTO_MODELS = ["tiny", "base", "small", "medium", "large-v3"]
+DEFAULT_UPGRADE_BUDGET = "10m"
+# Inference cost relative to large (openai-whisper on the same hardware);
+# estimates models that were never measured here from one that was
+MODEL_COST = {"tiny": 0.1, "base": 0.14, "small": 0.25, "medium": 0.5, "turbo": 0.125, "large": 1.0}
+# Shorter runs are dominated by fixed overhead and say little about speed
+MIN_SPEED_SAMPLE_SECONDS = 5.0
+# Duration guess for media ffmpeg cannot read the header of (128 kbit/s)
+BYTES_PER_AUDIO_SECOND = 16000
+
+
+def vault_config(vault: Path) -> dict:
+    """
+    Per-vault settings from .nk/config.json. Unlike the databases next to
+    it, this file is committed with the vault.
+
+      model           whisper model, or "auto" to pick one per run
+      latency_target  how soon after the drop transcripts are due ("30m")
+      models          candidates for "auto" (default tiny … large-v3)
+      upgrade_model   re-transcribe older transcripts with it when idle
+      backend         "whisper" (openai-whisper) or "faster-whisper"
+      schedule        inbox order: "sjf" (default) or "fifo"
+      schedule_aging  sjf: audio seconds discounted per second waited (1.0)
+      timestamps      prefix transcript lines with [hh:mm:ss] anchors
+    """
+    path = vault / ".nk" / "config.json"
+    try:
+        data = json.loads(path.read_text())
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Ignoring {path}: {e}")
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def vault_backend(vault: Path) -> str:
+    """NK_BACKEND, else the vault's "backend", else openai-whisper."""
+    backend = os.environ.get("NK_BACKEND") or vault_config(vault).get("backend") or "whisper"
+    if backend not in TRANSCRIPTION_BACKENDS:
+        print(f"⚠️  Unknown backend '{backend}'; using whisper (choices: {', '.join(TRANSCRIPTION_BACKENDS)})")
+        return "whisper"
+    return backend
+
+
+def vault_model_spec(vault: Path, name: str) -> str:
+    """A bare model name runs on the vault's backend; an explicit backend: prefix wins."""
+    if name == "auto":
+        return name
+    backend, bare = split_model_spec(name)
+    if bare != name:
+        return model_spec(backend, bare)
+    return model_spec(vault_backend(vault), name)
+
+
+def vault_model_name(vault: Path, requested: str | None = None) -> str:
+    """-m, else NK_WHISPER_MODEL, else the vault's "model", else base (on the vault's backend)."""
+    return vault_model_spec(vault, str(
+        requested
+        or os.environ.get("NK_WHISPER_MODEL")
+        or vault_config(vault).get("model")
+        or DEFAULT_WHISPER_MODEL
+    ))
+
+
+def vault_candidates(vault: Path) -> list[str]:
+    """Model specs `-m auto` chooses from."""
+    return [vault_model_spec(vault, name) for name in vault_config(vault).get("models") or DEFAULT_AUTO_MODELS]
+
+
+def latency_target_seconds(vault: Path) -> float:
+    name = "NK_LATENCY_TARGET" if os.environ.get("NK_LATENCY_TARGET") else "latency_target"
+    raw = os.environ.get("NK_LATENCY_TARGET") or vault_config(vault).get("latency_target")
+    return setting_number(
+        str(raw) if raw else None, name, parse_window(DEFAULT_LATENCY_TARGET), parse_window
+    )
+
+
+def transcript_timestamps(vault: Path) -> bool:
+    """NK_TRANSCRIPT_TIMESTAMPS=1|0, else "timestamps" in .nk/config.json (off by default)."""
+    raw = os.environ.get("NK_TRANSCRIPT_TIMESTAMPS")
+    if raw is not None:
+        return raw not in ("", "0")
+    return bool(vault_config(vault).get("timestamps"))
+
+
+def upgrade_model_name(vault: Path) -> str | None:
+    name = os.environ.get("NK_UPGRADE_MODEL") or vault_config(vault).get("upgrade_model")
+    return vault_model_spec(vault, name) if name else None
+
+
+def model_cost(spec: str) -> float | None:
+    name = split_model_spec(spec)[1]
+    if "turbo" in name:
+        return MODEL_COST["turbo"]
+    for prefix, cost in MODEL_COST.items():
+        if name.startswith(prefix):
+            return cost
+    return None
+
+
+def open_model_speeds():
+    """
+    Measured real-time factors (transcribe seconds per audio second) live in
+    the machine-local transcript cache database: they describe this
+    machine, not a vault.
+    """
+    conn = open_transcript_cache()
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS model_speed (
+            model      TEXT PRIMARY KEY,
+            rtf        REAL NOT NULL,
+            samples    INTEGER NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        """
+    )
+    return conn
+
+
+def model_speeds() -> dict[str, tuple[float, int]]:
+    """model -> (rtf, samples)"""
+    import sqlite3
+
+    try:
+        conn = open_model_speeds()
+        rows = conn.execute("SELECT model, rtf, samples FROM model_speed").fetchall()
+        conn.close()
+    except sqlite3.Error:
+        return {}
+    return {m: (rtf, n) for m, rtf, n in rows}
+
+
+def record_model_speed(model_name: str, audio_s: float, transcribe_s: float, replace: bool = False) -> None:
+    """
+    Fold one observation into the model's real-time factor (moving average,
+    so the figure follows the machine as load and hardware change).
+    `replace` (calibration) overwrites instead.
+    """
+    import sqlite3
+
+    if audio_s < MIN_SPEED_SAMPLE_SECONDS or transcribe_s <= 0:
+        return
+    rtf = transcribe_s / audio_s
+    try:
+        conn = open_model_speeds()
+        with conn:
+            if replace:
+                conn.execute(
+                    "INSERT OR REPLACE INTO model_speed VALUES (?, ?, 1, ?)", (model_name, rtf, time.time())
+                )
+            else:
+                conn.execute(
+                    "INSERT INTO model_speed VALUES (?, ?, 1, ?) ON CONFLICT(model) DO UPDATE SET "
+                    "rtf = 0.7 * rtf + 0.3 * excluded.rtf, samples = samples + 1, "
+                    "updated_at = excluded.updated_at",
+                    (model_name, rtf, time.time()),
+                )
+        conn.close()
+    except sqlite3.Error as e:
+        print(f"⚠️  Could not record model speed: {e}")
+
+
+def estimated_rtf(name: str, speeds: dict[str, tuple[float, int]]) -> tuple[float | None, bool]:
+    """
+    (rtf, measured). Unmeasured models are scaled from the most-sampled
+    measured one on the same backend by MODEL_COST; (None, False) when
+    nothing can be said.
+    """
+    if name in speeds:
+        return speeds[name][0], True
+    cost = model_cost(name)
+    if cost is None:
+        return None, False
+    backend = split_model_spec(name)[0]
+    known = [
+        (n, m, model_cost(m)) for m, (_, n) in speeds.items()
+        if model_cost(m) and split_model_spec(m)[0] == backend
+    ]
+    if not known:
+        return None, False
+    _, ref, ref_cost = max(known)
+    return speeds[ref][0] * cost / ref_cost, False
+
+
+def media_duration(path: Path) -> float | None:
+    """Audio length in seconds from the container header (ffprobe, else ffmpeg -i)."""
+    try:
+        proc = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", str(path)],
+            capture_output=True, text=True,
+        )
+        return float(proc.stdout.strip())
+    except (OSError, ValueError):
+        pass
+    try:
+        proc = subprocess.run(["ffmpeg", "-nostdin", "-i", str(path)], capture_output=True, text=True)
+    except OSError:
+        return None
+    m = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", proc.stderr)
+    if not m:
+        return None
+    h, mins, s = m.groups()
+    return int(h) * 3600 + int(mins) * 60 + float(s)
+
+
+def media_durations(vault: Path, media: list[Path]) -> dict[Path, tuple[float, float]]:
+    """
+    path -> (dropped_at, audio seconds). Durations are probed once and kept
+    in the pending job row (job_done overwrites them with the decoded
+    length). A file that cannot be probed is estimated from its size.
+    """
+    import sqlite3
+
+    keys = {job_key(vault, p): p for p in media}
+    known: dict[str, tuple[float | None, float | None]] = {}
+    try:
+        conn = open_job_state(vault)
+        for key, dropped, audio_s in conn.execute("SELECT path, dropped_at, audio_s FROM jobs"):
+            if key in keys:
+                known[key] = (dropped, audio_s)
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+    durations, probed = {}, []
+    for key, p in keys.items():
+        dropped, audio_s = known.get(key, (None, None))
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            continue
+        if audio_s is None:
+            audio_s = media_duration(p)
+            if audio_s is None:
+                audio_s = st.st_size / BYTES_PER_AUDIO_SECOND
+            else:
+                probed.append((audio_s, key))
+        durations[p] = (dropped or st.st_mtime, audio_s)
+    if probed:
+        _job_write(vault, "UPDATE jobs SET audio_s = ? WHERE path = ? AND stage = 'pending'", probed)
+    return durations
+
+
+def finish_times(plan: list[tuple], rtf: float, start: float) -> list[float]:
+    """Completion time of each (path, dropped_at, audio_s, …) entry, run back to back from `start`."""
+    t, out = start, []
+    for _, _, audio_s, *_ in plan:
+        t += audio_s * rtf
+        out.append(t)
+    return out
+
+
+def choose_model(vault: Path, media: list[Path], quiet: bool = False) -> str:
+    """
+    Model for `-m auto`: the largest candidate whose measured (or estimated)
+    speed gets every file in the backlog transcribed within the latency
+    target of its drop, in scheduled order (see schedule_media). When none
+    can, the fastest; with no speed data at all, the default model.
+    """
+    target = latency_target_seconds(vault)
+    speeds = model_speeds()
+    rated = [(rtf, name) for name in vault_candidates(vault) if (rtf := estimated_rtf(name, speeds)[0]) is not None]
+    if not rated:
+        default = vault_model_spec(vault, DEFAULT_WHISPER_MODEL)
+        if not quiet:
+            print(f"🎯 Model '{default}' (auto: no speed data yet; run `nk models calibrate`)")
+        return default
+
+    plan = schedule_media(vault, media)
+    total = sum(audio_s for _, _, audio_s, _ in plan)
+    now = time.time()
+    rated.sort()
+    chosen = rated[0]
+    for rtf, name in rated:
+        done = finish_times(plan, rtf, now)
+        if all(t <= dropped + target for t, (_, dropped, _, _) in zip(done, plan)):
+            chosen = (rtf, name)
+    rtf, name = chosen
+    if not quiet:
+        eta = max(finish_times(plan, rtf, now), default=now) - now
+        print(f"🎯 Model '{name}' (auto): {total / 60:.1f} min of audio, done in ~{format_age(eta)}, "
+              f"target {format_age(target)} after drop")
+    return name
+
+
+def choose_live_model(vault: Path) -> str:
+    """Largest candidate that runs at no more than half real time (headroom for a live chunk)."""
+    speeds = model_speeds()
+    rated = sorted(
+        (rtf, name) for name in vault_candidates(vault) if (rtf := estimated_rtf(name, speeds)[0]) is not None
+    )
+    if not rated:
+        return vault_model_spec(vault, DEFAULT_WHISPER_MODEL)
+    fit = [name for rtf, name in rated if rtf <= 0.5]
+    name = fit[-1] if fit else rated[0][1]
+    print(f"🎯 Model '{name}' (auto, live)")
+    return name
+
+
+BENCH_MEDIA_SUFFIXES = {".mp3", ".wav", ".m4a", ".ogg", ".flac", ".mp4"}
+
+
+def calibration_sample(vault: Path, sample: Path | None, seconds: float):
+    """
+    PCM for timing models: `sample`, else the newest archived audio, else
+    generated pink noise. Returns (pcm, label).
+    """
+    label = sample.name if sample is not None else None
+    if sample is None:
+        archived = archived_media(vault, "audios")
+        if archived:
+            label, sample = archived[0][0].name, archived[0][1]
+    if sample is not None:
+        return decode_audio_pcm(sample)[: int(seconds * WHISPER_SAMPLE_RATE)], label
+    import tempfile
+
+    tmp = Path(tempfile.mkstemp(suffix=".wav")[1])
+    try:
+        subprocess.run(
+            ["ffmpeg", "-nostdin", "-loglevel", "error", "-y", "-f", "lavfi",
+             "-i", f"anoisesrc=d={seconds}:c=pink:a=0.05", "-ac", "1", str(tmp)],
+            check=True,
+        )
+        return decode_audio_pcm(tmp), "noise"
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def bench_fixtures(vault: Path, fixtures_dir: Path | None, limit: int) -> list[tuple[Path, str | None]]:
+    """
+    (media, reference text or None) pairs for `nk models bench`.
+
+    From `fixtures_dir`: every audio/video file, with <stem>.txt or <stem>.md
+    next to it as the reference. Otherwise from the vault: transcripts
+    corrected by hand (pinned in the provenance table) with their archived
+    media as references, then the newest archived audios without one.
+    """
+    import sqlite3
+
+    if fixtures_dir is not None:
+        pairs = []
+        for media in sorted(p for p in fixtures_dir.iterdir() if p.suffix.lower() in BENCH_MEDIA_SUFFIXES):
+            refs = [media.with_suffix(ext) for ext in (".txt", ".md")]
+            ref = next((r.read_text() for r in refs if r.exists()), None)
+            pairs.append((media, ref))
+        return pairs[:limit]
+
+    pairs, seen = [], set()
+    try:
+        conn = open_job_state(vault)
+        rows = conn.execute(
+            "SELECT path, source FROM transcripts WHERE pinned = 1 ORDER BY written_at DESC"
+        ).fetchall()
+        conn.close()
+    except sqlite3.Error:
+        rows = []
+    for rel, source in rows:
+        media, txt = archive_resolve(Path(source)), vault / rel
+        if media is not None and txt.exists():
+            pairs.append((media, txt.read_text()))
+            seen.add(media)
+    pairs += [(stored, None) for _, stored in archived_media(vault, "audios") if stored not in seen]
+    return pairs[:limit]
+
+
+def word_errors(reference: str, hypothesis: str) -> tuple[int, int]:
+    """(word edits, reference words): Levenshtein over lowercased words without punctuation."""
+    ref = re.findall(r"[\w']+", reference.lower())
+    hyp = re.findall(r"[\w']+", hypothesis.lower())
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i]
+        for j, h in enumerate(hyp, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h)))
+        prev = cur
+    return prev[-1], len(ref)
+
+
+def models_bench(vault: Path, specs: list[str], fixtures: list[tuple[Path, str | None]]) -> int:
+    """
+    Run every model spec over the same fixtures and compare load time,
+    real-time factor and word error rate against the references. Fixtures
+    without a reference are compared with the last spec's output instead
+    (agreement, not accuracy).
+    """
+    if not fixtures:
+        print("🚫 No fixtures: pass --fixtures DIR (media + <stem>.txt references) or archive some audio first.")
+        return 1
+    decoded = []
+    for media, ref in fixtures:
+        decoded.append((media, ref, decode_audio_pcm(media)))
+    audio_total = sum(len(pcm) for _, _, pcm in decoded) / WHISPER_SAMPLE_RATE
+    print(f"⏱  {len(decoded)} fixture(s), {format_age(audio_total)} of audio, "
+          f"{sum(ref is not None for _, ref, _ in decoded)} with a reference transcript")
+
+    outputs: dict[str, list[str]] = {}
+    timings: dict[str, tuple[float, float]] = {}
+    for spec in specs:
+        model = WhisperModel(spec)
+        try:
+            loaded = model.get()
+        except RuntimeError as e:
+            print(f"⚠️  {spec}: {e}")
+            continue
+        elapsed = 0.0
+        texts = []
+        for media, _, pcm in decoded:
+            t0 = time.perf_counter()
+            result = compact_result(transcribe_audio(loaded, pcm, "transcribe"))
+            took = time.perf_counter() - t0
+            elapsed += took
+            record_model_speed(spec, len(pcm) / WHISPER_SAMPLE_RATE, took)
+            texts.append("".join(f"{seg['text'].strip()}\n" for seg in result["segments"]))
+        outputs[spec] = texts
+        timings[spec] = (model.import_s + model.load_s, elapsed)
+        print(f"✅ {spec}: {elapsed:.1f}s")
+        del model, loaded
+
+    if not outputs:
+        return 1
+    baseline = list(outputs)[-1]
+    print()
+    print(f"{'model':<28} {'load':>7} {'transcribe':>11} {'rtf':>7} {'WER':>7} {'vs ' + baseline:>16}")
+    for spec, texts in outputs.items():
+        scored = {"ref": [0, 0], "base": [0, 0]}
+        for (_, ref, _), text, base_text in zip(decoded, texts, outputs[baseline]):
+            if ref is not None:
+                e, n = word_errors(ref, text)
+                scored["ref"][0] += e
+                scored["ref"][1] += n
+            else:
+                e, n = word_errors(base_text, text)
+                scored["base"][0] += e
+                scored["base"][1] += n
+        wer, diff = (f"{e / n:.1%}" if n else "-" for e, n in scored.values())
+        if spec == baseline:
+            diff = "-"
+        load_s, elapsed = timings[spec]
+        print(f"{spec:<28} {load_s:>6.1f}s {elapsed:>10.1f}s {elapsed / audio_total:>7.3f} {wer:>7} {diff:>16}")
+    return 0
+
+
+def models_command(rest: list[str]) -> int:
+    """
+    nk models [vault-path]
+    nk models calibrate [vault-path] [--models a,b] [--seconds 60] [--file PATH]
+    nk models bench [vault-path] [--models a,b] [--backends x,y] [--fixtures DIR] [--limit N]
+
+    List each candidate model's real-time factor on this machine (measured
+    or estimated) and what `-m auto` would pick for the current inboxes.
+    `calibrate` times every candidate on the same sample: the given file,
+    else the newest archived audio, else generated noise. `bench` runs the
+    given models on every backend side by side over local fixtures (see
+    bench_fixtures) and reports speed and word error rate.
+    """
+    sub = rest[0] if rest and rest[0] in ("calibrate", "bench") else None
+    args, opts = split_args(
+        rest[1:] if sub else rest, {"--models", "--seconds", "--file", "--backends", "--fixtures", "--limit"}
+    )
+    vault = Path(normalize_path(args[0] if args else ".")).resolve()
+    candidates = (
+        [vault_model_spec(vault, name) for name in opts["--models"].split(",")]
+        if opts.get("--models") else vault_candidates(vault)
+    )
+
+    if sub == "bench":
+        names = opts["--models"].split(",") if opts.get("--models") else None
+        if names is None:
+            model = vault_model_name(vault)
+            names = [split_model_spec(model)[1] if model != "auto" else DEFAULT_WHISPER_MODEL]
+        backends = opts["--backends"].split(",") if opts.get("--backends") else list(TRANSCRIPTION_BACKENDS)
+        unknown = [b for b in backends if b not in TRANSCRIPTION_BACKENDS]
+        if unknown:
+            print(f"🚫 Unknown backend(s): {', '.join(unknown)} (choices: {', '.join(TRANSCRIPTION_BACKENDS)})")
+            return 1
+        # Explicit backend:model specs run as given; bare names run on every backend
+        specs = []
+        for name in names:
+            backend, bare = split_model_spec(name)
+            specs += [model_spec(backend, bare)] if bare != name else [model_spec(b, name) for b in backends]
+        fixtures_dir = Path(opts["--fixtures"]).expanduser() if opts.get("--fixtures") else None
+        if fixtures_dir is not None and not fixtures_dir.is_dir():
+            print(f"🚫 {fixtures_dir} is not a directory.")
+            return 1
+        limit = number_arg(opts.get("--limit") or 3, "--limit")
+        return models_bench(vault, specs, bench_fixtures(vault, fixtures_dir, limit))
+
+    if sub == "calibrate":
+        seconds = number_arg(opts.get("--seconds") or 60, "--seconds", float)
+        pcm, label = calibration_sample(vault, Path(opts["--file"]) if opts.get("--file") else None, seconds)
+        audio_s = len(pcm) / WHISPER_SAMPLE_RATE
+        print(f"⏱  Calibrating on {audio_s:.0f}s of {label}")
+        for name in candidates:
+            model = WhisperModel(name)
+            try:
+                loaded = model.get()
+            except RuntimeError as e:
+                print(f"⚠️  {name}: {e}")
+                continue
+            t0 = time.perf_counter()
+            transcribe_audio(loaded, pcm, "transcribe")
+            elapsed = time.perf_counter() - t0
+            record_model_speed(name, audio_s, elapsed, replace=True)
+            print(f"✅ {name}: {elapsed / audio_s:.3f}× real time ({elapsed:.1f}s)")
+            del model, loaded
+
+    speeds = model_speeds()
+    print(f"{'model':<28} {'rtf':>7}  {'1h audio':>9}  source")
+    for name in candidates:
+        rtf, measured = estimated_rtf(name, speeds)
+        if rtf is None:
+            print(f"{name:<28} {'?':>7}  {'?':>9}  not measured")
+            continue
+        source = f"measured ({speeds[name][1]} runs)" if measured else "estimated"
+        print(f"{name:<28} {rtf:>7.3f}  {format_age(rtf * 3600):>9}  {source}")
+
+    model = vault_model_name(vault)
+    print()
+    print(f"Vault model: {model} (backend {vault_backend(vault)}); "
+          f"latency target {format_age(latency_target_seconds(vault))}")
+    if model == "auto":
+        media = pending_media(vault)
+        if media:
+            choose_model(vault, media)
+    return 0
+
+
+# === Inbox scheduling ===
+
+SCHEDULE_POLICIES = ("sjf", "fifo")
+DEFAULT_SCHEDULE_AGING = 1.0
+PRIORITY_TAG_RE = re.compile(r"\[p(\d+)\]", re.IGNORECASE)
+
+
+def schedule_policy(vault: Path) -> tuple[str, float]:
+    """(policy, aging) from NK_SCHEDULE / NK_SCHEDULE_AGING or .nk/config.json."""
+    config = vault_config(vault)
+    policy = str(os.environ.get("NK_SCHEDULE") or config.get("schedule") or "sjf").lower()
+    if policy not in SCHEDULE_POLICIES:
+        print(f"⚠️  Unknown schedule '{policy}'; using sjf (choices: {', '.join(SCHEDULE_POLICIES)})")
+        policy = "sjf"
+    name = "NK_SCHEDULE_AGING" if os.environ.get("NK_SCHEDULE_AGING") else "schedule_aging"
+    aging = os.environ.get("NK_SCHEDULE_AGING") or config.get("schedule_aging")
+    return policy, setting_number(aging, name, DEFAULT_SCHEDULE_AGING)
+
+
+def priority_sidecar(media: Path) -> Path:
+    return media.with_name(f"{media.name}.priority")
+
+
+def media_priority(media: Path) -> int:
+    """
+    Explicit priority, higher runs first (default 0): the integer in a
+    <file>.priority sidecar, else a [pN] tag in the file name.
+    """
+    sidecar = priority_sidecar(media)
+    try:
+        return int(sidecar.read_text().strip())
+    except FileNotFoundError:
+        pass
+    except ValueError:
+        print(f"⚠️  Ignoring {sidecar.name}: not an integer")
+    m = PRIORITY_TAG_RE.search(media.stem)
+    return int(m.group(1)) if m else 0
+
+
+def schedule_media(vault: Path, media: list[Path]) -> list[tuple[Path, float, float, int]]:
+    """
+    Processing order for inbox files: explicit priority first, then the
+    vault's policy.
+
+      sjf   shortest audio first; every second a file has waited takes
+            `aging` seconds off its length, so a long recording is not
+            starved once it has waited about as long as it plays
+      fifo  oldest drop first
+
+    Returns (path, dropped_at, audio_s, priority) per file, in order.
+    """
+    policy, aging = schedule_policy(vault)
+    now = time.time()
+    plan = [
+        (p, dropped, audio_s, media_priority(p))
+        for p, (dropped, audio_s) in media_durations(vault, media).items()
+    ]
+    if policy == "fifo":
+        return sorted(plan, key=lambda e: (-e[3], e[1], e[0]))
+    return sorted(plan, key=lambda e: (-e[3], e[2] - aging * (now - e[1]), e[1], e[0]))
+
+
+# === Transcript provenance and upgrades ===
+
+def upgrade_pending_marker(vault: Path) -> Path:
+    """Left while transcripts made with a smaller model than upgrade_model remain."""
+    return vault / ".nk" / "auto" / "upgrade-pending"
+
+
+def is_upgrade(model_name: str, target: str) -> bool:
+    """Whether re-transcribing with `target` improves on `model_name` (never downgrades)."""
+    old_cost, new_cost = model_cost(model_name), model_cost(target)
+    if model_name == target:
+        return False
+    return old_cost is None or new_cost is None or old_cost < new_cost
+
+
+def upgrade_candidates(vault: Path, target: str) -> list[tuple]:
+    """Unpinned transcripts a smaller model wrote, newest first."""
+    conn = open_job_state(vault)
+    rows = conn.execute(
+        "SELECT path, source, kind, model, task, audio_s, mtime_ns FROM transcripts "
+        "WHERE pinned = 0 ORDER BY written_at DESC"
+    ).fetchall()
+    conn.close()
+    return [row for row in rows if is_upgrade(row[3], target)]
+
+
+def record_transcript(
+    vault: Path,
+    txt_dst: Path,
+    source: Path,
+    kind: str,
+    model_name: str,
+    task: str,
+    audio_s: float | None,
+    upgraded_from: str | None = None,
+) -> None:
+    """
+    Remember which model wrote a transcript and from which archived media,
+    with its mtime so later upgrades can tell if it was edited by hand.
+    """
+    try:
+        mtime_ns = txt_dst.stat().st_mtime_ns
+    except FileNotFoundError:
+        return
+    _job_write(
+        vault,
+        "INSERT OR REPLACE INTO transcripts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+        [(job_key(vault, txt_dst), str(source), kind, model_name, task, audio_s,
+          time.time(), mtime_ns, upgraded_from)],
+    )
+    upgrade = upgrade_model_name(vault)
+    if upgrade and is_upgrade(model_name, upgrade):
+        marker = upgrade_pending_marker(vault)
+        marker.parent.mkdir(parents=True, exist_ok=True)
+        marker.touch()
+
+
+def machine_idle() -> bool:
+    """1-minute load average below NK_UPGRADE_MAX_LOAD (default: half the CPUs)."""
+    limit = env_number("NK_UPGRADE_MAX_LOAD", available_cpus() / 2)
+    try:
+        return os.getloadavg()[0] < limit
+    except OSError:
+        return True
+
+
+def auto_upgrade(
+    vault: Path, model_name: str | None = None, budget_s: float | None = None, limit: int | None = None
+) -> int:
+    """
+    nk auto upgrade [vault-path] [-m MODEL] [--budget 10m] [--limit N]
+
+    Re-transcribe transcripts written by a smaller model with the upgrade
+    model, from the media kept in the local archive, newest first. A
+    transcript changed since nk wrote it is pinned and never overwritten;
+    one whose media is no longer archived is pinned too. Stops before a
+    file that would not fit in the remaining budget.
+    """
+    import sqlite3
+
+    vault = vault.resolve()
+    target = vault_model_spec(vault, model_name) if model_name else upgrade_model_name(vault)
+    if not target:
+        print("🚫 No upgrade model: pass -m MODEL, set NK_UPGRADE_MODEL or \"upgrade_model\" in .nk/config.json.")
+        return 1
+    marker = upgrade_pending_marker(vault)
+    try:
+        rows = upgrade_candidates(vault, target)
+    except sqlite3.Error as e:
+        print(f"⚠️  Could not read transcript provenance: {e}")
+        return 1
+    if not rows:
+        print(f"✅ No transcript left to upgrade to '{target}'.")
+        marker.unlink(missing_ok=True)
+        return 0
+
+    rtf = estimated_rtf(target, model_speeds())[0]
+    model = resident_model(target)
+    run_start = time.perf_counter()
+    deadline = time.monotonic() + budget_s if budget_s else None
+    upgraded = 0
+    print(f"⬆️  {len(rows)} transcript(s) to upgrade to '{target}'")
+    for rel, source_raw, kind, old_model, task, audio_s, mtime_ns in rows:
+        if limit is not None and upgraded >= limit:
+            break
+        if deadline is not None and rtf is not None and audio_s:
+            if time.monotonic() + audio_s * rtf > deadline:
+                print(f"⏱  Budget left is too short for {Path(rel).name}; stopping.")
+                break
+        txt_dst = vault / rel
+        source = archive_resolve(Path(source_raw))
+        pin = None
+        if not txt_dst.exists() or txt_dst.stat().st_mtime_ns != mtime_ns:
+            pin = "edited since it was written"
+        elif source is None:
+            pin = "media no longer archived"
+        if pin is not None:
+            print(f"📌 Keeping {txt_dst.name} ({pin})")
+            _job_write(vault, "UPDATE transcripts SET pinned = 1 WHERE path = ?", [(rel,)])
+            continue
+        if not claim_media(source):
+            print(f"⏭  Already claimed by another run: {Path(source_raw).name}")
+            continue
+        print(f"⬆️  {txt_dst.name}: {old_model} → {target}")
+        stages: dict[str, float] = {}
+        try:
+            pcm = decode_audio_pcm(source)
+            result, _ = timed_transcribe(model, pcm, task, checkpoint_path(source), stages)
+        except Exception as e:
+            print(f"⚠️  Skipped: upgrade failed for {txt_dst.name}: {e}")
+            continue
+        finally:
+            release_media(source)
+        if txt_dst.stat().st_mtime_ns != mtime_ns:
+            print(f"📌 Keeping {txt_dst.name} (edited while it was being upgraded)")
+            _job_write(vault, "UPDATE transcripts SET pinned = 1 WHERE path = ?", [(rel,)])
+            continue
+        write_transcript(result, txt_dst, transcript_timestamps(vault))
+        record_transcript(
+            vault, txt_dst, Path(source_raw), kind, target, task, len(pcm) / WHISPER_SAMPLE_RATE,
+            upgraded_from=old_model,
+        )
+        upgraded += 1
+        if deadline is not None and time.monotonic() > deadline:
+            break
+
+    left = len(rows) - upgraded
+    run_s = time.perf_counter() - run_start
+    record_run_metrics(vault, "auto upgrade", run_s, files=upgraded, model=target)
+    print(f"✅ Upgraded {upgraded} transcript(s) in {format_age(run_s)}")
+    try:
+        left = len(upgrade_candidates(vault, target))
+    except sqlite3.Error:
+        pass
+    if left:
+        print(f"   {left} left for a later run.")
+    else:
+        marker.unlink(missing_ok=True)
+    return 0
+
+
+def process_one_audio(
+    model: WhisperModel, audio: Path, vault: Path, task: str
+) -> float | None:
+    """
+    Transcribe one claimed inbox mp3, write its transcript and archive it.
+    Returns the seconds spent, or None if the file was skipped.
+    """
+    audios_transcripts = vault / "audios" / "transcripts"
+
+    print(f"🎧 Processing: {audio.name}")
+    t0 = time.perf_counter()
+    started_at = time.time()
+    dropped_at = audio.stat().st_mtime
+    stages: dict[str, float] = {}
+    job_start(vault, audio, model.name)
+    try:
+        pcm = decode_audio_pcm(audio)
+        stages["decode"] = time.perf_counter() - t0
+        job_stage(vault, audio, "transcribing")
+        result, cache_hit = timed_transcribe(model, pcm, task, checkpoint_path(audio), stages)
+        if cache_hit:
+            print("⚡ Transcript cache hit")
+    except Exception as e:
+        job_failed(vault, audio, str(e))
+        record_file_metrics(vault, audio, "audio", model, stages, dropped_at, started_at, error=str(e))
+        print(f"⚠️  Skipped: transcription failed for {audio}: {e}")
+        return None
+
+    t = time.perf_counter()
+    txt_dst = audios_transcripts / f"{audio.stem}.md"
+    write_transcript(result, txt_dst, transcript_timestamps(vault))
+    stages["write"] = time.perf_counter() - t
+    print(f"✅ Saved transcript: {txt_dst.name}")
+    t = time.perf_counter()
+    size = audio.stat().st_size
+    archived = archive_media(vault, audio, "audios")
+    priority_sidecar(audio).unlink(missing_ok=True)
+    stages["move"] = time.perf_counter() - t
+    print(f"✅ Archived audio: {audio.name}")
+    audio_s = len(pcm) / WHISPER_SAMPLE_RATE
+    job_done(vault, audio, audio_s)
+    record_transcript(vault, txt_dst, archived, "audio", model.name, task, audio_s)
+    record_file_metrics(
+        vault, audio, "audio", model, stages, dropped_at, started_at,
+        audio_s=audio_s, cache_hit=cache_hit, bytes_moved=size,
+    )
+    return time.perf_counter() - t0
+
+
+def process_one_video(
+    model: WhisperModel, video: Path, vault: Path, task: str, keep_audio: bool = False
+) -> float | None:
+    """
+    Direct video path: decode the video's audio track to PCM over a pipe and
+    transcribe it, with no intermediate MP3 (unless keep_audio).
+
+    - videos/inbox/<base>.mp4 -> audios/transcripts/<base>.md
+    - video archived to $NK_LOCAL_ARCHIVE_ROOT/<vault>/videos
+    - keep_audio: MP3 written to $NK_LOCAL_ARCHIVE_ROOT/<vault>/audios
+    """
+    audios_transcripts = vault / "audios" / "transcripts"
+    audios_archive = local_archive_dir(vault, "audios")
+
+    print(f"🎬 Processing: {video.name}")
+    t0 = time.perf_counter()
+    started_at = time.time()
+    dropped_at = video.stat().st_mtime
+    stages: dict[str, float] = {}
+    mp3_tmp = None
+    if keep_audio:
+        audios_archive.mkdir(parents=True, exist_ok=True)
+        mp3_tmp = audios_archive / f".{video.stem}.mp3.tmp.mp3"
+    job_start(vault, video, model.name)
+    try:
+        pcm = decode_audio_pcm(video, keep_audio=mp3_tmp)
+        stages["decode"] = time.perf_counter() - t0
+        print(f"✅ Decoded audio track ({len(pcm) / WHISPER_SAMPLE_RATE:.0f}s of audio)")
+        job_stage(vault, video, "transcribing")
+        result, cache_hit = timed_transcribe(model, pcm, task, checkpoint_path(video), stages)
+        if cache_hit:
+            print("⚡ Transcript cache hit")
+    except Exception as e:
+        if mp3_tmp is not None:
+            mp3_tmp.unlink(missing_ok=True)
+        job_failed(vault, video, str(e))
+        record_file_metrics(vault, video, "video", model, stages, dropped_at, started_at, error=str(e))
+        print(f"⚠️  Skipped: transcription failed for {video}: {e}")
+        return None
+
+    t = time.perf_counter()
+    txt_dst = audios_transcripts / f"{video.stem}.md"
+    write_transcript(result, txt_dst, transcript_timestamps(vault))
+    stages["write"] = time.perf_counter() - t
+    print(f"✅ Saved transcript: {txt_dst.name}")
+    t = time.perf_counter()
+    size = video.stat().st_size
+    if mp3_tmp is not None:
+        size += mp3_tmp.stat().st_size
+        archive_media(vault, mp3_tmp, "audios", f"{video.stem}.mp3")
+        print(f"✅ Kept audio: {video.stem}.mp3")
+    archived = archive_media(vault, video, "videos")
+    priority_sidecar(video).unlink(missing_ok=True)
+    stages["move"] = time.perf_counter() - t
+    print(f"✅ Archived video: {video.name}")
+    audio_s = len(pcm) / WHISPER_SAMPLE_RATE
+    job_done(vault, video, audio_s)
+    record_transcript(vault, txt_dst, archived, "video", model.name, task, audio_s)
+    record_file_metrics(
+        vault, video, "video", model, stages, dropped_at, started_at,
+        audio_s=audio_s, cache_hit=cache_hit, bytes_moved=size,
+    )
+    return time.perf_counter() - t0
+
+
+def process_videos_direct(
+    vault: Path, model_name: str, task: str = "transcribe", keep_audio: bool = False
+) -> int:
+    """
+    Transcribe every .mp4 in videos/inbox by streaming its audio straight into
+    the in-process Whisper model (one ffmpeg decode, no temp MP3 on disk).
+    """
+    videos_inbox = vault / "videos" / "inbox"
+    if not videos_inbox.is_dir():
+        print(f"Error: '{videos_inbox}' does not exist. Run `nk vault init` first.")
+        return 1
+
+    videos = sorted(p for p in videos_inbox.glob("*.mp4") if p.is_file())
+    if not videos:
+        print(f"No new videos found in {videos_inbox}.")
+        return 0
+    job_register(vault, videos)
+    videos = [p for p, *_ in schedule_media(vault, videos)]
+    if model_name == "auto":
+        model_name = choose_model(vault, videos)
+
+    run_start = time.perf_counter()
+    model = resident_model(model_name)
+
+    file_times: list[tuple[str, float]] = []
+    for video in videos:
+        if not claim_media(video):
+            print(f"⏭  Already claimed by another run: {video.name}")
+            continue
+        try:
+            seconds = process_one_video(model, video, vault, task, keep_audio)
+        finally:
+            release_media(video)
+        if seconds is not None:
+            file_times.append((video.name, seconds))
+
+    if not file_times:
+        print(f"No videos transcribed from {videos_inbox}.")
+    else:
+        print(f"Done. Transcribed {len(file_times)} videos.")
+        print(f"Transcripts are in: {vault / 'audios' / 'transcripts'}")
+
+    run_s = time.perf_counter() - run_start
+    record_run_metrics(
+        vault, "videos process --direct", run_s, files=len(file_times), failed=len(videos) - len(file_times),
+    )
+    print_timing_report(model_name, model.import_s, model.load_s, file_times, run_s)
+    return 0
+
+
+def media_kind(path: Path) -> str | None:
+    suffix = path.suffix.lower()
+    if suffix == ".mp4" and path.parent.parent.name == "videos":
+        return "video"
+    if suffix == ".mp3" and path.parent.parent.name == "audios":
+        return "audio"
+    return None
+
+
+def process_media_pipeline(
+    vault: Path,
+    model_name: str,
+    task: str = "transcribe",
+    keep_audio: bool = False,
+    model: "WhisperModel | None" = None,
+    only: list[Path] | None = None,
+) -> int:
+    """
+    Single-pass media pipeline: video -> audio -> transcript in one run.
+
+    Stages are connected by an in-memory queue instead of inbox folders:
+    1) decode: a thread decodes each video's audio track (and each inbox mp3)
+       to 16 kHz PCM, running ahead of transcription
+    2) transcribe: the main thread runs the resident model on each PCM buffer
+       (or answers from the transcript cache)
+    3) finish: transcript written, originals archived
+
+    A freshly dropped MP4 is transcribed in the same invocation, and the run
+    reports end-to-end latency per file (since drop and since run start).
+
+    Files run in schedule_media order. Before each file the inboxes are
+    listed again, so a voice memo dropped while a long recording is being
+    transcribed joins this run (after the files already decoded) instead of
+    waiting for the next one.
+
+    Long-running callers (nk watch) pass their resident `model` and the
+    settled files to process in `only`. With model_name "auto" the model is
+    chosen for this batch by choose_model.
+    """
+    import queue
+    import threading
+
+    videos_inbox = vault / "videos" / "inbox"
+    audios_inbox = vault / "audios" / "inbox"
+    audios_transcripts = vault / "audios" / "transcripts"
+
+    if not videos_inbox.is_dir() and not audios_inbox.is_dir():
+        print(f"Error: no videos/inbox or audios/inbox under '{vault}'. Run `nk vault init` first.")
+        return 1
+
+    sources: list[tuple[str, Path]] = []
+    if only is not None:
+        sources = [(media_kind(p), p) for p in only if media_kind(p) and p.is_file()]
+    else:
+        if audios_inbox.is_dir():
+            sources += [("audio", p) for p in sorted(audios_inbox.glob("*.mp3")) if p.is_file()]
+        if videos_inbox.is_dir():
+            sources += [("video", p) for p in sorted(videos_inbox.glob("*.mp4")) if p.is_file()]
+    if not sources:
+        print(f"No new media found in {videos_inbox} or {audios_inbox}.")
+        return 0
+    job_register(vault, [src for _, src in sources])
+    planned = [src for src, *_ in schedule_media(vault, [src for _, src in sources])]
+    seen = set(planned)
+
+    run_start = time.perf_counter()
+    run_start_wall = time.time()
+    handoff: queue.Queue = queue.Queue(maxsize=2)  # bounds PCM held in memory
+
+    def next_source() -> Path | None:
+        nonlocal planned
+        if only is None:
+            try:
+                fresh = [p for p in pending_media(vault) if p not in seen and media_kind(p)]
+                if fresh:
+                    job_register(vault, fresh)
+                    replanned = [src for src, *_ in schedule_media(vault, planned + fresh)]
+                    print(f"📥 {len(fresh)} new file(s) joined the queue")
+                    seen.update(fresh)
+                    planned = replanned
+            except Exception as e:
+                # Rescheduling is best-effort: keep going with the plan in hand
+                print(f"⚠️  Could not rescan the inboxes: {e}")
+        return planned.pop(0) if planned else None
+
+    def decode_stage() -> None:
+        # Whatever happens here, the consumer must get its None, or it waits forever
+        try:
+            while True:
+                src = next_source()
+                if src is None:
+                    # Let the files in hand finish, then look once more for new arrivals
+                    handoff.join()
+                    src = next_source()
+                    if src is None:
+                        break
+                kind = media_kind(src)
+                if not claim_media(src):
+                    print(f"⏭  Already claimed by another run: {src.name}")
+                    continue
+                started = time.time()
+                item = {
+                    "kind": kind, "src": src, "dropped": started, "mp3_tmp": None,
+                    "started": started, "stages": {},
+                }
+                t0 = time.perf_counter()
+                try:
+                    item["dropped"] = src.stat().st_mtime
+                    job_start(vault, src, model.name)
+                    if kind == "video" and keep_audio:
+                        archive = local_archive_dir(vault, "audios")
+                        archive.mkdir(parents=True, exist_ok=True)
+                        item["mp3_tmp"] = archive / f".{src.stem}.mp3.tmp.mp3"
+                    item["pcm"] = decode_audio_pcm(src, keep_audio=item["mp3_tmp"])
+                except Exception as e:
+                    item["error"] = e  # reported, and the claim released, by the consumer
+                item["stages"]["decode"] = time.perf_counter() - t0
+                handoff.put(item)
+        except Exception as e:
+            print(f"⚠️  Decoder stopped, finishing the files already decoded: {e}")
+        finally:
+            handoff.put(None)
+
+    if model is None:
+        if model_name == "auto":
+            # One model resident at a time: drop the one picked last batch
+            model_name = choose_model(vault, planned)
+            for other in [m for m in _RESIDENT_MODELS if m != model_name]:
+                del _RESIDENT_MODELS[other]
+        model = resident_model(model_name)
+
+    decoder = threading.Thread(target=decode_stage, name="nk-decode", daemon=True)
+    decoder.start()
+
+    file_times: list[tuple[str, float]] = []
+    latencies: list[tuple[str, float, float]] = []
+    while (item := handoff.get()) is not None:
+        src: Path = item["src"]
+        stages: dict[str, float] = item["stages"]
+        icon = "🎬" if item["kind"] == "video" else "🎧"
+        print(f"{icon} Processing: {src.name}")
+        try:
+            if "error" in item:
+                raise item["error"]
+            job_stage(vault, src, "transcribing")
+            result, cache_hit = timed_transcribe(model, item["pcm"], task, checkpoint_path(src), stages)
+            if cache_hit:
+                print("⚡ Transcript cache hit")
+
+            t0 = time.perf_counter()
+            txt_dst = audios_transcripts / f"{src.stem}.md"
+            write_transcript(result, txt_dst, transcript_timestamps(vault))
+            stages["write"] = time.perf_counter() - t0
+            print(f"✅ Saved transcript: {txt_dst.name}")
+            t0 = time.perf_counter()
+            size = src.stat().st_size
+            if item["mp3_tmp"] is not None:
+                size += item["mp3_tmp"].stat().st_size
+                archive_media(vault, item["mp3_tmp"], "audios", f"{src.stem}.mp3")
+                print(f"✅ Kept audio: {src.stem}.mp3")
+            archived = archive_media(vault, src, "videos" if item["kind"] == "video" else "audios")
+            priority_sidecar(src).unlink(missing_ok=True)
+            stages["move"] = time.perf_counter() - t0
+            print(f"✅ Archived {item['kind']}: {src.name}")
+        except Exception as e:
+            if item["mp3_tmp"] is not None:
+                item["mp3_tmp"].unlink(missing_ok=True)
+            job_failed(vault, src, str(e))
+            record_file_metrics(
+                vault, src, item["kind"], model, stages, item["dropped"], item["started"], error=str(e)
+            )
+            print(f"⚠️  Skipped: processing failed for {src}: {e}")
+            continue
+        finally:
+            release_media(src)
+            pcm = item.pop("pcm", None)
+            handoff.task_done()
+
+        audio_s = len(pcm) / WHISPER_SAMPLE_RATE
+        job_done(vault, src, audio_s)
+        record_transcript(vault, txt_dst, archived, item["kind"], model.name, task, audio_s)
+        record_file_metrics(
+            vault, src, item["kind"], model, stages, item["dropped"], item["started"],
+            audio_s=audio_s, cache_hit=cache_hit, bytes_moved=size,
+        )
+
+        done = time.time()
+        file_times.append((src.name, stages["decode"] + stages["transcribe"]))
+        latencies.append((src.name, done - item["dropped"], done - run_start_wall))
+
+    if not file_times:
+        print("No media transcribed.")
+    else:
+        print(f"Done. Transcribed {len(file_times)} media files.")
+        print(f"Transcripts are in: {audios_transcripts}")
+        print()
+        print("⏱  End-to-end latency")
+        for name, since_drop, since_start in latencies:
+            print(f"   {name}: {since_drop:.1f}s since drop, {since_start:.1f}s since run start")
+
+    run_s = time.perf_counter() - run_start
+    record_run_metrics(
+        vault, "media process", run_s, files=len(file_times), failed=len(seen) - len(file_times),
+    )
+    print_timing_report(model_name, model.import_s, model.load_s, file_times, run_s)
+    return 0
+
+
+# === Live recording (nk audios record --live) ===
+
+DEFAULT_LIVE_CHUNK_SECONDS = 30
+DEFAULT_LIVE_OVERLAP_SECONDS = 5
+
+
+def record_input_args() -> list[str]:
+    """
+    ffmpeg input for recordings, from NK_RECORD_INPUT ("format:device",
+    default "pulse:default" like notes-audios-record.sh). "file:<path>"
+    replays a file in real time, which is handy for testing.
+    """
+    raw = os.environ.get("NK_RECORD_INPUT") or "pulse:default"
+    fmt, _, device = raw.partition(":")
+    if fmt == "file":
+        return ["-re", "-i", device]
+    return ["-f", fmt, "-i", device or "default"]
+
+
+def record_filename(name: str) -> str:
+    """Same naming as notes-audios-record.sh (without the extension)."""
+    if not name:
+        return datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    return re.sub(r"[^A-Za-z0-9_-]", "", name.replace(" ", "-"))
+
+
+def record_live(
+    vault: Path,
+    name: str,
+    model_name: str,
+    task: str = "transcribe",
+    chunk_s: float = DEFAULT_LIVE_CHUNK_SECONDS,
+    overlap_s: float = DEFAULT_LIVE_OVERLAP_SECONDS,
+) -> int:
+    """
+    Record 16 kHz mono and transcribe while recording.
+
+    One ffmpeg process captures the input and writes two outputs: raw PCM
+    on a pipe for the in-process model, and the MP3 kept in the local
+    archive. Every `chunk_s` seconds of new audio the model transcribes a
+    window starting at the last committed segment. Segments that end in
+    the last `overlap_s` seconds of a window are not committed yet; they are
+    transcribed again with the next window, so words cut at a window edge
+    are not lost or doubled. Committed lines are appended (and fsynced) to
+    audios/transcripts/<name>.md as they come. After Ctrl+C only the
+    uncommitted tail is left to transcribe.
+    """
+    import signal
+    import threading
+
+    import numpy as np
+
+    base = record_filename(name)
+    transcripts = vault / "audios" / "transcripts"
+    transcripts.mkdir(parents=True, exist_ok=True)
+    archive = local_archive_dir(vault, "audios")
+    archive.mkdir(parents=True, exist_ok=True)
+    txt_dst = transcripts / f"{base}.md"
+    mp3_part = archive / f".{base}.mp3.part"
+    mp3_dst = archive / f"{base}.mp3"
+    if txt_dst.exists() or archive_resolve(mp3_dst) is not None:
+        print(f"🚫 A recording named '{base}' already exists ({txt_dst.name}); pick another name.")
+        return 1
+    if overlap_s * 2 >= chunk_s:
+        print("🚫 --overlap must be less than half of --chunk.")
+        return 1
+    if model_name == "auto":
+        model_name = choose_live_model(vault)
+    timestamps = transcript_timestamps(vault)
+
+    cmd = [
+        "ffmpeg", "-nostdin", "-loglevel", "error", "-y",
+        *record_input_args(),
+        "-map", "0:a", "-ac", "1", "-ar", str(WHISPER_SAMPLE_RATE), "-f", "s16le", "pipe:1",
+        "-map", "0:a", "-ac", "1", "-ar", str(WHISPER_SAMPLE_RATE),
+        # Flushed per packet: the archived audio survives a crash or a kill
+        "-c:a", "libmp3lame", "-q:a", "4", "-flush_packets", "1", "-f", "mp3", str(mp3_part),
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+    print(f"🎙  Recording live: {txt_dst}")
+    print("Press Ctrl+C to STOP.")
+
+    # The pipe is drained by a thread so ffmpeg never blocks on a slow model
+    chunks: list[bytes] = []
+    lock = threading.Lock()
+
+    def reader() -> None:
+        while block := proc.stdout.read(WHISPER_SAMPLE_RATE):  # 0.5 s of s16le
+            with lock:
+                chunks.append(block)
+
+    reader_thread = threading.Thread(target=reader, name="nk-record", daemon=True)
+    reader_thread.start()
+
+    stop = threading.Event()
+    stopped_at: list[float] = []
+
+    def on_sigint(signum, frame) -> None:
+        if not stop.is_set():
+            stopped_at.append(time.time())
+            stop.set()
+            print("\n⏹  Stopping; finishing the transcript...")
+            if proc.poll() is None:
+                # ffmpeg finishes its outputs cleanly on SIGTERM too, and
+                # unlike SIGINT it is not ignored when nk runs in the background
+                proc.terminate()
+
+    previous_handler = signal.signal(signal.SIGINT, on_sigint)
+
+    model = resident_model(model_name)
+    # Only audio after the last committed segment is kept in memory:
+    # pcm[0] is at offset_s seconds into the recording
+    pcm = np.zeros(0, np.float32)
+    offset_s = 0.0
+    committed_s = 0.0
+    committed: list[dict] = []
+    language = None
+    t_start = time.time()
+    rate = WHISPER_SAMPLE_RATE
+
+    def take_new_audio() -> None:
+        nonlocal pcm
+        with lock:
+            data = b"".join(chunks)
+            chunks.clear()
+        if len(data) % 2:  # never split a sample
+            with lock:
+                chunks.insert(0, data[-1:])
+            data = data[:-1]
+        if data:
+            pcm = np.concatenate([pcm, np.frombuffer(data, np.int16).astype(np.float32) / 32768.0])
+
+    def recorded_s() -> float:
+        return offset_s + len(pcm) / rate
+
+    def transcribe_window(final: bool) -> None:
+        nonlocal pcm, offset_s, committed_s, language
+        end_s = min(recorded_s(), committed_s + chunk_s)
+        window = pcm[int((committed_s - offset_s) * rate):int((end_s - offset_s) * rate)]
+        if len(window) < rate // 2:  # under half a second: nothing to say
+            committed_s = end_s
+            return
+        prompt = " ".join(seg["text"].strip() for seg in committed[-3:]) or None
+        t0 = time.perf_counter()
+        result = transcribe_audio(model.get(), window, task, initial_prompt=prompt)
+        language = language or result.get("language")
+        # The tail of a window is transcribed again next time, unless this is
+        # the last window of the recording
+        last = final and end_s >= recorded_s()
+        horizon = end_s if last else end_s - overlap_s
+        new = []
+        for seg in result.get("segments", []):
+            seg_end = committed_s + seg["end"]
+            if seg_end <= (new[-1]["end"] if new else committed_s):
+                continue  # zero-length or out of order: nothing new
+            # A segment longer than the stable part is committed on its own
+            # rather than re-transcribed forever
+            if seg_end > horizon + 0.01 and new:
+                break
+            new.append({"start": committed_s + seg["start"], "end": seg_end, "text": seg["text"]})
+            if seg_end > horizon + 0.01:
+                break
+        if new:
+            with txt_dst.open("a") as f:
+                f.write(transcript_lines(new, timestamps))
+                f.flush()
+                os.fsync(f.fileno())
+            committed.extend(new)
+            # Always move on by at least half a second (the shortest window
+            # worth transcribing) and never past the audio we have
+            committed_s = min(end_s, max(new[-1]["end"], committed_s + 0.5))
+        else:
+            committed_s = horizon  # silence: keep moving
+        drop = int((committed_s - offset_s) * rate)
+        pcm = pcm[drop:]
+        offset_s += drop / rate
+        lag = recorded_s() - committed_s
+        print(f"   📝 {format_age(committed_s)} transcribed ({time.perf_counter() - t0:.1f}s"
+              f"{f', {lag:.0f}s behind' if lag > 2 * chunk_s and not final else ''})")
+
+    txt_dst.touch()
+    try:
+        while not stop.is_set() and proc.poll() is None:
+            stop.wait(0.5)
+            take_new_audio()
+            if recorded_s() - committed_s >= chunk_s:
+                transcribe_window(final=False)
+        t_stop = stopped_at[0] if stopped_at else time.time()
+        stop.set()
+        try:
+            proc.wait(timeout=3)
+        except subprocess.TimeoutExpired:
+            proc.kill()  # the MP3 stream stays playable up to the last frame
+            proc.wait()
+        reader_thread.join()
+        take_new_audio()
+        while recorded_s() - committed_s > 0.05:
+            transcribe_window(final=True)
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+
+    audio_s = recorded_s()
+    if mp3_part.exists():
+        archive_media(vault, mp3_part, "audios", mp3_dst.name)
+        print(f"✅ Archived audio: {mp3_dst}")
+    elif proc.returncode:
+        print(f"⚠️  ffmpeg exited with {proc.returncode}; no audio was archived.")
+    # Final atomic rewrite from the committed segments (same content)
+    write_transcript({"segments": committed}, txt_dst, timestamps)
+    if archive_resolve(mp3_dst) is not None:
+        record_transcript(vault, txt_dst, mp3_dst, "live", model.name, task, audio_s)
+    finish_s = time.time() - t_stop
+    print(f"✅ Saved transcript: {txt_dst.name} ({format_age(audio_s)} of audio, "
+          f"finished {finish_s:.1f}s after stop)")
+    record_metrics(vault, {
+        "type": "run", "command": "audios record --live", "run_s": round(time.time() - t_start, 4),
+        "audio_s": round(audio_s, 3), "finish_after_stop_s": round(finish_s, 3),
+        "model": model.name, "language": language,
+    })
+    return 0 if audio_s > 0 else 1
+
+
+# === Watch mode (inotify) ===
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+
+
+def inotify_open(dirs: list[Path]):
+    """
+    Subscribe to inotify events on `dirs` via libc (Linux only, no extra deps).
+    Returns (fd, {wd: dir}) or None when inotify is not available.
+    """
+    import ctypes
+    import ctypes.util
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        fd = libc.inotify_init1(os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+
+    mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+    watches: dict[int, Path] = {}
+    for d in dirs:
+        wd = libc.inotify_add_watch(fd, str(d).encode(), mask)
+        if wd < 0:
+            os.close(fd)
+            return None
+        watches[wd] = d
+    return fd, watches
+
+
+def inotify_read(fd: int, watches: dict[int, Path], timeout: float) -> list[tuple[Path, int]]:
+    """
+    Wait up to `timeout` seconds and return [(path, mask), ...] for the
+    events received.
+    """
+    import select
+    import struct
+
+    ready, _, _ = select.select([fd], [], [], timeout)
+    if not ready:
+        return []
+    buf = os.read(fd, 64 * 1024)
+    events: list[tuple[Path, int]] = []
+    offset = 0
+    while offset + 16 <= len(buf):
+        wd, mask, _cookie, name_len = struct.unpack_from("iIII", buf, offset)
+        name = buf[offset + 16: offset + 16 + name_len].rstrip(b"\0").decode(errors="replace")
+        offset += 16 + name_len
+        if wd in watches and name:
+            events.append((watches[wd] / name, mask))
+    return events
+
+
+def watch_vault(vault: Path, model_name: str, task: str = "transcribe") -> int:
+    """
+    Long-running watcher: process media dropped into videos/inbox and
+    audios/inbox within seconds, instead of on the next timer tick.
+
+    A file is only picked up once its writes have finished: it must have been
+    closed after writing (or moved in), and its size/mtime must stay unchanged
+    for NK_WATCH_SETTLE seconds (default 2). A recording that is still growing
+    is left alone. The Whisper model stays loaded between batches.
+
+    Falls back to polling every NK_WATCH_POLL seconds (default 5) when
+    inotify is not available.
+    """
+    videos_inbox = vault / "videos" / "inbox"
+    audios_inbox = vault / "audios" / "inbox"
+    inboxes = [d for d in (videos_inbox, audios_inbox) if d.is_dir()]
+    if not inboxes:
+        print(f"Error: no videos/inbox or audios/inbox under '{vault}'. Run `nk vault init` first.")
+        return 1
+
+    settle = env_number("NK_WATCH_SETTLE", 2.0)
+    poll = env_number("NK_WATCH_POLL", 5.0)
+    # "auto" picks (and keeps resident) a model per batch in the pipeline
+    model = None if model_name == "auto" else resident_model(model_name)
+
+    # path -> (size, mtime, closed, last_change)
+    pending: dict[Path, tuple[int, float, bool, float]] = {}
+    # Files that failed: path -> (attempts, retry_at, size, mtime). They are
+    # retried with a doubling backoff, or right away if dropped again.
+    retry: dict[Path, tuple[int, float | None, int, float]] = {}
+
+    def observe(path: Path, closed: bool) -> None:
+        if media_kind(path) is None:
+            return
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            pending.pop(path, None)
+            retry.pop(path, None)
+            return
+        if path in retry:
+            if (st.st_size, st.st_mtime) == retry[path][2:]:
+                return
+            del retry[path]
+        prev = pending.get(path)
+        if prev is None:
+            job_register(vault, [path])
+        changed = prev is None or (st.st_size, st.st_mtime) != prev[:2]
+        pending[path] = (
+            st.st_size,
+            st.st_mtime,
+            closed or (prev[2] if prev and not changed else False),
+            time.monotonic() if changed else prev[3],
+        )
+
+    # Files already waiting when the watcher starts count as finished writes
+    # once they have settled.
+    for d in inboxes:
+        for p in d.iterdir():
+            observe(p, closed=True)
+
+    ino = inotify_open(inboxes)
+    mode = "inotify" if ino else f"polling every {poll:.0f}s"
+    print(f"👀 Watching {', '.join(str(d) for d in inboxes)} ({mode}, settle {settle:.0f}s)")
+    print("Press Ctrl+C to stop.")
+
+    try:
+        while True:
+            timeout = settle if pending else poll
+            retry_at = [at for _, at, _, _ in retry.values() if at is not None]
+            if retry_at:
+                timeout = max(0.1, min(timeout, min(retry_at) - time.monotonic()))
+            if ino:
+                fd, watches = ino
+                for path, mask in inotify_read(fd, watches, timeout):
+                    observe(path, closed=bool(mask & (IN_CLOSE_WRITE | IN_MOVED_TO)))
+            else:
+                time.sleep(timeout)
+                for d in inboxes:
+                    for p in d.iterdir():
+                        # Without inotify, a stable size/mtime is the only signal
+                        observe(p, closed=True)
+
+            now = time.monotonic()
+            for path in list(pending):
+                observe(path, closed=False)
+            ready = sorted(
+                p for p, (_, _, closed, changed) in pending.items()
+                if closed and now - changed >= settle
+            )
+            due = sorted(p for p, (_, at, _, _) in retry.items() if at is not None and at <= now)
+            for p in due:
+                if not p.exists():  # taken away meanwhile
+                    del retry[p]
+            due = [p for p in due if p in retry]
+            if not ready and not due:
+                continue
+            for p in ready:
+                pending.pop(p, None)
+
+            if ready:
+                print(f"📥 {len(ready)} new file(s): {', '.join(p.name for p in ready)}")
+            if due:
+                print(f"🔁 Retrying {len(due)} failed file(s): {', '.join(p.name for p in due)}")
+            batch = ready + due
+            # Pull before writing transcripts, like nk auto tick: a pull
+            # --rebase after them would fail on the dirty tree
+            in_git = is_git_repo(vault)
+            git_s = 0.0
+            if in_git:
+                t = time.perf_counter()
+                git_pull(vault)
+                git_s += time.perf_counter() - t
+            process_media_pipeline(vault, model_name, task, model=model, only=batch)
+            for p in batch:
+                try:
+                    st = p.stat()  # processed files leave the inbox
+                except FileNotFoundError:
+                    retry.pop(p, None)
+                    continue
+                attempts = retry[p][0] + 1 if p in retry else 1
+                if attempts >= JOB_MAX_ATTEMPTS:
+                    print(f"🚫 {p.name} failed {attempts} times; drop it into the inbox again to retry.")
+                    retry[p] = (attempts, None, st.st_size, st.st_mtime)
+                else:
+                    wait = JOB_RETRY_BACKOFF * 2 ** (attempts - 1)
+                    print(f"⚠️  {p.name} was not processed; retrying in {format_age(wait)}.")
+                    retry[p] = (attempts, time.monotonic() + wait, st.st_size, st.st_mtime)
+            if in_git:
+                t = time.perf_counter()
+                git_push_transcripts(vault)
+                git_s += time.perf_counter() - t
+                record_run_metrics(vault, "watch git sync", git_s)
+    except KeyboardInterrupt:
+        print("👋 Watcher stopped.")
+    finally:
+        if ino:
+            os.close(ino[0])
+    return 0
+
+
+# === Git sync (transcripts only) ===
+
+def is_git_repo(vault: Path) -> bool:
+    result = subprocess.run(
+        ["git", "rev-parse", "--is-inside-work-tree"],
+        cwd=vault,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return result.returncode == 0
+
+
+def _git(vault: Path, *args: str) -> int:
+    return subprocess.run(["git", *args], cwd=vault).returncode
+
+
+def transcripts_pending_marker(vault: Path) -> Path:
+    """
+    Marker left when transcripts could not be committed/pushed, so the next
+    (otherwise idle) run knows there is still git work to do.
+    """
+    return vault / ".nk" / "auto" / "transcripts-pending"
+
+
+def git_pull(vault: Path) -> None:
+    print("[nk-auto] Running: git pull --rebase")
+    if _git(vault, "pull", "--rebase") != 0:
+        print("[nk-auto] WARNING: git pull --rebase failed; continuing anyway.")
+
+
+def git_push_transcripts(vault: Path) -> bool:
+    """
+    Commit & push only audios/transcripts (best-effort, like the old runner).
+    Returns True when nothing is left to push.
+    """
+    marker = transcripts_pending_marker(vault)
+    _git(vault, "add", "audios/transcripts")
+    if _git(vault, "diff", "--cached", "--quiet", "--", "audios/transcripts") == 0:
+        if not marker.exists():
+            print("[nk-auto] No transcript changes to commit.")
+            return True
+        # Committed on an earlier run whose push failed
+        print("[nk-auto] Retrying push of earlier transcript commits...")
+    else:
+        print("[nk-auto] Transcript changes detected; committing and pushing...")
+        if _git(vault, "commit", "-m", "auto: process audios/videos (transcripts only)") != 0:
+            print("[nk-auto] WARNING: git commit failed; leaving changes staged/unstaged.")
+            vault_state_dir(vault)
+            marker.parent.mkdir(parents=True, exist_ok=True)
+            marker.touch()
+            return False
+
+    if _git(vault, "push") != 0:
+        print("[nk-auto] WARNING: git push failed; changes are only local.")
+        vault_state_dir(vault)
+        marker.parent.mkdir(parents=True, exist_ok=True)
+        marker.touch()
+        return False
+    print("[nk-auto] git push succeeded.")
+    marker.unlink(missing_ok=True)
+    return True
+
+
+# === Automation entry point (nk auto tick) ===
+
+def pending_media(vault: Path) -> list[Path]:
+    """One directory listing per inbox; no recursion, no stat calls."""
+    found: list[Path] = []
+    for rel, ext in (("videos/inbox", ".mp4"), ("audios/inbox", ".mp3")):
+        try:
+            with os.scandir(vault / rel) as entries:
+                found += [Path(e.path) for e in entries if e.name.endswith(ext)]
+        except FileNotFoundError:
+            continue
+    return found
+
+
+def auto_tick(vault: Path, model_name: str) -> int:
+    """
+    nk auto tick [vault-path]
+
+    What the systemd timer runs. Checks for pending media (one scan of each
+    inbox) and for transcripts still waiting to be pushed, and exits right
+    away when there is neither. Only when there is work does it pull, run
+    the single-pass media pipeline, and commit & push transcripts.
+
+    With empty inboxes, an upgrade_model configured and a quiet machine, it
+    spends up to NK_UPGRADE_BUDGET (default 10m) re-transcribing older
+    transcripts with the upgrade model (see auto_upgrade).
+    """
+    t0 = time.perf_counter()
+    vault = vault.resolve()
+    media = pending_media(vault)
+    git_pending = transcripts_pending_marker(vault).exists()
+    upgrade = (
+        not media and upgrade_pending_marker(vault).exists() and upgrade_model_name(vault) and machine_idle()
+    )
+    if not media and not git_pending and not upgrade:
+        print(f"[nk-auto] Nothing to do for {vault.name} ({(time.perf_counter() - t0) * 1000:.1f}ms)")
+        return 0
+
+    print("[nk-auto] ================================")
+    print(f"[nk-auto] Starting run for vault: {vault} (id={vault.name})")
+    print(f"[nk-auto] At: {datetime.datetime.now().strftime('%c')}")
+    print(f"[nk-auto] Pending media: {len(media)}; transcripts to push: {'yes' if git_pending else 'no'}"
+          f"{'; upgrading transcripts' if upgrade else ''}")
+    print("[nk-auto] ================================")
+
+    git_times: dict[str, float] = {}
+    in_git = is_git_repo(vault)
+    if not in_git:
+        print(f"[nk-auto] WARNING: {vault} is not a git repository; skipping git pull/push.")
+    elif media or upgrade:
+        t = time.perf_counter()
+        git_pull(vault)
+        git_times["git_pull_s"] = round(time.perf_counter() - t, 4)
+
+    rc = 0
+    if media:
+        print("[nk-auto] Processing media...")
+        rc = process_media_pipeline(vault, model_name)
+    elif upgrade:
+        print("[nk-auto] Machine idle; upgrading transcripts...")
+        budget = env_number("NK_UPGRADE_BUDGET", parse_window(DEFAULT_UPGRADE_BUDGET), parse_window)
+        rc = auto_upgrade(vault, budget_s=budget)
+
+    if in_git:
+        t = time.perf_counter()
+        git_push_transcripts(vault)
+        git_times["git_push_s"] = round(time.perf_counter() - t, 4)
+
+    run_s = time.perf_counter() - t0
+    record_run_metrics(vault, "auto tick", run_s, media=len(media), **git_times)
+    print(f"[nk-auto] Finished run in {run_s:.1f}s")
+    return rc
+
+
+def available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def worker_thread_budget(workers: int) -> int:
+    """
+    Intra-op threads per worker so that workers × threads matches the
+    cores available (NK_THREADS_PER_WORKER overrides).
+    """
+    default = max(1, available_cpus() // max(1, workers))
+    return max(1, env_number("NK_THREADS_PER_WORKER", default, int))
+
+
+def set_torch_threads(threads: int) -> None:
+    """
+    Pin torch (and the BLAS/OpenMP pools underneath) to `threads` intra-op
+    threads. Must run before torch is imported for the env vars to apply.
+    """
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # already set once in this process
+
+
+# Per-worker state, filled by _init_transcribe_worker in each pool process
+_WORKER: dict = {}
+
+
+def _init_transcribe_worker(model_name: str, threads: int) -> None:
+    if os.environ.get("NK_PROFILE") == "1":
+        profile_start(with_cprofile=False)
+    set_torch_threads(threads)
+    _WORKER.update(model=WhisperModel(model_name), reported=False)
+    print(f"✅ Worker {os.getpid()} ready ({threads} threads)")
+
+
+def _transcribe_worker_job(job: tuple[str, str, str]) -> dict:
+    audio_raw, vault_raw, task = job
+    audio = Path(audio_raw)
+    out = {"name": audio.name, "path": audio_raw, "seconds": None}
+    model: WhisperModel = _WORKER["model"]
+    if not claim_media(audio):
+        out["claimed"] = False
+        return out
+    try:
+        process = process_one_video if media_kind(audio) == "video" else process_one_audio
+        out["seconds"] = process(model, audio, Path(vault_raw), task)
+    finally:
+        release_media(audio)
+        out["trace"] = profile_take_events()
+    # Report this worker's model load once, after it happened
+    if model.model is not None and not _WORKER["reported"]:
+        _WORKER["reported"] = True
+        out.update(import_s=model.import_s, load_s=model.load_s)
+    return out
+
+
+def process_audios(
+    vault: Path, model_name: str, task: str = "transcribe", workers: int = 1
+) -> int:
+    """
+    In-process replacement for notes-audios-to-texts.sh.
+
+    Loads the Whisper model once and transcribes the whole inbox batch:
+    - audios/inbox/<base>.mp3 -> audios/transcripts/<base>.md
+    - audio archived to $NK_LOCAL_ARCHIVE_ROOT/<vault>/audios
+
+    With workers > 1 the inbox is sharded across a process pool; each worker
+    holds its own model and a fixed intra-op thread budget.
+    """
+    audios_inbox = vault / "audios" / "inbox"
+    audios_transcripts = vault / "audios" / "transcripts"
+    audios_archive = local_archive_dir(vault, "audios")
+
+    if not audios_inbox.is_dir():
+        print(f"Error: '{audios_inbox}' does not exist. Run `nk vault init` first.")
+        return 1
+
+    audios = sorted(p for p in audios_inbox.glob("*.mp3") if p.is_file())
+    if not audios:
+        print(f"No new audios found in {audios_inbox}.")
+        return 0
+    job_register(vault, audios)
+    audios = [p for p, *_ in schedule_media(vault, audios)]
+    if model_name == "auto":
+        model_name = choose_model(vault, audios)
+
+    audios_transcripts.mkdir(parents=True, exist_ok=True)
+    audios_archive.mkdir(parents=True, exist_ok=True)
+
+    workers = max(1, min(workers, len(audios)))
+    run_start = time.perf_counter()
+    file_times: list[tuple[str, float]] = []
+
+    if workers == 1:
+        model = resident_model(model_name)
+        for audio in audios:
+            if not claim_media(audio):
+                print(f"⏭  Already claimed by another run: {audio.name}")
+                continue
+            try:
+                seconds = process_one_audio(model, audio, vault, task)
+            finally:
+                release_media(audio)
+            if seconds is not None:
+                file_times.append((audio.name, seconds))
+        import_s, load_s = model.import_s, model.load_s
+    else:
+        import multiprocessing
+
+        threads = worker_thread_budget(workers)
+        print(f"Starting {workers} workers × {threads} threads with whisper model '{model_name}'...")
+        import_s = load_s = 0.0
+        jobs = [(str(a), str(vault), task) for a in audios]
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(workers, initializer=_init_transcribe_worker, initargs=(model_name, threads)) as pool:
+            for out in pool.imap_unordered(_transcribe_worker_job, jobs):
+                # Workers load in parallel, so the slowest load is what the run paid
+                import_s = max(import_s, out.get("import_s", 0.0))
+                load_s = max(load_s, out.get("load_s", 0.0))
+                if _TRACE is not None:
+                    _TRACE.extend(out.get("trace", []))
+                if out.get("claimed") is False:
+                    print(f"⏭  Already claimed by another run: {out['name']}")
+                elif out["seconds"] is not None:
+                    file_times.append((out["name"], out["seconds"]))
+
+    count = len(file_times)
+    if count == 0:
+        print(f"No audios transcribed from {audios_inbox}.")
+    else:
+        print(f"Done. Transcribed {count} audio files.")
+        print(f"Transcripts are in: {audios_transcripts}")
+
+    run_s = time.perf_counter() - run_start
+    record_run_metrics(
+        vault, "audios process", run_s, files=count, failed=len(audios) - count, workers=workers,
+    )
+    print_timing_report(model_name, import_s, load_s, file_times, run_s, workers)
+    return 0
+
+
+# === Host scheduler (nk scheduler) ===
+
+DEFAULT_SCHEDULER_POLL = 5.0
+
+
+def scheduler_config_path() -> Path:
+    """Host-level registry of vaults: $NK_SCHEDULER_CONFIG, else ~/.config/nk/scheduler.json"""
+    raw = os.environ.get("NK_SCHEDULER_CONFIG")
+    if raw:
+        return Path(raw).expanduser()
+    config_root = Path(os.environ.get("XDG_CONFIG_HOME", Path.home() / ".config"))
+    return config_root / "nk" / "scheduler.json"
+
+
+def load_scheduler_config() -> dict:
+    """{"model": ..., "workers": ..., "vaults": {path: {"weight": w}}}"""
+    path = scheduler_config_path()
+    try:
+        config = json.loads(path.read_text())
+    except FileNotFoundError:
+        config = {}
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Ignoring {path}: {e}")
+        config = {}
+    config.setdefault("vaults", {})
+    return config
+
+
+def save_scheduler_config(config: dict) -> None:
+    path = scheduler_config_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(json.dumps(config, indent=2, sort_keys=True) + "\n")
+    tmp.replace(path)
+
+
+class VaultShare:
+    """
+    Weighted fair share between vaults: each dispatch advances the vault's
+    virtual time by audio seconds / weight, and the vault with work and the
+    lowest virtual time goes next. A vault that was idle rejoins at the
+    lowest virtual time among active vaults, so idling earns no burst credit.
+    """
+
+    def __init__(self):
+        self.vtime: dict[Path, float] = {}
+        # Vaults that had work queued or running in the previous round. With
+        # one in-process worker nothing is running between rounds, so the
+        # running vaults alone would make every vault look idle.
+        self.active: set[Path] = set()
+
+    def pick(self, ready: dict[Path, float], busy: set[Path]) -> Path | None:
+        """`ready`: vault -> weight, for vaults with a file to dispatch; `busy`: running now."""
+        if not ready:
+            return None
+        active = self.active | busy
+        floors = [self.vtime[v] for v in active if v in self.vtime]
+        # Nobody was active: everyone who is back starts level
+        floor = min(floors) if floors else max(self.vtime.get(v, 0.0) for v in ready)
+        for vault in ready:
+            if vault not in active:
+                self.vtime[vault] = max(self.vtime.get(vault, 0.0), floor)
+        return min(ready, key=lambda v: (self.vtime[v], str(v)))
+
+    def end_round(self, had_work: set[Path]) -> None:
+        """Record the vaults that had work queued or running this round."""
+        self.active = set(had_work)
+
+    def charge(self, vault: Path, audio_s: float, weight: float) -> None:
+        self.vtime[vault] = self.vtime.get(vault, 0.0) + audio_s / max(weight, 1e-6)
+
+
+def scheduler_model_spec(requested: str | None, config: dict) -> str:
+    name = str(requested or config.get("model") or os.environ.get("NK_WHISPER_MODEL") or DEFAULT_WHISPER_MODEL)
+    backend, bare = split_model_spec(name)
+    if bare != name:
+        return model_spec(backend, bare)
+    return model_spec(os.environ.get("NK_BACKEND") or "whisper", name)
+
+
+def scheduler_run(rest: list[str]) -> int:
+    """
+    nk scheduler run [-m MODEL] [--workers N] [-T]
+
+    One process for every registered vault: polls all inboxes, orders each
+    vault's files with schedule_media, and hands files to one shared set of
+    workers (in-process with one resident model, or N pool workers) with
+    weighted fair share between vaults. Transcripts, archives, job state and
+    metrics stay per vault; when a vault's queue drains its transcripts are
+    committed and pushed like `nk auto tick` does.
+
+    The registry is re-read when it changes, so `nk scheduler add` takes
+    effect without a restart.
+    """
+    args, opts = split_args(rest, {"-m", "--workers"})
+    config = load_scheduler_config()
+    spec = scheduler_model_spec(opts.get("-m"), config)
+    if spec == "auto":
+        print("⚠️  The scheduler runs one model for every vault; -m auto is not supported, using base.")
+        spec = DEFAULT_WHISPER_MODEL
+    task = "translate" if opts.get("-T") else "transcribe"
+    workers = max(1, number_arg(
+        opts.get("--workers") or config.get("workers") or os.environ.get("NK_WORKERS") or 1, "--workers"
+    ))
+    poll = env_number("NK_SCHEDULER_POLL", DEFAULT_SCHEDULER_POLL)
+    settle = env_number("NK_WATCH_SETTLE", 2.0)
+    config_path = scheduler_config_path()
+
+    import queue
+
+    done: queue.Queue = queue.Queue()
+    pool = None
+    model = None
+    if workers == 1:
+        model = resident_model(spec)
+    else:
+        import multiprocessing
+
+        threads = worker_thread_budget(workers)
+        ctx = multiprocessing.get_context("spawn")
+        pool = ctx.Pool(workers, initializer=_init_transcribe_worker, initargs=(spec, threads))
+
+    share = VaultShare()
+    in_flight: dict[Path, tuple[Path, float]] = {}  # media -> (vault, audio_s)
+    pulled: set[Path] = set()  # vaults pulled for the batch they are working on
+    touched: set[Path] = set()  # vaults with new transcripts since their last push
+    registry_mtime = None
+    vaults: dict[Path, float] = {}
+
+    def dispatch(vault: Path, media: Path) -> None:
+        local_archive_dir(vault, "audios").mkdir(parents=True, exist_ok=True)
+        job = (str(media), str(vault), task)
+        if pool is None:
+            if not claim_media(media):
+                done.put({"path": str(media), "claimed": False})
+                return
+            try:
+                kind = media_kind(media)
+                process = process_one_video if kind == "video" else process_one_audio
+                done.put({"path": str(media), "seconds": process(model, media, vault, task)})
+            except Exception as e:
+                done.put({"path": str(media), "seconds": None, "error": str(e)})
+            finally:
+                release_media(media)
+        else:
+            pool.apply_async(
+                _transcribe_worker_job, (job,), callback=done.put,
+                error_callback=lambda e, p=str(media): done.put({"path": p, "seconds": None, "error": str(e)}),
+            )
+
+    print(f"🗓  Scheduler: model '{spec}', {workers} worker(s), polling every {poll:.0f}s")
+    print(f"   Registry: {config_path}")
+    try:
+        while True:
+            try:
+                mtime = config_path.stat().st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if mtime != registry_mtime:
+                registry_mtime = mtime
+                config = load_scheduler_config()
+                vaults = {
+                    Path(raw): float(entry.get("weight", 1) or 1)
+                    for raw, entry in config["vaults"].items()
+                    if Path(raw).is_dir()
+                }
+                print(f"📚 Serving {len(vaults)} vault(s): "
+                      + ", ".join(f"{v.name} (weight {w:g})" for v, w in vaults.items()))
+
+            # Each vault's waiting files, in that vault's own schedule order
+            now = time.time()
+            queues: dict[Path, list[tuple[Path, float]]] = {}
+            for vault in vaults:
+                fresh = []
+                for p in pending_media(vault):
+                    if p in in_flight or not media_kind(p):
+                        continue
+                    try:
+                        if now - p.stat().st_mtime < settle:
+                            continue  # possibly still being written
+                    except FileNotFoundError:
+                        continue
+                    fresh.append(p)
+                if fresh:
+                    job_register(vault, fresh)
+                    waiting = job_backing_off(vault, fresh)
+                    fresh = [p for p in fresh if p not in waiting]
+                if fresh:
+                    queues[vault] = [(p, audio_s) for p, _, audio_s, _ in schedule_media(vault, fresh)]
+
+            busy = {v for v, _ in in_flight.values()}
+            had_work = set(queues)
+            while len(in_flight) < workers and queues:
+                vault = share.pick({v: vaults[v] for v in queues}, busy)
+                media, audio_s = queues[vault].pop(0)
+                if not queues[vault]:
+                    del queues[vault]
+                share.charge(vault, audio_s, vaults[vault])
+                in_flight[media] = (vault, audio_s)
+                busy.add(vault)
+                if vault not in pulled:
+                    # Pull before the vault's batch writes transcripts, like
+                    # nk auto tick: a pull --rebase after them fails on the dirty tree
+                    pulled.add(vault)
+                    if is_git_repo(vault):
+                        t = time.perf_counter()
+                        git_pull(vault)
+                        record_run_metrics(vault, "scheduler git pull", time.perf_counter() - t)
+                print(f"➡️  {vault.name}: {media.name} ({format_age(audio_s)} of audio)")
+                dispatch(vault, media)
+            share.end_round(had_work | busy)
+
+            # Wait for a finished file or the next poll, then collect everything finished
+            try:
+                out = done.get(timeout=poll)
+            except queue.Empty:
+                out = None
+            while out is not None:
+                media = Path(out["path"])
+                vault, _ = in_flight.pop(media, (None, 0.0))
+                if out.get("claimed") is False:
+                    print(f"⏭  Already claimed by another run: {media.name}")
+                elif out.get("error"):
+                    print(f"⚠️  Worker failed on {media.name}: {out['error']}")
+                    if vault is not None:
+                        job_failed(vault, media, out["error"])
+                elif out.get("seconds") is not None and vault is not None:
+                    touched.add(vault)
+                if _TRACE is not None:
+                    _TRACE.extend(out.get("trace", []))
+                try:
+                    out = done.get_nowait()
+                except queue.Empty:
+                    out = None
+
+            # Per-vault push once a vault's batch has nothing queued or running
+            busy = {v for v, _ in in_flight.values()}
+            for vault in list(pulled):
+                if vault in busy or vault in queues:
+                    continue
+                pulled.discard(vault)
+                if vault in touched and is_git_repo(vault):
+                    t = time.perf_counter()
+                    git_push_transcripts(vault)
+                    record_run_metrics(vault, "scheduler git push", time.perf_counter() - t)
+                touched.discard(vault)
+    except KeyboardInterrupt:
+        print("👋 Scheduler stopped.")
+    finally:
+        if pool is not None:
+            pool.terminate()
+    return 0
+
+
+def scheduler_command(rest: list[str]) -> int:
+    """
+    nk scheduler add [vault-path] [--weight W]
+    nk scheduler remove [vault-path]
+    nk scheduler list
+    nk scheduler run [-m MODEL] [--workers N] [-T]
+    """
+    sub = rest[0] if rest else None
+    if sub == "run":
+        return scheduler_run(rest[1:])
+
+    config = load_scheduler_config()
+    if sub in ("add", "remove"):
+        args, opts = split_args(rest[1:], {"--weight"})
+        vault = Path(normalize_path(args[0] if args else ".")).resolve()
+        if sub == "add":
+            if not (vault / "audios" / "inbox").is_dir() and not (vault / "videos" / "inbox").is_dir():
+                print(f"🚫 {vault} has no audios/inbox or videos/inbox. Run `nk vault init` first.")
+                return 1
+            weight = number_arg(
+                opts.get("--weight") or config["vaults"].get(str(vault), {}).get("weight", 1), "--weight", float
+            )
+            if weight <= 0:
+                print("🚫 --weight must be positive.")
+                return 1
+            config["vaults"][str(vault)] = {"weight": weight}
+            save_scheduler_config(config)
+            print(f"✅ Registered {vault} (weight {weight:g})")
+            # One scheduler replaces the vault's own timer and watcher
+            for unit in (f"nk-{vault.name}.timer", f"nk-{vault.name}-watch.service"):
+                try:
+                    subprocess.run(
+                        ["systemctl", "--user", "disable", "--now", unit],
+                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                    )
+                except OSError:
+                    break  # no systemd here
+            print("   (its own timer/watcher is disabled if it had one; run `nk autosetup systemd-scheduler` once)")
+        else:
+            if config["vaults"].pop(str(vault), None) is None:
+                print(f"⚠️  {vault} is not registered.")
+                return 1
+            save_scheduler_config(config)
+            print(f"✅ Unregistered {vault}")
+        return 0
+
+    if sub == "list":
+        if not config["vaults"]:
+            print(f"No vaults registered in {scheduler_config_path()}. Add one with `nk scheduler add [vault]`.")
+            return 0
+        total_w = sum(float(e.get("weight", 1) or 1) for e in config["vaults"].values())
+        print(f"{'vault':<40} {'weight':>6} {'share':>6} {'pending':>8} {'audio 24h':>10}")
+        for raw, entry in sorted(config["vaults"].items()):
+            vault = Path(raw)
+            weight = float(entry.get("weight", 1) or 1)
+            if not vault.is_dir():
+                print(f"{raw:<40} {weight:>6g} {weight / total_w:>6.0%} {'missing':>8}")
+                continue
+            conn = open_job_state(vault)
+            audio_24h = conn.execute(
+                "SELECT COALESCE(SUM(audio_s), 0) FROM jobs WHERE stage = 'done' AND finished_at >= ?",
+                (time.time() - 86400,),
+            ).fetchone()[0]
+            conn.close()
+            print(f"{raw:<40} {weight:>6g} {weight / total_w:>6.0%} {len(pending_media(vault)):>8} "
+                  f"{format_age(audio_24h):>10}")
+        return 0
+
+    print("Usage:")
+    print("  nk scheduler add [vault-path] [--weight W]")
+    print("  nk scheduler remove [vault-path]")
+    print("  nk scheduler list")
+    print("  nk scheduler run [-m MODEL] [--workers N] [-T]")
+    return 1
+
+
+# === Vault indexes (.nk/index.sqlite) ===
+
+# Vault areas that hold notes, as (area name, path relative to the vault)
+NOTE_AREAS = [
+    ("notes", "notes"),
+    ("daily", "daily"),
+    ("inbound", "inbound"),
+    ("thinking", "thinking"),
+    ("studies", "studies"),
+    ("transcripts", "audios/transcripts"),
+]
+
+
+# Seconds between full listings of the vault's note directories
+DEFAULT_INDEX_RESCAN = 60.0
+
+# Local machine state under .nk/ that must never be committed with the vault
+NK_STATE_GITIGNORE = [
+    "*.sqlite",
+    "*.sqlite-journal",
+    "*.sqlite-wal",
+    "*.sqlite-shm",
+    "auto/transcripts-pending",
+    "auto/upgrade-pending",
+    "metrics.jsonl",
+    "metrics.jsonl.1",
+]
+
+
+def is_vault(vault: Path) -> bool:
+    """A vault has .nk/, a note area or a media inbox (see nk vault init)."""
+    markers = [".nk", "audios/inbox", "videos/inbox", *(rel for _, rel in NOTE_AREAS)]
+    return any((vault / rel).is_dir() for rel in markers)
+
+
+def vault_state_dir(vault: Path) -> Path:
+    """
+    The vault's .nk/ directory. Local databases kept there (*.sqlite) are
+    machine state, so they are git-ignored via .nk/.gitignore. A path that
+    is not a vault (a typo) stops the command instead of growing a .nk/.
+    """
+    state_dir = vault / ".nk"
+    if not state_dir.is_dir() and not is_vault(vault):
+        raise SystemExit(f"Not an nk vault (no notes or inbox folders): {vault}")
+    state_dir.mkdir(parents=True, exist_ok=True)
+    gitignore = state_dir / ".gitignore"
+    current = gitignore.read_text().splitlines() if gitignore.exists() else []
+    missing = [line for line in NK_STATE_GITIGNORE if line not in current]
+    if missing:
+        with gitignore.open("a") as f:
+            f.write("".join(f"{line}\n" for line in missing))
+    return state_dir
+
+
+def open_vault_index(vault: Path):
+    import sqlite3
+
+    conn = sqlite3.connect(vault_state_dir(vault) / "index.sqlite", timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def changed_notes(
+    vault: Path, known: dict[str, tuple[int, int]], dirs: dict[str, int] | None = None
+):
+    """
+    Compare the vault against `known` {rel_path: (mtime_ns, size)}.
+    Returns (changed [(rel_path, area, stat)], removed [rel_path],
+    dir mtimes {rel_dir: mtime_ns}).
+
+    Known notes are always stat'ed, so edits in place are seen. With `dirs`
+    (the dir mtimes of the last scan), a directory whose mtime is unchanged
+    has had no note added, removed or renamed, so it is not listed: only
+    its known notes are checked. A full scan (dirs=None) lists everything.
+    """
+    changed, seen, dirs_now = [], set(), {}
+    in_dir: dict[str, list[str]] = {}
+    sub_dirs: dict[str, list[str]] = {}
+    if dirs is not None:
+        for rel in known:
+            in_dir.setdefault(rel.rpartition("/")[0], []).append(rel)
+        for rel_dir in dirs:
+            sub_dirs.setdefault(rel_dir.rpartition("/")[0], []).append(rel_dir)
+    # A directory changed within the last two seconds may change again within
+    # the same mtime tick: it is recorded as -1 so the next scan lists it
+    racy_ns = time.time_ns() - 2_000_000_000
+    root = os.fspath(vault)  # plain strings: one stat per note is the hot loop
+    for area, rel_root in NOTE_AREAS:
+        stack = [rel_root]
+        while stack:
+            rel_dir = stack.pop()
+            try:
+                dir_mtime = os.stat(vault / rel_dir).st_mtime_ns
+                entries = None
+                if dirs is None or dirs.get(rel_dir) != dir_mtime:
+                    entries = list(os.scandir(vault / rel_dir))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            dirs_now[rel_dir] = dir_mtime if dir_mtime < racy_ns else -1
+            if entries is None:
+                for rel in in_dir.get(rel_dir, ()):
+                    try:
+                        st = os.stat(f"{root}/{rel}")
+                    except FileNotFoundError:
+                        continue
+                    seen.add(rel)
+                    if known[rel] != (st.st_mtime_ns, st.st_size):
+                        changed.append((rel, area, st))
+                stack.extend(sub_dirs.get(rel_dir, ()))
+                continue
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                rel = os.path.join(rel_dir, entry.name)
+                if entry.is_dir():
+                    if not entry.is_symlink():
+                        stack.append(rel)
+                    continue
+                if not entry.name.endswith(".md"):
+                    continue
+                st = os.stat(entry.path)
+                seen.add(rel)
+                if known.get(rel) != (st.st_mtime_ns, st.st_size):
+                    changed.append((rel, area, st))
+    removed = [rel for rel in known if rel not in seen]
+    return changed, removed, dirs_now
+
+
+def scan_notes(vault: Path, conn, table: str, full: bool = False):
+    """
+    changed_notes for one index (`table`: path, mtime_ns and size per
+    note): every known note is stat'ed, and only directories whose mtime
+    changed are listed for new notes, with a full listing every
+    NK_INDEX_RESCAN seconds (or when `full`) in case a filesystem's
+    directory mtimes can't be trusted. The new dir mtimes are written
+    without committing, so they commit together with the caller's index
+    update. Returns (changed, removed).
+    """
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS scan_dirs (
+            scope    TEXT NOT NULL,
+            path     TEXT NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            PRIMARY KEY (scope, path)
+        );
+        CREATE TABLE IF NOT EXISTS scan_full (
+            scope TEXT PRIMARY KEY,
+            at    REAL NOT NULL
+        );
+        """
+    )
+    scope = table
+    last_full = conn.execute("SELECT at FROM scan_full WHERE scope = ?", (scope,)).fetchone()
+    rescan_s = env_number("NK_INDEX_RESCAN", DEFAULT_INDEX_RESCAN)
+    full = full or last_full is None or time.time() - last_full[0] >= rescan_s
+    dirs = None
+    if not full:
+        dirs = dict(conn.execute("SELECT path, mtime_ns FROM scan_dirs WHERE scope = ?", (scope,)))
+    known = {
+        path: (mtime_ns, size)
+        for path, mtime_ns, size in conn.execute(f"SELECT path, mtime_ns, size FROM {table}")
+    }
+    changed, removed, dirs_now = changed_notes(vault, known, dirs)
+    if dirs_now != dirs:
+        conn.execute("DELETE FROM scan_dirs WHERE scope = ?", (scope,))
+        conn.executemany(
+            "INSERT INTO scan_dirs(scope, path, mtime_ns) VALUES (?, ?, ?)",
+            [(scope, path, mtime_ns) for path, mtime_ns in dirs_now.items()],
+        )
+    if full:
+        conn.execute(
+            "INSERT INTO scan_full(scope, at) VALUES (?, ?) "
+            "ON CONFLICT(scope) DO UPDATE SET at = excluded.at",
+            (scope, time.time()),
+        )
+    return changed, removed
+
+
+def note_title(rel_path: str, text: str) -> str:
+    for line in text.splitlines()[:20]:
+        if line.startswith("# "):
+            return line[2:].strip()
+    return Path(rel_path).stem
+
+
+def update_search_index(vault: Path, conn, full: bool = False) -> tuple[int, int]:
+    """
+    Incrementally update the FTS5 search index: only files whose mtime or
+    size changed since the last run are re-read, and only directories that
+    changed are listed for new files (see scan_notes). Returns (updated, removed).
+    """
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS search_docs (
+            id       INTEGER PRIMARY KEY,
+            path     TEXT UNIQUE NOT NULL,
+            area     TEXT NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            size     INTEGER NOT NULL
+        );
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+            title, body, tokenize = 'unicode61 remove_diacritics 2'
+        );
+        """
+    )
+    changed, removed = scan_notes(vault, conn, "search_docs", full)
+    with conn:
+        for rel in removed:
+            row = conn.execute("SELECT id FROM search_docs WHERE path = ?", (rel,)).fetchone()
+            conn.execute("DELETE FROM search_fts WHERE rowid = ?", row)
+            conn.execute("DELETE FROM search_docs WHERE id = ?", row)
+        for rel, area, st in changed:
+            try:
+                text = (vault / rel).read_text(errors="replace")
+            except OSError:
+                continue
+            row = conn.execute("SELECT id FROM search_docs WHERE path = ?", (rel,)).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE search_docs SET area = ?, mtime_ns = ?, size = ? WHERE id = ?",
+                    (area, st.st_mtime_ns, st.st_size, row[0]),
+                )
+                conn.execute("DELETE FROM search_fts WHERE rowid = ?", row)
+                doc_id = row[0]
+            else:
+                doc_id = conn.execute(
+                    "INSERT INTO search_docs(path, area, mtime_ns, size) VALUES (?, ?, ?, ?)",
+                    (rel, area, st.st_mtime_ns, st.st_size),
+                ).lastrowid
+            conn.execute(
+                "INSERT INTO search_fts(rowid, title, body) VALUES (?, ?, ?)",
+                (doc_id, note_title(rel, text), text),
+            )
+    return len(changed), len(removed)
+
+
+def fts_query(raw: str) -> str:
+    """
+    Plain words are matched as prefix terms ANDed together; queries that
+    already use FTS5 syntax (quotes, AND/OR/NOT, *, column:) pass through.
+    """
+    if re.search(r'["*:()]|\b(AND|OR|NOT|NEAR)\b', raw):
+        return raw
+    terms = re.findall(r"\w+", raw, flags=re.UNICODE)
+    return " ".join(f'"{t}"*' for t in terms)
+
+
+def search_vault(rest: list[str]) -> int:
+    """
+    nk search "query" [--area AREA] [--limit N] [--vault PATH] [--no-update] [--rescan]
+
+    Full-text search over the vault's notes, backed by an incremental
+    SQLite FTS5 index in .nk/index.sqlite. Results are ranked by BM25
+    (title matches weigh more) and shown with a snippet. --rescan lists
+    every directory now instead of only changed ones.
+    """
+    args, opts = split_args(rest, {"--area", "--limit", "--vault"})
+    if not args:
+        print('Usage: nk search "query" [--area AREA] [--limit N] [--vault PATH] [--no-update] [--rescan]')
+        print(f"Areas: {', '.join(area for area, _ in NOTE_AREAS)}")
+        return 1
+
+    vault = Path(normalize_path(str(opts.get("--vault") or "."))).resolve()
+    area = opts.get("--area")
+    if area and area not in {a for a, _ in NOTE_AREAS}:
+        print(f"Unknown area: {area}")
+        print(f"Areas: {', '.join(a for a, _ in NOTE_AREAS)}")
+        return 1
+    limit = number_arg(opts.get("--limit") or 20, "--limit")
+
+    t0 = time.perf_counter()
+    conn = open_vault_index(vault)
+    if not opts.get("--no-update"):
+        with trace_span("update search index", "index"):
+            updated, removed = update_search_index(vault, conn, bool(opts.get("--rescan")))
+        if updated or removed:
+            print(f"🔄 Index updated: {updated} changed, {removed} removed "
+                  f"({(time.perf_counter() - t0) * 1000:.0f}ms)")
+
+    sql = (
+        "SELECT d.path, d.area, snippet(search_fts, 1, '**', '**', '…', 12) "
+        "FROM search_fts JOIN search_docs d ON d.id = search_fts.rowid "
+        "WHERE search_fts MATCH ?"
+    )
+    params: list = [fts_query(" ".join(args))]
+    if area:
+        sql += " AND d.area = ?"
+        params.append(area)
+    sql += " ORDER BY bm25(search_fts, 10.0, 1.0) LIMIT ?"
+    params.append(limit)
+
+    import sqlite3
+
+    t1 = time.perf_counter()
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    except sqlite3.OperationalError as e:
+        print(f"🔴 Invalid search query: {e}")
+        return 1
+    query_ms = (time.perf_counter() - t1) * 1000
+    total_ms = (time.perf_counter() - t0) * 1000
+    conn.close()
+
+    if not rows:
+        print("No matches.")
+    for path, doc_area, snippet in rows:
+        print(f"📄 {path}  [{doc_area}]")
+        print(f"   {' '.join(snippet.split())}")
+    print(f"\n{len(rows)} result(s) in {total_ms:.1f}ms (index check {total_ms - query_ms:.1f}ms, "
+          f"query {query_ms:.1f}ms)")
+    return 0
+
+
+# === Transcript segments (nk transcripts find) ===
+
+SEGMENTS_SUFFIX = ".segments.json"
+
+
+def segments_sidecar(transcript: Path) -> Path:
+    """audios/transcripts/<base>.md -> audios/transcripts/<base>.segments.json"""
+    return transcript.with_name(f"{transcript.stem}{SEGMENTS_SUFFIX}")
+
+
+def encode_segments(segments: list[dict]) -> str:
+    """
+    Columnar sidecar: starts and ends in milliseconds and texts as three
+    parallel arrays, on one line. Committed next to the transcript, so every
+    clone of the vault can index it.
+    """
+    return json.dumps(
+        {
+            "version": 1,
+            "start": [round(seg["start"] * 1000) for seg in segments],
+            "end": [round(seg["end"] * 1000) for seg in segments],
+            "text": [seg["text"].strip() for seg in segments],
+        },
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ) + "\n"
+
+
+def read_segments(sidecar: Path) -> list[tuple[float, float, str]]:
+    data = json.loads(sidecar.read_text())
+    return [(start / 1000, end / 1000, text) for start, end, text in zip(data["start"], data["end"], data["text"])]
+
+
+def changed_sidecars(vault: Path, known: dict[str, tuple[int, int]]):
+    """
+    Like changed_notes, for the segment sidecars under audios/transcripts.
+    Keys are the transcript's .md path. Returns (changed, removed).
+    """
+    root = vault / "audios" / "transcripts"
+    changed, seen = [], set()
+    if root.is_dir():
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for name in filenames:
+                if not name.endswith(SEGMENTS_SUFFIX) or name.startswith("."):
+                    continue
+                full = os.path.join(dirpath, name)
+                rel = os.path.relpath(full, vault)[: -len(SEGMENTS_SUFFIX)] + ".md"
+                st = os.stat(full)
+                seen.add(rel)
+                if known.get(rel) != (st.st_mtime_ns, st.st_size):
+                    changed.append((rel, full, st))
+    removed = [rel for rel in known if rel not in seen]
+    return changed, removed
+
+
+def update_segment_index(vault: Path, conn) -> tuple[int, int]:
+    """
+    Incrementally index segment sidecars: one FTS5 row per segment, with
+    its offsets in `segments` under the same rowid. Only sidecars whose
+    mtime or size changed are re-read. Returns (updated, removed).
+    """
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS segment_docs (
+            id       INTEGER PRIMARY KEY,
+            path     TEXT UNIQUE NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            size     INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS segments (
+            id      INTEGER PRIMARY KEY,
+            doc     INTEGER NOT NULL,
+            start_s REAL NOT NULL,
+            end_s   REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS segments_doc ON segments(doc);
+        CREATE VIRTUAL TABLE IF NOT EXISTS segment_fts USING fts5(
+            text, tokenize = 'unicode61 remove_diacritics 2'
+        );
+        """
+    )
+    known = {
+        path: (mtime_ns, size)
+        for path, mtime_ns, size in conn.execute("SELECT path, mtime_ns, size FROM segment_docs")
+    }
+    changed, removed = changed_sidecars(vault, known)
+
+    def drop(doc_id: int) -> None:
+        conn.execute("DELETE FROM segment_fts WHERE rowid IN (SELECT id FROM segments WHERE doc = ?)", (doc_id,))
+        conn.execute("DELETE FROM segments WHERE doc = ?", (doc_id,))
+
+    with conn:
+        for rel in removed:
+            (doc_id,) = conn.execute("SELECT id FROM segment_docs WHERE path = ?", (rel,)).fetchone()
+            drop(doc_id)
+            conn.execute("DELETE FROM segment_docs WHERE id = ?", (doc_id,))
+        for rel, full, st in changed:
+            try:
+                segments = read_segments(Path(full))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️  Skipping {rel}: unreadable segments ({e})")
+                continue
+            row = conn.execute("SELECT id FROM segment_docs WHERE path = ?", (rel,)).fetchone()
+            if row:
+                doc_id = row[0]
+                drop(doc_id)
+                conn.execute(
+                    "UPDATE segment_docs SET mtime_ns = ?, size = ? WHERE id = ?",
+                    (st.st_mtime_ns, st.st_size, doc_id),
+                )
+            else:
+                doc_id = conn.execute(
+                    "INSERT INTO segment_docs(path, mtime_ns, size) VALUES (?, ?, ?)",
+                    (rel, st.st_mtime_ns, st.st_size),
+                ).lastrowid
+            for start_s, end_s, text in segments:
+                seg_id = conn.execute(
+                    "INSERT INTO segments(doc, start_s, end_s) VALUES (?, ?, ?)", (doc_id, start_s, end_s)
+                ).lastrowid
+                conn.execute("INSERT INTO segment_fts(rowid, text) VALUES (?, ?)", (seg_id, text))
+    return len(changed), len(removed)
+
+
+def find_segments(vault: Path, query: str, limit: int = 20, update: bool = True) -> list[dict]:
+    """
+    Segments matching `query` (fts_query syntax), best first, as dicts with
+    the transcript, the recording it came from (from transcript provenance;
+    archive_resolve gives the file), start/end in seconds and a snippet.
+    """
+    import sqlite3
+
+    conn = open_vault_index(vault)
+    if update:
+        with trace_span("update segment index", "index"):
+            update_segment_index(vault, conn)
+    rows = conn.execute(
+        "SELECT d.path, s.start_s, s.end_s, snippet(segment_fts, 0, '**', '**', '…', 16) "
+        "FROM segment_fts JOIN segments s ON s.id = segment_fts.rowid "
+        "JOIN segment_docs d ON d.id = s.doc "
+        "WHERE segment_fts MATCH ? ORDER BY bm25(segment_fts) LIMIT ?",
+        (fts_query(query), limit),
+    ).fetchall()
+    conn.close()
+
+    sources: dict[str, str] = {}
+    try:
+        state = open_job_state(vault)
+        sources = dict(state.execute("SELECT path, source FROM transcripts").fetchall())
+        state.close()
+    except sqlite3.Error:
+        pass
+    return [
+        {
+            "transcript": rel,
+            "recording": sources.get(rel),
+            "start": start_s,
+            "end": end_s,
+            "snippet": " ".join(snippet.split()),
+        }
+        for rel, start_s, end_s, snippet in rows
+    ]
+
+
+def transcripts_find(rest: list[str]) -> int:
+    """
+    nk transcripts find "phrase" [--vault PATH] [--limit N] [--no-update]
+
+    Where in which recording something was said: matches single segments
+    through the FTS5 segment index in .nk/index.sqlite and prints the
+    recording with the segment's offset.
+    """
+    import sqlite3
+
+    args, opts = split_args(rest, {"--limit", "--vault"})
+    if not args:
+        print('Usage: nk transcripts find "phrase" [--vault PATH] [--limit N] [--no-update]')
+        return 1
+    vault = Path(normalize_path(str(opts.get("--vault") or "."))).resolve()
+    t0 = time.perf_counter()
+    try:
+        limit = number_arg(opts.get("--limit") or 20, "--limit")
+        hits = find_segments(vault, " ".join(args), limit, not opts.get("--no-update"))
+    except sqlite3.OperationalError as e:
+        print(f"🔴 Invalid search query: {e}")
+        return 1
+    query_ms = (time.perf_counter() - t0) * 1000
+
+    if not hits:
+        print("No matches.")
+    for hit in hits:
+        recording = Path(hit["recording"]).name if hit["recording"] else Path(hit["transcript"]).stem
+        print(f"🎧 {recording} @ {format_offset(hit['start'])}–{format_offset(hit['end'])}  ({hit['transcript']})")
+        print(f"   {hit['snippet']}")
+    print(f"\n{len(hits)} result(s) in {query_ms:.1f}ms")
+    return 0
+
+
+# === Link graph (wikilinks / backlinks) ===
+
+WIKILINK_RE = re.compile(r"\[\[([^\]|#^]+)(?:[#^][^\]|]*)?(?:\|[^\]]*)?\]\]")
+
+
+# Wikilink targets with these extensions are attachments, not notes; any
+# other dot is part of the note name ([[meeting 3.1]], [[2024.01.05]])
+ATTACHMENT_SUFFIXES = {
+    ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".svg", ".webp", ".avif", ".heic",
+    ".mp3", ".wav", ".m4a", ".ogg", ".opus", ".flac", ".3gp", ".webm",
+    ".mp4", ".mov", ".mkv", ".ogv", ".pdf", ".canvas", ".base",
+}
+
+
+# Bumped when link_key changes, so existing link graphs are rebuilt
+LINK_RULES_VERSION = 2
+
+
+def link_key(target: str) -> tuple[str, str] | None:
     """
-    - None / "" / "." -> "."
-    - "~" / "~/..."  -> expanded to $HOME
-    - other paths -> absolute path via resolve()
+    Normalize a wikilink target the way Obsidian resolves it:
+    case-insensitive, ".md" optional. Returns (path_key, name_key), or None
+    for attachment links (![[image.png]], [[file.pdf]], ...).
     """
-    if not raw or raw == ".":
-        return "."
-    p = Path(raw).expanduser()
-    # resolve() with strict=False: ok if path doesn't exist yet
-    try:
-        p = p.resolve(strict=False)
-    except TypeError:
-        # older Python: resolve() without strict kw arg
-        p = p.resolve()
-    return str(p)
+    target = target.strip().replace("\\", "/").lower()
+    suffix = Path(target).suffix
+    if suffix == ".md":
+        target = target[:-3]
+    elif suffix in ATTACHMENT_SUFFIXES:
+        return None
+    return target, target.rsplit("/", 1)[-1]
 
 
-def run_script(script_name: str, *args: str) -> int:
-    print("nk.py - run_script start...")
-    kernel_dir = Path(__file__).resolve().parent
-    script = kernel_dir / "internals" / script_name
-    if not script.exists():
-        print(f"Error: {script_name} not found in {kernel_dir}")
-        return 1
-    
-    cmd = [str(script), *[str(a) for a in args]]
-    print(f"nk.py - cmd ready: {cmd}")
+def update_link_index(vault: Path, conn, full: bool = False) -> tuple[int, int]:
+    """
+    Incrementally update the link graph: only notes whose mtime or size
+    changed are re-parsed, and only directories that changed are listed for
+    new notes (see scan_notes). Returns (updated, removed).
+    """
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS link_notes (
+            id       INTEGER PRIMARY KEY,
+            path     TEXT UNIQUE NOT NULL,
+            path_key TEXT NOT NULL,
+            name_key TEXT NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            size     INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS link_notes_name ON link_notes(name_key);
+        CREATE TABLE IF NOT EXISTS links (
+            src_id      INTEGER NOT NULL,
+            target_path TEXT NOT NULL,
+            target_name TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS links_src ON links(src_id);
+        CREATE INDEX IF NOT EXISTS links_target ON links(target_name);
+        CREATE TABLE IF NOT EXISTS link_rules (version INTEGER NOT NULL);
+        """
+    )
+    # Notes parsed under older link_key rules are parsed again
+    rules = conn.execute("SELECT version FROM link_rules").fetchone()
+    if rules is None or rules[0] != LINK_RULES_VERSION:
+        with conn:
+            conn.execute("UPDATE link_notes SET mtime_ns = -1")
+            conn.execute("DELETE FROM link_rules")
+            conn.execute("INSERT INTO link_rules(version) VALUES (?)", (LINK_RULES_VERSION,))
+        full = True
+    changed, removed = scan_notes(vault, conn, "link_notes", full)
+    with conn:
+        for rel in removed:
+            row = conn.execute("SELECT id FROM link_notes WHERE path = ?", (rel,)).fetchone()
+            conn.execute("DELETE FROM links WHERE src_id = ?", row)
+            conn.execute("DELETE FROM link_notes WHERE id = ?", row)
+        for rel, _area, st in changed:
+            try:
+                text = (vault / rel).read_text(errors="replace")
+            except OSError:
+                continue
+            path_key = rel[:-3].lower()
+            name_key = path_key.rsplit("/", 1)[-1]
+            row = conn.execute("SELECT id FROM link_notes WHERE path = ?", (rel,)).fetchone()
+            if row:
+                note_id = row[0]
+                conn.execute(
+                    "UPDATE link_notes SET mtime_ns = ?, size = ? WHERE id = ?",
+                    (st.st_mtime_ns, st.st_size, note_id),
+                )
+                conn.execute("DELETE FROM links WHERE src_id = ?", (note_id,))
+            else:
+                note_id = conn.execute(
+                    "INSERT INTO link_notes(path, path_key, name_key, mtime_ns, size) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (rel, path_key, name_key, st.st_mtime_ns, st.st_size),
+                ).lastrowid
+            keys = {k for k in map(link_key, WIKILINK_RE.findall(text)) if k}
+            conn.executemany(
+                "INSERT INTO links(src_id, target_path, target_name) VALUES (?, ?, ?)",
+                [(note_id, tp, tn) for tp, tn in keys],
+            )
+    return len(changed), len(removed)
 
-    try:
-        # keep strict behavior: non-zero exit → CalledProcessError
-        print("nk.py - calling cmd...")
-        result = subprocess.run(cmd, check=True)
-        print(f"nk.py - cmd result: {result}")
-        return result.returncode
-    except KeyboardInterrupt:
-        # User hit Ctrl+C (e.g. stop ffmpeg).
-        # At this point the child has already handled SIGINT and flushed output.
-        # We treat this as a normal, intentional stop.
-        return 0
-    except subprocess.CalledProcessError as e:
-        print("❌ nk.py - cmd failed!")
-        print(f"   Command: {e.cmd}")
-        print(f"   Exit code: {e.returncode}")
 
-        # stderr
-        if e.stderr:
-            print("   --- STDERR ---")
-            print(e.stderr.decode().strip())
+def link_resolves_to(target_path: str, note_path_key: str) -> bool:
+    """[[name]] matches any note with that name; [[dir/name]] must match the path tail."""
+    return note_path_key == target_path or note_path_key.endswith("/" + target_path)
 
-        # stdout
-        if e.output:
-            print("   --- STDOUT ---")
-            print(e.output.decode().strip())
 
-        return e.returncode
+def find_link_note(conn, raw: str) -> tuple[int, str, str] | None:
+    """Find a note by path (with or without .md) or by name, like a wikilink."""
+    keys = link_key(raw)
+    if keys is None:
+        return None
+    target_path, target_name = keys
+    rows = conn.execute(
+        "SELECT id, path, path_key FROM link_notes WHERE name_key = ? ORDER BY path",
+        (target_name,),
+    ).fetchall()
+    matches = [r for r in rows if link_resolves_to(target_path, r[2])]
+    return matches[0] if matches else None
+
+
+def links_command(rest: list[str]) -> int:
+    """
+    nk links backlinks <note> | out <note> | orphans | broken [--vault PATH]
+
+    Answers from the persistent link graph in .nk/index.sqlite, refreshed
+    incrementally from changed notes before each command (every known note
+    is stat'ed, so in-place edits count; see scan_notes).
+    """
+    args, opts = split_args(rest, {"--vault"})
+    sub = args[0] if args else None
+    if sub not in {"backlinks", "out", "orphans", "broken"} or (
+        sub in {"backlinks", "out"} and len(args) < 2
+    ):
+        print("Usage:")
+        print("  nk links backlinks <note>   Notes linking to <note>")
+        print("  nk links out <note>         Links from <note> (✗ = unresolved)")
+        print("  nk links orphans            Notes nothing links to")
+        print("  nk links broken             Links to notes that don't exist")
+        print("Options: --vault PATH, --no-update, --rescan")
+        return 1
+
+    vault = Path(normalize_path(str(opts.get("--vault") or "."))).resolve()
+    conn = open_vault_index(vault)
+    # orphans/broken resolve in SQL with the same rule as backlinks/out
+    conn.create_function("link_resolves_to", 2, link_resolves_to, deterministic=True)
+    t0 = time.perf_counter()
+    if not opts.get("--no-update"):
+        with trace_span("update link index", "index"):
+            updated, removed = update_link_index(vault, conn, bool(opts.get("--rescan")))
+        if updated or removed:
+            print(f"🔄 Link graph updated: {updated} changed, {removed} removed "
+                  f"({(time.perf_counter() - t0) * 1000:.0f}ms)")
+
+    if sub in {"backlinks", "out"}:
+        note = find_link_note(conn, args[1])
+        if note is None:
+            print(f"🚫 Note not found: {args[1]}")
+            return 1
+        note_id, note_path, note_path_key = note
+
+    if sub == "backlinks":
+        rows = conn.execute(
+            "SELECT DISTINCT n.path, l.target_path FROM links l "
+            "JOIN link_notes n ON n.id = l.src_id "
+            "WHERE l.target_name = ? AND l.src_id != ? ORDER BY n.path",
+            (note_path_key.rsplit("/", 1)[-1], note_id),
+        ).fetchall()
+        sources = sorted({path for path, tp in rows if link_resolves_to(tp, note_path_key)})
+        print(f"🔗 Backlinks to {note_path}: {len(sources)}")
+        for path in sources:
+            print(f"   {path}")
+
+    elif sub == "out":
+        rows = conn.execute(
+            "SELECT target_path FROM links WHERE src_id = ? ORDER BY target_path",
+            (note_id,),
+        ).fetchall()
+        print(f"🔗 Links from {note_path}: {len(rows)}")
+        for (target_path,) in rows:
+            resolved = find_link_note(conn, target_path)
+            print(f"   {'→ ' + resolved[1] if resolved else '✗ [[' + target_path + ']]'}")
+
+    elif sub == "orphans":
+        rows = conn.execute(
+            "SELECT path FROM link_notes n WHERE NOT EXISTS ("
+            "  SELECT 1 FROM links l WHERE l.target_name = n.name_key AND l.src_id != n.id"
+            "  AND link_resolves_to(l.target_path, n.path_key)"
+            ") ORDER BY path"
+        ).fetchall()
+        print(f"🏝  Orphan notes (no backlinks): {len(rows)}")
+        for (path,) in rows:
+            print(f"   {path}")
+
+    else:  # broken
+        rows = conn.execute(
+            "SELECT n.path, l.target_path FROM links l JOIN link_notes n ON n.id = l.src_id "
+            "WHERE NOT EXISTS (SELECT 1 FROM link_notes t WHERE t.name_key = l.target_name "
+            "AND link_resolves_to(l.target_path, t.path_key)) "
+            "ORDER BY n.path, l.target_path"
+        ).fetchall()
+        print(f"⛓  Unresolved links: {len(rows)}")
+        for path, target in rows:
+            print(f"   {path} → [[{target}]]")
+
+    conn.close()
+    return 0
 
 
 def create_study_index(vault_dir: Path, study_title: str) -> int:
@@ -506,22 +5644,12 @@ def create_study_module(vault_dir: Path, study_title: str) -> int:
     study_dir.mkdir(parents=True, exist_ok=True)
     print(f"study_dir: {study_dir}")
 
-    # Find next module number
-    existing = sorted(study_dir.glob(f"{slug}-module-*.md"))
-    next_n = 1
-    for path in existing:
-        # Expect filenames like slug-module-01.md
-        stem = path.stem  # e.g. "ml-course-module-01"
-        parts = stem.split("-")
-        if len(parts) >= 3 and parts[-2] == "module":
-            try:
-                num = int(parts[-1])
-                if num >= next_n:
-                    next_n = num + 1
-            except ValueError:
-                continue
-
-    module_num = next_n
+    # Next module number comes from the study catalog (atomic across runs)
+    conn = open_study_catalog(vault_dir)
+    try:
+        module_num = allocate_study_module(conn, vault_dir, slug)
+    finally:
+        conn.close()
     module_filename = f"{slug}-module-{module_num:02d}.md"
     module_path = study_dir / module_filename
     print(f"module_path: {module_path}")
@@ -576,6 +5704,787 @@ def open_study_index(vault_dir: Path, study_title: str) -> int:
     open_in_editor(index_path)
     return 0
 
+# === Study catalog (.nk/index.sqlite) ===
+
+def open_study_catalog(vault: Path):
+    """
+    The study catalog lives next to the search/link index. It is derived
+    state: each study directory is rescanned only when its mtime changes
+    (e.g. after a git pull), so listing hundreds of studies costs one stat
+    per study.
+    """
+    conn = open_vault_index(vault)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS studies (
+            slug          TEXT PRIMARY KEY,
+            title         TEXT NOT NULL,
+            index_path    TEXT,
+            modules       INTEGER NOT NULL DEFAULT 0,
+            last_module   INTEGER NOT NULL DEFAULT 0,
+            dir_mtime_ns  INTEGER NOT NULL DEFAULT 0,
+            created_at    REAL NOT NULL,
+            updated_at    REAL NOT NULL
+        )
+        """
+    )
+    conn.commit()
+    return conn
+
+
+def scan_study_dir(vault: Path, slug: str) -> dict | None:
+    """Read one study directory: index note, module count and highest number."""
+    study_dir = vault / "studies" / slug
+    try:
+        dir_mtime_ns = study_dir.stat().st_mtime_ns
+        names = os.listdir(study_dir)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    module_re = re.compile(rf"{re.escape(slug)}-module-(\d+)\.md")
+    modules, last_module, newest = 0, 0, 0.0
+    for name in names:
+        m = module_re.fullmatch(name)
+        if m:
+            modules += 1
+            last_module = max(last_module, int(m.group(1)))
+            newest = max(newest, os.stat(study_dir / name).st_mtime)
+    index_name = f"{slug}-index.md"
+    index_path = None
+    title = slug.replace("-", " ").title()
+    if index_name in names:
+        index_path = f"studies/{slug}/{index_name}"
+        newest = max(newest, os.stat(study_dir / index_name).st_mtime)
+        with open(study_dir / index_name, errors="replace") as f:
+            title = note_title(index_name, f.read(4096))
+            if title == Path(index_name).stem:
+                title = slug.replace("-", " ").title()
+    return {
+        "slug": slug,
+        "title": title,
+        "index_path": index_path,
+        "modules": modules,
+        "last_module": last_module,
+        "dir_mtime_ns": dir_mtime_ns,
+        "updated_at": newest or dir_mtime_ns / 1e9,
+    }
+
+
+def sync_study(conn, vault: Path, slug: str, row=None) -> None:
+    """
+    Bring one catalog row up to date if its directory changed. last_module
+    never goes down, so numbers already handed out are never reused.
+    """
+    if row is None:
+        row = conn.execute(
+            "SELECT dir_mtime_ns, last_module FROM studies WHERE slug = ?", (slug,)
+        ).fetchone()
+    try:
+        mtime_ns = (vault / "studies" / slug).stat().st_mtime_ns
+    except (FileNotFoundError, NotADirectoryError):
+        if row is not None:
+            conn.execute("DELETE FROM studies WHERE slug = ?", (slug,))
+        return
+    if row is not None and row[0] == mtime_ns:
+        return
+    info = scan_study_dir(vault, slug)
+    if info is None:
+        return
+    if row is None:
+        conn.execute(
+            "INSERT INTO studies (slug, title, index_path, modules, last_module, dir_mtime_ns, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (slug, info["title"], info["index_path"], info["modules"], info["last_module"],
+             info["dir_mtime_ns"], time.time(), info["updated_at"]),
+        )
+    else:
+        conn.execute(
+            "UPDATE studies SET title = ?, index_path = ?, modules = ?, last_module = MAX(last_module, ?), "
+            "dir_mtime_ns = ?, updated_at = ? WHERE slug = ?",
+            (info["title"], info["index_path"], info["modules"], info["last_module"],
+             info["dir_mtime_ns"], info["updated_at"], slug),
+        )
+
+
+def sync_study_catalog(conn, vault: Path) -> None:
+    """Pick up studies added, changed or removed outside nk (git pull, file manager)."""
+    known = {slug: (mtime, last) for slug, mtime, last in conn.execute(
+        "SELECT slug, dir_mtime_ns, last_module FROM studies"
+    )}
+    studies_root = vault / "studies"
+    on_disk = set()
+    if studies_root.is_dir():
+        with os.scandir(studies_root) as it:
+            on_disk = {e.name for e in it if e.is_dir() and not e.name.startswith(".")}
+    conn.execute("BEGIN IMMEDIATE")
+    for slug in on_disk | set(known):
+        sync_study(conn, vault, slug, known.get(slug))
+    conn.commit()
+
+
+def allocate_study_module(conn, vault: Path, slug: str) -> int:
+    """
+    Reserve the next module number for a study. BEGIN IMMEDIATE serialises
+    concurrent `nk study module` runs, so two calls never get the same number.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        sync_study(conn, vault, slug)
+        conn.execute(
+            "INSERT OR IGNORE INTO studies (slug, title, created_at, updated_at) VALUES (?, ?, ?, ?)",
+            (slug, slug.replace("-", " ").title(), time.time(), time.time()),
+        )
+        conn.execute(
+            "UPDATE studies SET last_module = last_module + 1, updated_at = ? WHERE slug = ?",
+            (time.time(), slug),
+        )
+        (n,) = conn.execute("SELECT last_module FROM studies WHERE slug = ?", (slug,)).fetchone()
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return n
+
+
+def study_list(vault: Path) -> int:
+    """
+    nk study list
+    """
+    conn = open_study_catalog(vault)
+    sync_study_catalog(conn, vault)
+    rows = conn.execute(
+        "SELECT slug, title, modules, last_module, index_path, updated_at FROM studies ORDER BY updated_at DESC"
+    ).fetchall()
+    conn.close()
+    if not rows:
+        print("No studies yet. Create one with: nk study index \"Study Title\"")
+        return 0
+    now = time.time()
+    width = max(len(r[0]) for r in rows)
+    for slug, title, modules, last_module, index_path, updated_at in rows:
+        flag = "" if index_path else "  ⚠️ no index"
+        print(
+            f"{slug:<{width}}  {modules:>3} modules (last {last_module:02d})  "
+            f"{format_age(now - updated_at):>6} ago  {title}{flag}"
+        )
+    return 0
+
+
+def study_stats(vault: Path) -> int:
+    """
+    nk study stats
+    """
+    conn = open_study_catalog(vault)
+    sync_study_catalog(conn, vault)
+    rows = conn.execute("SELECT slug, modules, index_path, updated_at FROM studies").fetchall()
+    conn.close()
+    now = time.time()
+    total = sum(r[1] for r in rows)
+    active = sorted((r for r in rows if now - r[3] <= 30 * 86400), key=lambda r: -r[3])
+    print("📚 Studies")
+    print(f"   Studies:                {len(rows)}")
+    print(f"   Modules:                {total}")
+    if rows:
+        print(f"   Modules per study:      {total / len(rows):.1f} avg, {max(r[1] for r in rows)} max")
+    print(f"   Without index note:     {sum(1 for r in rows if not r[2])}")
+    print(f"   Empty (no modules):     {sum(1 for r in rows if r[1] == 0)}")
+    print(f"   Active in last 30 days: {len(active)}")
+    for slug, modules, _, updated_at in active[:5]:
+        print(f"     {slug} ({modules} modules, {format_age(now - updated_at)} ago)")
+    return 0
+
+
+# === Bulk import (nk notes import) ===
+
+# kind -> (template, destination under the vault); "note" is the plain
+# `nk notes new` layout and has no template.
+IMPORT_KINDS: dict[str, tuple[str | None, tuple[str, ...]]] = {
+    "note": (None, ("notes",)),
+    "insight": ("note-insight.md", ("notes",)),
+    "inbound-inbox": ("inbound-inbox.md", ("inbound", "inbox")),
+    "inbound-processing": ("inbound-processing.md", ("inbound", "processing")),
+    "thinking-inbox": ("thinking-inbox.md", ("thinking", "inbox")),
+    "thinking-draft": ("thinking-draft.md", ("thinking", "drafts")),
+    "thinking-publication": ("thinking-publication.md", ("thinking", "publications")),
+    "study-index": ("study-index.md", ("studies",)),
+    "study-module": ("study-module.md", ("studies",)),
+}
+
+# Placeholders each kind's template may use (see create_note_from_template
+# and the study helpers)
+IMPORT_FIELDS = {"date", "time", "title"}
+IMPORT_STUDY_FIELDS = IMPORT_FIELDS | {"n", "study"}
+
+
+def compile_note_template(tpl: str, fields: set[str]) -> list[tuple[str, str | None, str, str | None]] | None:
+    """
+    Parse a template once into (literal, field, format_spec, conversion)
+    pieces. Returns None when it uses placeholders we cannot fill, so the
+    caller falls back once instead of failing per note.
+    """
+    import string
+
+    try:
+        pieces = list(string.Formatter().parse(tpl))
+    except ValueError:
+        return None
+    for _, field, _, _ in pieces:
+        if field is not None and field not in fields:
+            return None
+    return pieces
+
+
+def render_note_template(pieces, values: dict) -> str:
+    out = []
+    for literal, field, spec, conversion in pieces:
+        out.append(literal)
+        if field is None:
+            continue
+        value = values[field]
+        if conversion == "r":
+            value = repr(value)
+        elif conversion in {"s", "a"}:
+            value = str(value) if conversion == "s" else ascii(value)
+        out.append(format(value, spec or ""))
+    return "".join(out)
+
+
+def read_import_records(path: str):
+    """
+    Yield (line_no, record) from a JSONL or CSV file ("-" reads JSONL from
+    stdin). Malformed JSON lines are yielded as (line_no, None).
+    """
+    import csv
+
+    if path != "-" and path.lower().endswith(".csv"):
+        with open(path, newline="") as f:
+            for i, row in enumerate(csv.DictReader(f), start=2):
+                yield i, {k.strip(): v for k, v in row.items() if k and v not in (None, "")}
+        return
+
+    f = sys.stdin if path == "-" else open(path)
+    try:
+        for i, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                record = None
+            yield i, record if isinstance(record, dict) else None
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def import_notes(rest: list[str]) -> int:
+    """
+    nk notes import <file.jsonl|file.csv|-> [--kind KIND] [--dry-run]
+
+    Create many notes in one process. Each record has a title and optional
+    kind, date (YYYY-MM-DD), body and study (for study-index/study-module).
+    Templates are compiled once per kind, slug collisions are resolved in
+    memory, and no editor is opened. Notes that already exist are skipped,
+    so re-running an import is safe.
+    """
+    args, opts = split_args(rest, {"--kind"})
+    if not args:
+        print("Usage: nk notes import <file.jsonl|file.csv|-> [--kind KIND] [--dry-run]")
+        print(f"Kinds: {', '.join(IMPORT_KINDS)}")
+        return 1
+    default_kind = str(opts.get("--kind") or "note")
+    if default_kind not in IMPORT_KINDS:
+        print(f"🚫 Unknown kind '{default_kind}'. Kinds: {', '.join(IMPORT_KINDS)}")
+        return 1
+    dry_run = bool(opts.get("--dry-run"))
+    source = args[0]
+    if source != "-" and not Path(source).is_file():
+        print(f"🚫 Import file not found: {source}")
+        return 1
+
+    vault_dir = Path(".").resolve()
+    start = time.perf_counter()
+    time_now = now_time_str()
+    today = today_str()
+
+    compiled: dict[str, list | None] = {}
+    taken: dict[Path, set[str]] = {}  # dest dir -> filenames on disk or claimed by this import
+    claimed: set[Path] = set()  # paths this import is creating
+    catalog = None  # study catalog, opened on the first study-module record
+    planned: dict[str, int] = {}  # --dry-run: study slug -> last module number shown
+    created = skipped = errors = 0
+    batch: list[tuple[Path, str]] = []
+
+    def names_in(dest: Path) -> set[str]:
+        if dest not in taken:
+            try:
+                taken[dest] = set(os.listdir(dest))
+            except FileNotFoundError:
+                taken[dest] = set()
+        return taken[dest]
+
+    def flush() -> None:
+        nonlocal created, skipped
+        for dest in {p.parent for p, _ in batch}:
+            dest.mkdir(parents=True, exist_ok=True)
+        for note_path, content in batch:
+            try:
+                with open(note_path, "x") as f:  # never clobber a concurrent writer
+                    f.write(content)
+                created += 1
+            except FileExistsError:
+                skipped += 1
+        batch.clear()
+
+    for line_no, record in read_import_records(source):
+        if record is None:
+            print(f"⚠️  {source}:{line_no}: not a JSON object; skipped")
+            errors += 1
+            continue
+        kind = str(record.get("kind") or default_kind)
+        title = str(record.get("title") or "").strip()
+        study = str(record.get("study") or "").strip()
+        date = str(record.get("date") or today)
+        if kind not in IMPORT_KINDS:
+            print(f"⚠️  {source}:{line_no}: unknown kind '{kind}'; skipped")
+            errors += 1
+            continue
+        if kind.startswith("study-"):
+            study = study or title
+        if not (study if kind.startswith("study-") else title) or not re.fullmatch(r"\d{4}-\d{2}-\d{2}", date):
+            print(f"⚠️  {source}:{line_no}: missing title/study or bad date; skipped")
+            errors += 1
+            continue
+
+        template_name, dest_parts = IMPORT_KINDS[kind]
+        dest = vault_dir.joinpath(*dest_parts)
+        values = {"date": date, "time": time_now, "title": title}
+
+        if kind == "study-index":
+            slug = slugify(study)
+            dest = dest / slug
+            filename = f"{slug}-index.md"
+            values["title"] = study
+            if filename in names_in(dest):
+                skipped += 1
+                continue
+        elif kind == "study-module":
+            slug = slugify(study)
+            dest = dest / slug
+            if catalog is None:
+                catalog = open_study_catalog(vault_dir)
+            if dry_run:
+                if slug not in planned:
+                    sync_study(catalog, vault_dir, slug)
+                    row = catalog.execute("SELECT last_module FROM studies WHERE slug = ?", (slug,)).fetchone()
+                    planned[slug] = row[0] if row else 0
+                planned[slug] += 1
+                n = planned[slug]
+            else:
+                dest.mkdir(parents=True, exist_ok=True)
+                n = allocate_study_module(catalog, vault_dir, slug)
+            filename = f"{slug}-module-{n:02d}.md"
+            values.update(n=n, study=study, title=title or f"{study} — Module {n:02d}")
+        else:
+            slug = slugify(title) or "untitled"
+            filename = f"{date}-{slug}.md"
+            if filename in names_in(dest):
+                if dest / filename not in claimed:
+                    skipped += 1
+                    continue
+                # Same title twice in this import: keep both
+                k = 2
+                while f"{date}-{slug}-{k}.md" in names_in(dest):
+                    k += 1
+                filename = f"{date}-{slug}-{k}.md"
+        names_in(dest).add(filename)
+        claimed.add(dest / filename)
+
+        if kind == "note":
+            content = f"# {title}\n\n\n## Tags:\n\n"
+        else:
+            if kind not in compiled:
+                tpl = load_note_template(template_name, vault_dir)
+                fields = IMPORT_STUDY_FIELDS if kind.startswith("study-") else IMPORT_FIELDS
+                compiled[kind] = compile_note_template(tpl, fields) if tpl is not None else None
+                if tpl is not None and compiled[kind] is None:
+                    print(f"Warning: Failed to compile template '{template_name}'; using a plain heading")
+            pieces = compiled[kind]
+            content = render_note_template(pieces, values) if pieces else f"# {values['title']}\n\n"
+        body = record.get("body")
+        if body:
+            content = content.rstrip("\n") + "\n\n" + str(body).rstrip("\n") + "\n"
+
+        if dry_run:
+            print(f"Would create: {(dest / filename).relative_to(vault_dir)}")
+            created += 1
+            continue
+        batch.append((dest / filename, content))
+        if len(batch) >= 500:
+            flush()
+
+    if not dry_run:
+        flush()
+    if catalog is not None:
+        catalog.close()
+    elapsed = time.perf_counter() - start
+    rate = created / elapsed if elapsed > 0 else 0.0
+    verb = "Would create" if dry_run else "Created"
+    print(f"✅ {verb} {created} notes in {elapsed:.2f}s ({rate:.0f} notes/s)")
+    if skipped:
+        print(f"   Skipped {skipped} that already exist")
+    if errors:
+        print(f"⚠️  {errors} records could not be imported")
+    return 1 if errors and not created else 0
+
+
+# === Warm server (nk server) ===
+
+def server_socket_path() -> Path:
+    raw = os.environ.get("NK_SOCKET")
+    if raw:
+        return Path(raw).expanduser()
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        return Path(runtime) / "nk.sock"
+    return Path(f"/tmp/nk-{os.getuid()}.sock")
+
+
+def server_peer_is_us(client, sock_path: Path) -> bool:
+    """
+    The /tmp socket fallback is in a shared directory, so before sending our
+    argv and env make sure the socket and the process behind it are ours.
+    """
+    import socket
+    import struct
+
+    try:
+        if sock_path.stat().st_uid != os.getuid():
+            return False
+        if hasattr(socket, "SO_PEERCRED"):  # Linux: pid, uid, gid of the server
+            creds = client.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+            return struct.unpack("3i", creds)[1] == os.getuid()
+    except OSError:
+        return False
+    return True
+
+
+# Env vars a client forwards so the server runs its command the same way
+SERVER_ENV_PREFIXES = ("NK_", "EDITOR", "XDG_")
+
+
+def server_can_run(argv: list[str]) -> bool:
+    """
+    Commands the server may run for a client: everything that works on files
+    and prints. Interactive or systemd/script-driven commands (vault init,
+    audios record, watch, auto, autosetup, init) always run locally, and so
+    does anything that reads the client's stdin (`nk notes import -`).
+    """
+    if not argv:
+        return False
+    cmd, sub = argv[0], argv[1] if len(argv) > 1 else None
+    if cmd == "notes" and sub == "import" and "-" in argv[2:]:
+        return False
+    if cmd in {"notes", "daily", "inbound", "thinking", "study", "search", "links", "cache", "media", "transcripts"}:
+        return True
+    if cmd == "audios":
+        return sub == "process" and "--legacy" not in argv
+    if cmd == "videos":
+        return sub == "process" and "--direct" in argv
+    return False
+
+
+class _SocketWriter:
+    """File-like stdout/stderr that streams a request's output to the client."""
+
+    def __init__(self, conn, stream: str):
+        self.conn = conn
+        self.stream = stream
+
+    def write(self, text: str) -> int:
+        if text:
+            msg = json.dumps({self.stream: text}) + "\n"
+            self.conn.sendall(msg.encode())
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+
+class _ClientWatch:
+    """
+    Interrupt a request's worker thread, as Ctrl-C would a local run, when
+    its client disconnects. The client sends nothing after its request, so
+    a readable socket means EOF (or a reset).
+    """
+
+    def __init__(self, conn):
+        import threading
+
+        self.conn = conn
+        self.thread = threading.get_ident()
+        self.lock = threading.Lock()
+        self.done = False
+        threading.Thread(target=self._watch, name="nk-client-watch", daemon=True).start()
+
+    def _watch(self) -> None:
+        import select
+
+        while not self.done:
+            try:
+                ready, _, _ = select.select([self.conn], [], [], 0.5)
+                if not ready or self.conn.recv(4096):
+                    continue
+            except ConnectionResetError:
+                pass
+            except (OSError, ValueError):
+                return  # socket closed: the request is over
+            self.interrupt()
+            return
+
+    def interrupt(self) -> None:
+        import ctypes
+
+        with self.lock:
+            if not self.done:
+                self.done = True
+                ctypes.pythonapi.PyThreadState_SetAsyncExc(
+                    ctypes.c_ulong(self.thread), ctypes.py_object(KeyboardInterrupt)
+                )
+
+    def finish(self) -> None:
+        with self.lock:
+            self.done = True
+
+
+def server_handle(conn, request: dict) -> None:
+    """
+    Run one client command in this process: chdir to the client's cwd,
+    apply its NK_*/EDITOR env, stream output back, then report the exit
+    code and any files the client should open in its editor. If the client
+    disconnects (Ctrl-C, closed terminal) the command is interrupted at its
+    next Python-level step and KeyboardInterrupt propagates to the caller.
+    """
+    import contextlib
+
+    global _EDITOR_HANDOFF
+
+    old_cwd = os.getcwd()
+    old_env = dict(os.environ)
+    _EDITOR_HANDOFF = []
+    rc = 1
+    watch = _ClientWatch(conn)
+    try:
+        os.chdir(request["cwd"])
+        for key in [k for k in os.environ if k.startswith(SERVER_ENV_PREFIXES)]:
+            del os.environ[key]
+        os.environ.update(request.get("env", {}))
+        out, err = _SocketWriter(conn, "out"), _SocketWriter(conn, "err")
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            try:
+                rc = main(request["argv"])
+            except SystemExit as e:
+                if isinstance(e.code, str):
+                    print(e.code, file=sys.stderr)
+                rc = e.code if isinstance(e.code, int) else 1
+            except Exception as e:
+                print(f"🔴 nk server: command failed: {e!r}")
+                rc = 1
+        watch.finish()
+        conn.sendall((json.dumps({"exit": rc, "open": _EDITOR_HANDOFF}) + "\n").encode())
+    finally:
+        watch.finish()
+        _EDITOR_HANDOFF = None
+        os.environ.clear()
+        os.environ.update(old_env)
+        os.chdir(old_cwd)
+
+
+def serve(rest: list[str]) -> int:
+    """
+    nk server [--preload MODEL]
+    nk server stop|status
+
+    Resident per-user server on a Unix socket. Keeps templates and Whisper
+    models loaded between commands; nk.py hands supported commands to it
+    and falls back to running in-process when it is not running or busy.
+    Requests run one at a time.
+    """
+    import socket
+    import threading
+
+    args, opts = split_args(rest, {"--preload"})
+    sock_path = server_socket_path()
+    sub = args[0] if args else None
+
+    if sub in {"stop", "status"}:
+        reply = server_request({"control": sub})
+        if reply is None:
+            print(f"nk server is not running ({sock_path})")
+            return 1 if sub == "stop" else 0
+        print(reply.get("message", "ok"))
+        return 0
+    if sub is not None:
+        print("Usage: nk server [--preload MODEL] | nk server stop|status")
+        return 1
+
+    if server_request({"control": "status"}) is not None:
+        print(f"nk server is already running on {sock_path}")
+        return 1
+    sock_path.unlink(missing_ok=True)
+
+    if opts.get("--preload"):
+        resident_model(str(opts["--preload"])).get()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)  # socket usable by this user only
+    try:
+        server.bind(str(sock_path))
+    finally:
+        os.umask(old_umask)
+    server.listen(8)
+    started = time.time()
+    served = 0
+    print(f"🟢 nk server listening on {sock_path} (pid {os.getpid()})")
+
+    def run(conn, request: dict) -> None:
+        with conn:
+            try:
+                server_handle(conn, request)
+            except (BrokenPipeError, ConnectionResetError, KeyboardInterrupt):
+                print("⚠️  Client went away; command interrupted")
+
+    # Commands run one at a time in a worker thread (they chdir, swap the env
+    # and redirect stdout for the whole process) and are interrupted if their
+    # client disconnects (_ClientWatch). While one runs, the accept loop stays
+    # free: status/stop are answered and other commands are told the server
+    # is busy, so the client runs them itself instead of waiting behind a
+    # long transcription.
+    worker = None
+    try:
+        while True:
+            conn, _ = server.accept()
+            try:
+                request = json.loads(conn.makefile("r").readline() or "{}")
+            except (json.JSONDecodeError, OSError):
+                conn.close()
+                continue
+            control = request.get("control")
+            busy = worker is not None and worker.is_alive()
+            if control == "status":
+                loaded = [name for name, m in _RESIDENT_MODELS.items() if m.model is not None]
+                message = (
+                    f"nk server pid {os.getpid()} on {sock_path}: up {format_age(time.time() - started)}, "
+                    f"{served} commands served, models loaded: {', '.join(loaded) or 'none'}, "
+                    f"templates cached: {len(_TEMPLATE_CACHE)}"
+                    + (", running a command" if busy else "")
+                )
+                with conn:
+                    conn.sendall((json.dumps({"message": message}) + "\n").encode())
+                continue
+            if control == "stop":
+                message = "nk server stopped" + (" after the running command" if busy else "")
+                with conn:
+                    conn.sendall((json.dumps({"message": message}) + "\n").encode())
+                break
+            if "argv" not in request or busy:
+                with conn:
+                    if busy:
+                        conn.sendall((json.dumps({"busy": True}) + "\n").encode())
+                continue
+            print(f"▶ {' '.join(request['argv'])}  (cwd {request.get('cwd')})")
+            worker = threading.Thread(target=run, args=(conn, request), name="nk-request", daemon=True)
+            worker.start()
+            served += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        sock_path.unlink(missing_ok=True)
+        if worker is not None:
+            worker.join()
+    print("👋 nk server stopped")
+    return 0
+
+
+def server_request(request: dict) -> dict | None:
+    """Send a control request; None if no server is listening."""
+    import socket
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(5)
+            client.connect(str(server_socket_path()))
+            client.sendall((json.dumps(request) + "\n").encode())
+            line = client.makefile("r").readline()
+    except OSError:
+        return None
+    return json.loads(line) if line else None
+
+
+def client_main(argv: list[str]) -> int:
+    """
+    Thin client: hand the command to a running nk server if possible,
+    otherwise run it in this process. NK_NO_SERVER=1 always runs locally.
+    """
+    import socket
+
+    if "--profile" in argv or os.environ.get("NK_PROFILE") == "1":
+        # Profile this process end to end; never hand off to a server
+        argv = [a for a in argv if a != "--profile"]
+        os.environ["NK_PROFILE"] = "1"  # spawned pool workers trace too
+        profile_start()
+        try:
+            with trace_span("nk " + " ".join(argv[:2]), "main", argv=argv):
+                return main(argv)
+        finally:
+            out = profile_finish(argv)
+            print(f"⏱  Profile written to {out} (open in ui.perfetto.dev or chrome://tracing)")
+    if os.environ.get("NK_NO_SERVER") == "1" or not server_can_run(argv):
+        return main(argv)
+    sock_path = server_socket_path()
+    if not sock_path.exists():
+        return main(argv)
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(str(sock_path))
+    except OSError:
+        client.close()
+        return main(argv)
+    if not server_peer_is_us(client, sock_path):
+        client.close()
+        print(f"⚠️  {sock_path} is not served by your user; running the command locally.")
+        return main(argv)
+
+    env = {k: v for k, v in os.environ.items() if k.startswith(SERVER_ENV_PREFIXES)}
+    request = {"argv": argv, "cwd": os.getcwd(), "env": env}
+    with client:
+        client.sendall((json.dumps(request) + "\n").encode())
+        for line in client.makefile("r"):
+            msg = json.loads(line)
+            if "out" in msg:
+                sys.stdout.write(msg["out"])
+                sys.stdout.flush()
+            elif "err" in msg:
+                sys.stderr.write(msg["err"])
+                sys.stderr.flush()
+            elif "exit" in msg:
+                for path in msg.get("open", []):
+                    open_in_editor(Path(path))
+                return msg["exit"]
+            elif msg.get("busy"):
+                break
+        else:
+            print("🔴 nk server closed the connection unexpectedly.")
+            return 1
+    # The server is running another command; don't queue behind it
+    return main(argv)
+
+
 def main(argv: list[str]) -> int:
     if not argv:
         short_usage()
@@ -651,11 +6560,78 @@ def main(argv: list[str]) -> int:
 
     if cmd == "videos":
         if sub == "process":
-            target = normalize_path(rest[0] if rest else ".")
-            return run_script("notes-videos-to-audios.sh", target)
+            # nk videos process [vault-path] [--direct [--keep-audio] [-m MODEL] [-T]]
+            args, opts = split_args(rest, {"-m"})
+            target = normalize_path(args[0] if args else ".")
+            if opts.get("--direct"):
+                if opts.get("--no-cache"):
+                    os.environ["NK_CACHE"] = "0"
+                model_name = vault_model_name(Path(target), opts.get("-m"))
+                task = "translate" if opts.get("-T") else "transcribe"
+                return process_videos_direct(
+                    Path(target), str(model_name), task, keep_audio=bool(opts.get("--keep-audio"))
+                )
+            rc = run_script("notes-videos-to-audios.sh", target)
+            archive_adopt(local_archive_dir(Path(target), "videos").parent.name, settle_s=0)
+            return rc
         else:
             print("Unknown videos command:", sub or "<missing>")
-            print("Usage: nk videos process [vault-path]")
+            print("Usage: nk videos process [vault-path] [--direct [--keep-audio] [-m MODEL] [-T]]")
+            return 1
+
+    if cmd == "watch":
+        # nk watch [vault-path] [-m MODEL] [-T]
+        args, opts = split_args(argv[1:], {"-m"})
+        target = normalize_path(args[0] if args else ".")
+        model_name = vault_model_name(Path(target), opts.get("-m"))
+        task = "translate" if opts.get("-T") else "transcribe"
+        return watch_vault(Path(target), str(model_name), task)
+
+    if cmd == "server":
+        return serve(argv[1:])
+
+    if cmd == "search":
+        return search_vault(argv[1:])
+
+    if cmd == "transcripts":
+        if sub == "find":
+            return transcripts_find(argv[2:])
+        print("Unknown transcripts command:", sub or "<missing>")
+        print('Usage: nk transcripts find "phrase" [--vault PATH] [--limit N] [--no-update]')
+        return 1
+
+    if cmd == "links":
+        return links_command(argv[1:])
+
+    if cmd == "scheduler":
+        return scheduler_command(argv[1:])
+
+    if cmd == "models":
+        return models_command(argv[1:])
+
+    if cmd == "cache":
+        # nk cache stats|clear
+        return transcript_cache_command(sub)
+
+    if cmd == "archive":
+        # nk archive stats | nk archive gc [--dry-run] [--opus]
+        return archive_command(argv[1:])
+
+    if cmd == "media":
+        if sub == "process":
+            # nk media process [vault-path] [--keep-audio] [-m MODEL] [-T]
+            args, opts = split_args(rest, {"-m"})
+            target = normalize_path(args[0] if args else ".")
+            model_name = vault_model_name(Path(target), opts.get("-m"))
+            task = "translate" if opts.get("-T") else "transcribe"
+            if opts.get("--no-cache"):
+                os.environ["NK_CACHE"] = "0"
+            return process_media_pipeline(
+                Path(target), str(model_name), task, keep_audio=bool(opts.get("--keep-audio"))
+            )
+        else:
+            print("Unknown media command:", sub or "<missing>")
+            print("Usage: nk media process [vault-path] [--keep-audio] [-m MODEL] [-T]")
             return 1
 
     if cmd == "notes":
@@ -697,17 +6673,35 @@ def main(argv: list[str]) -> int:
                 title_arg=title_arg,
             )
 
+        elif sub == "import":
+            return import_notes(rest)
+
         else:
             print("Unknown notes command:", sub or "<missing>")
             print("Usage:")
             print("  nk notes new \"note title\"")
             print("  nk notes insight [title]")
+            print("  nk notes import <file.jsonl|file.csv|-> [--kind KIND] [--dry-run]")
             return 1
 
     if cmd == "audios":
         if sub == "process":
-            target = normalize_path(rest[0] if rest else ".")
-            return run_script("notes-audios-to-texts.sh", target)
+            # nk audios process [vault-path] [-m MODEL] [-T] [--workers N] [--legacy]
+            args, opts = split_args(rest, {"-m", "--workers"})
+            target = normalize_path(args[0] if args else ".")
+            if opts.get("--legacy"):
+                # Old per-file path (one whisper CLI process per mp3), timed for comparison
+                t0 = time.perf_counter()
+                rc = run_script("notes-audios-to-texts.sh", target)
+                print(f"⏱  Legacy per-file path took {time.perf_counter() - t0:.1f}s")
+                archive_adopt(local_archive_dir(Path(target), "audios").parent.name, settle_s=0)
+                return rc
+            model_name = vault_model_name(Path(target), opts.get("-m"))
+            task = "translate" if opts.get("-T") else "transcribe"
+            workers = number_arg(opts.get("--workers") or os.environ.get("NK_WORKERS") or 1, "--workers")
+            if opts.get("--no-cache"):
+                os.environ["NK_CACHE"] = "0"
+            return process_audios(Path(target), str(model_name), task, workers)
 
         elif sub == "record":
             # Supported forms:
@@ -715,6 +6709,8 @@ def main(argv: list[str]) -> int:
             # nk audios record "name"
             # nk audios record /path/to/vault
             # nk audios record /path/to/vault "name"
+            # ... --live [-m MODEL] [-T] [--chunk SECONDS] [--overlap SECONDS]
+            rest, opts = split_args(rest, {"-m", "--chunk", "--overlap"})
             vault = "."
             name = ""
 
@@ -733,13 +6729,26 @@ def main(argv: list[str]) -> int:
                 vault = normalize_path(rest[0])
                 name = rest[1]
 
+            if opts.get("--live"):
+                model_name = vault_model_name(Path(vault), opts.get("-m"))
+                return record_live(
+                    Path(vault),
+                    name,
+                    str(model_name),
+                    "translate" if opts.get("-T") else "transcribe",
+                    chunk_s=number_arg(
+                        opts.get("--chunk") or os.environ.get("NK_LIVE_CHUNK") or DEFAULT_LIVE_CHUNK_SECONDS,
+                        "--chunk", float,
+                    ),
+                    overlap_s=number_arg(opts.get("--overlap") or DEFAULT_LIVE_OVERLAP_SECONDS, "--overlap", float),
+                )
             return run_script("notes-audios-record.sh", vault, name)
 
         else:
             print("Unknown audios command:", sub or "<missing>")
             print("Usage:")
-            print("  nk audios process [vault-path]")
-            print("  nk audios record [vault-path] [filename]")
+            print("  nk audios process [vault-path] [-m MODEL] [-T] [--workers N] [--legacy]")
+            print("  nk audios record [vault-path] [filename] [--live [-m MODEL] [--chunk S] [--overlap S]]")
             return 1
 
     if cmd == "autosetup":
@@ -747,26 +6756,63 @@ def main(argv: list[str]) -> int:
             return autosetup_systemd_generate(rest)
         if sub == "systemd-activate":
             return autosetup_systemd_activate(rest)
+        if sub == "systemd-scheduler":
+            return autosetup_systemd_scheduler(rest)
         print("Unknown autosetup command:", sub or "<missing>")
         print("Usage:")
         print("  nk autosetup systemd [vault-path] [interval]")
-        print("  nk autosetup systemd-activate [vault-path]")
+        print("  nk autosetup systemd-activate [vault-path] [--watch]")
+        print("  nk autosetup systemd-scheduler")
         return 1
 
     if cmd == "auto":
         # nk auto <subcommand> [vault-path]
+        if sub == "tick":
+            target = normalize_path(rest[0] if rest else ".")
+            return auto_tick(Path(target), vault_model_name(Path(target)))
+
+        if sub == "upgrade":
+            # nk auto upgrade [vault-path] [-m MODEL] [--budget 10m] [--limit N]
+            args, opts = split_args(rest, {"-m", "--budget", "--limit"})
+            target = normalize_path(args[0] if args else ".")
+            budget_s = None
+            if opts.get("--budget"):
+                try:
+                    budget_s = parse_window(str(opts["--budget"]))
+                except ValueError:
+                    print(f"🚫 Bad --budget value: {opts['--budget']} (use e.g. 90m, 24h, 7d)")
+                    return 1
+            return auto_upgrade(
+                Path(target),
+                opts.get("-m"),
+                budget_s=budget_s,
+                limit=number_arg(opts["--limit"], "--limit") if opts.get("--limit") else None,
+            )
+
         if not sub:
             print("Usage:")
             print("  nk auto status [vault-path]")
             print("  nk auto queue [vault-path]")
+            print("  nk auto stats [vault-path] [--since 24h]")
+            print("  nk auto upgrade [vault-path] [-m MODEL] [--budget 10m] [--limit N]")
             print("  nk auto run [vault-path]")
             print("  nk auto logs [vault-path]")
             print("  nk auto enable [vault-path]")
             print("  nk auto disable [vault-path]")
+            print("  nk auto tick [vault-path]")
             return 1
 
         # sub is e.g. status, queue, run, logs, enable, disable
         target = normalize_path(rest[0] if rest else ".")
+        if sub == "queue":
+            return auto_queue(Path(target))
+        if sub == "stats":
+            return auto_stats(rest)
+        if sub == "status":
+            rc = run_script("notes-auto-service.sh", sub, target)
+            print()
+            auto_queue(Path(target))
+            return rc
         return run_script("notes-auto-service.sh", sub, target)
 
 
@@ -897,11 +6943,19 @@ def main(argv: list[str]) -> int:
             study_title = rest[0]
             return open_study_index(vault_dir, study_title)
 
+        elif sub == "list":
+            return study_list(vault_dir)
+
+        elif sub == "stats":
+            return study_stats(vault_dir)
+
         else:
             print("Unknown study command:", sub or "<missing>")
             print("Usage:")
             print("  nk study index \"Study Title\"")
             print("  nk study module \"Study Title\"")
+            print("  nk study open \"Study Title\"")
+            print("  nk study list | stats")
             return 1
 
     print("Unknown nk command:", cmd)
@@ -911,5 +6965,5 @@ def main(argv: list[str]) -> int:
     
 
 if __name__ == "__main__":
-    sys.exit(main(sys.argv[1:]))
+    sys.exit(client_main(sys.argv[1:]))
 
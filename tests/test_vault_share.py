@@ -0,0 +1,64 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import nk  # noqa: E402
+
+A, B = Path("/vaults/a"), Path("/vaults/b")
+
+
+def run_rounds(share, queues, weights, rounds):
+    """
+    Drive pick/charge the way scheduler_run does with one in-process worker:
+    one file per round, finished before the next round, so nothing is ever
+    running (busy=set()) when pick is called.
+    """
+    picks = []
+    for _ in range(rounds):
+        ready = {v: weights[v] for v, n in queues.items() if n}
+        if not ready:
+            share.end_round(set())
+            continue
+        vault = share.pick(ready, set())
+        share.charge(vault, 600, weights[vault])
+        queues[vault] -= 1
+        picks.append(vault)
+        share.end_round(set(ready))
+    return picks
+
+
+def test_returning_vault_gets_no_burst_credit():
+    share = nk.VaultShare()
+    weights = {A: 1, B: 1}
+    run_rounds(share, {A: 100}, weights, 100)
+    picks = run_rounds(share, {A: 100, B: 100}, weights, 20)
+    assert picks.count(A) == 10
+    assert picks.count(B) == 10
+    # They alternate from the moment B joins
+    assert all(picks[i] != picks[i + 1] for i in range(len(picks) - 1))
+
+
+def test_idle_rounds_earn_no_credit():
+    share = nk.VaultShare()
+    weights = {A: 1, B: 1}
+    run_rounds(share, {A: 10, B: 10}, weights, 20)
+    run_rounds(share, {A: 30}, weights, 30)  # B idles while A works alone
+    picks = run_rounds(share, {A: 10, B: 10}, weights, 10)
+    assert picks.count(A) == 5
+    assert picks.count(B) == 5
+
+
+def test_weights_share_audio_seconds():
+    share = nk.VaultShare()
+    picks = run_rounds(share, {A: 100, B: 100}, {A: 2, B: 1}, 30)
+    assert picks.count(A) == 20
+    assert picks.count(B) == 10
+
+
+def test_vaults_back_from_idle_start_level():
+    share = nk.VaultShare()
+    share.vtime = {A: 50_000.0, B: 0.0}
+    picks = run_rounds(share, {A: 10, B: 10}, {A: 1, B: 1}, 10)
+    assert picks.count(A) == 5
+    assert picks.count(B) == 5